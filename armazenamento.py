@@ -0,0 +1,410 @@
+# armazenamento.py
+"""
+Destinos da cópia externa (offsite) dos backups.
+
+Todo destino implementa a mesma interface, com os arquivos lidos em streaming:
+
+- enviar(caminho, nome, pasta, limitador)  -> item   (put)
+- listar(pasta, desde=None)                -> [item] (list)
+- consultar(nome, pasta)                   -> item | None (stat)
+- remover(nome, pasta, id_item=None)                  (delete; com id_item, só aquele item)
+- subpastas(pasta)                         -> {nome: pasta}
+- criar_pasta(nome, pasta)                 -> pasta
+
+e, onde o destino permite, enviar_fluxo(blocos, nome, tamanho, pasta, limitador),
+que envia um fluxo de blocos em vez de ler um arquivo (usado pelo pipeline_tee
+para subir o zip durante a própria cópia). Essa é uma capacidade opcional: quem
+usa confere com `aceita_fluxo(backend)`.
+
+onde item = {"id", "nome", "tamanho", "md5"} e `pasta` é o contêiner no destino
+(id da pasta no Drive, subpasta no diretório local, prefixo no bucket S3). O
+item devolvido pelos envios traz também "md5_lido" (e, no S3, "crc32_lido"), os
+checksums calculados sobre os próprios bytes lidos para o envio, que
+`verificar_envio` compara com o tamanho e o checksum calculado pelo destino. No
+item de um envio, "md5"/"crc32" só vêm do destino (Drive: md5Checksum; S3: ETag
+de uma parte ou checksum CRC32 do objeto inteiro; diretório local: o arquivo
+gravado relido do disco), nunca de um valor que o próprio bot escreveu.
+
+Implementações: DiretorioLocal (NAS/segundo disco montado; também permite testar
+o pipeline de upload inteiro sem rede), S3 (qualquer serviço compatível; requer
+boto3) e GoogleDriveBackend (upload resumível do upload_resumivel).
+"""
+
+import os, hashlib, base64, zlib
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from pathlib import Path
+from upload_resumivel import enviar_resumivel, ErroUpload, HashContinuo
+from pipeline_tee import LeitorFluxo
+from manifest import obter_entrada
+
+try:
+    import boto3
+except ImportError:  # S3 é opcional
+    boto3 = None
+
+BLOCO_LEITURA = 1024 * 1024
+MIME_PASTA_DRIVE = "application/vnd.google-apps.folder"
+
+
+class PastaInexistente(Exception):
+    """A pasta de destino não existe mais no destino (ex.: apagada pelo usuário no Drive)."""
+
+    def __init__(self, pasta: str):
+        super().__init__(f"pasta remota {pasta} não existe mais")
+        self.pasta = pasta
+
+
+class StorageBackend(ABC):
+    nome = "base"
+
+    @abstractmethod
+    def enviar(self, caminho, nome: str, pasta: str = "", limitador=None, log=print) -> dict:
+        ...
+
+    @abstractmethod
+    def listar(self, pasta: str = "", desde: float | None = None) -> list[dict]:
+        ...
+
+    def consultar(self, nome: str, pasta: str = "") -> dict | None:
+        return next((item for item in self.listar(pasta) if item["nome"] == nome), None)
+
+    @abstractmethod
+    def remover(self, nome: str, pasta: str = "", id_item: str | None = None):
+        """Apaga `nome` de `pasta`; com `id_item`, só esse item (no Drive pode haver vários com o mesmo nome)."""
+
+    @abstractmethod
+    def subpastas(self, pasta: str = "") -> dict[str, str]:
+        """Subpastas diretas de `pasta`: {nome: identificador usado como `pasta` nas outras chamadas}."""
+
+    @abstractmethod
+    def criar_pasta(self, nome: str, pasta: str = "") -> str:
+        ...
+
+
+def aceita_fluxo(backend: StorageBackend) -> bool:
+    """O destino implementa enviar_fluxo (envio de blocos sem reler o arquivo)?"""
+    return callable(getattr(backend, "enviar_fluxo", None))
+
+
+def verificar_envio(remoto: dict, tamanho: int, md5_local: str | None = None) -> tuple[str, str]:
+    """
+    Confere a cópia remota `remoto` (item devolvido pelo envio) contra o arquivo local:
+    tamanho e checksum do destino (MD5 ou, no S3 multipart, CRC32) contra o calculado
+    durante o envio (ou `md5_local`, do manifest, quando o envio não leu o arquivo
+    inteiro). Retorna (estado, detalhe), com estado "ok", "so_tamanho" (destino sem
+    checksum próprio) ou "divergente".
+    """
+    md5_lido = remoto.get("md5_lido")
+    if remoto.get("tamanho") != tamanho:
+        return "divergente", f"tamanho remoto {remoto.get('tamanho')} ≠ local {tamanho}"
+    if md5_lido and md5_local and md5_lido != md5_local:
+        return "divergente", "o arquivo mudou durante o envio (MD5 lido ≠ manifest)"
+    md5_lido = md5_lido or md5_local
+    if remoto.get("md5") and md5_lido:
+        if remoto["md5"] != md5_lido:
+            return "divergente", f"MD5 remoto {remoto['md5']} ≠ local {md5_lido}"
+        return "ok", f"{tamanho} bytes, MD5 {md5_lido}"
+    if remoto.get("crc32") and remoto.get("crc32_lido"):
+        if remoto["crc32"] != remoto["crc32_lido"]:
+            return "divergente", f"CRC32 remoto {remoto['crc32']} ≠ local {remoto['crc32_lido']}"
+        return "ok", f"{tamanho} bytes, CRC32 {remoto['crc32']}"
+    return "so_tamanho", f"{tamanho} bytes; sem checksum do destino para comparar"
+
+
+def _crc32_b64(crc: int) -> str:
+    """CRC32 no formato do S3 (base64 dos 4 bytes big-endian)."""
+    return base64.b64encode(crc.to_bytes(4, "big")).decode("ascii")
+
+
+def _subcaminho(pasta: str, nome: str) -> str:
+    return f"{pasta.rstrip('/')}/{nome}" if pasta else nome
+
+
+class _LeitorLimitado:
+    """Arquivo aberto que passa cada leitura pelo limitador de banda e calcula o MD5 e o CRC32 do que foi lido."""
+
+    def __init__(self, f, limitador=None):
+        self._f = f
+        self._limitador = limitador
+        self.md5 = hashlib.md5()
+        self.crc32 = 0
+
+    def read(self, n: int = -1) -> bytes:
+        dados = self._f.read(BLOCO_LEITURA if n is None or n < 0 else n)
+        if dados:
+            if self._limitador:
+                self._limitador.consumir(len(dados))
+            self.md5.update(dados)
+            self.crc32 = zlib.crc32(dados, self.crc32)
+        return dados
+
+
+# --- Diretório local / montado ---
+class DiretorioLocal(StorageBackend):
+    """Destino num diretório (disco externo, compartilhamento de rede montado). O MD5 fica num arquivo .md5 ao lado."""
+    nome = "local"
+
+    def __init__(self, raiz):
+        self.raiz = Path(raiz)
+
+    def _pasta(self, pasta: str) -> Path:
+        return self.raiz / pasta if pasta else self.raiz
+
+    def _item(self, caminho: Path) -> dict:
+        st = caminho.stat()
+        sidecar = caminho.with_name(caminho.name + ".md5")
+        md5 = sidecar.read_text(encoding="utf-8").strip() if sidecar.exists() else None
+        return {"id": str(caminho), "nome": caminho.name, "tamanho": st.st_size, "md5": md5}
+
+    def enviar(self, caminho, nome: str, pasta: str = "", limitador=None, log=print) -> dict:
+        with open(caminho, "rb") as src:
+            return self._gravar(iter(lambda: src.read(BLOCO_LEITURA), b""), nome, pasta, limitador)
+
+    def enviar_fluxo(self, blocos, nome: str, tamanho: int, pasta: str = "", limitador=None, log=print) -> dict:
+        return self._gravar(blocos, nome, pasta, limitador)
+
+    def _gravar(self, blocos, nome: str, pasta: str, limitador=None) -> dict:
+        destino_dir = self._pasta(pasta)
+        destino_dir.mkdir(parents=True, exist_ok=True)
+        destino = destino_dir / nome
+        tmp = destino.with_name(nome + ".part")
+        md5 = hashlib.md5()
+        with open(tmp, "wb") as dst:
+            for dados in blocos:
+                if limitador:
+                    limitador.consumir(len(dados))
+                dst.write(dados)
+                md5.update(dados)
+            dst.flush()
+            os.fsync(dst.fileno())
+        # mtime fica o do envio: é ele que a listagem incremental (`desde`) compara
+        os.replace(tmp, destino)
+        destino.with_name(nome + ".md5").write_text(md5.hexdigest(), encoding="utf-8")
+        # a verificação usa o arquivo relido do destino, não o hash dos bytes que acabaram de passar
+        gravado = hashlib.md5()
+        with open(destino, "rb") as f:
+            while dados := f.read(BLOCO_LEITURA):
+                gravado.update(dados)
+        return {**self._item(destino), "md5": gravado.hexdigest(), "md5_lido": md5.hexdigest()}
+
+    def listar(self, pasta: str = "", desde: float | None = None) -> list[dict]:
+        itens = []
+        try:
+            entradas = list(os.scandir(self._pasta(pasta)))
+        except FileNotFoundError:
+            return []
+        for e in entradas:
+            if not e.is_file() or e.name.endswith((".md5", ".part")):
+                continue
+            if desde is not None and e.stat().st_mtime <= desde:
+                continue
+            itens.append(self._item(Path(e.path)))
+        return itens
+
+    def consultar(self, nome: str, pasta: str = "") -> dict | None:
+        caminho = self._pasta(pasta) / nome
+        return self._item(caminho) if caminho.is_file() else None
+
+    def remover(self, nome: str, pasta: str = "", id_item: str | None = None):
+        caminho = self._pasta(pasta) / nome  # nome único na pasta: id_item é o próprio caminho
+        for alvo in (caminho, caminho.with_name(nome + ".md5")):
+            try:
+                alvo.unlink()
+            except FileNotFoundError:
+                pass
+
+    def subpastas(self, pasta: str = "") -> dict[str, str]:
+        try:
+            with os.scandir(self._pasta(pasta)) as it:
+                return {e.name: _subcaminho(pasta, e.name) for e in it if e.is_dir()}
+        except FileNotFoundError:
+            return {}
+
+    def criar_pasta(self, nome: str, pasta: str = "") -> str:
+        subpasta = _subcaminho(pasta, nome)
+        self._pasta(subpasta).mkdir(parents=True, exist_ok=True)
+        return subpasta
+
+
+# --- S3 e compatíveis (MinIO, Wasabi, Backblaze B2...) ---
+class S3(StorageBackend):
+    """
+    Destino num bucket S3. O ETag de uploads multipart não é o MD5, então o MD5 do
+    manifest (quando já conhecido) vai nos metadados do objeto e a listagem recorre a
+    ele para saber o que já foi enviado. A verificação de um envio não usa esse valor:
+    o objeto é enviado com checksum CRC32 calculado pelo S3 e comparado com o CRC32
+    dos bytes lidos (sem checksum do objeto inteiro, fica "so_tamanho").
+    """
+    nome = "s3"
+
+    def __init__(self, bucket: str, prefixo: str = "", endpoint: str | None = None,
+                 regiao: str | None = None, chave_acesso: str | None = None, chave_secreta: str | None = None):
+        if boto3 is None:
+            raise RuntimeError("pacote 'boto3' não instalado — necessário para o destino S3.")
+        self.bucket = bucket
+        self.prefixo = prefixo.strip("/")
+        self._s3 = boto3.client("s3", endpoint_url=endpoint, region_name=regiao,
+                                aws_access_key_id=chave_acesso, aws_secret_access_key=chave_secreta)
+
+    def _chave(self, nome: str, pasta: str) -> str:
+        return "/".join(p for p in (self.prefixo, pasta.strip("/"), nome) if p)
+
+    def _md5(self, chave: str, etag: str) -> str | None:
+        etag = etag.strip('"')
+        if "-" not in etag:
+            return etag
+        cab = self._s3.head_object(Bucket=self.bucket, Key=chave)
+        return cab.get("Metadata", {}).get("md5")
+
+    def enviar(self, caminho, nome: str, pasta: str = "", limitador=None, log=print) -> dict:
+        chave = self._chave(nome, pasta)
+        extra = {"ChecksumAlgorithm": "CRC32"}
+        md5 = (obter_entrada(caminho) or {}).get("md5")  # só o que o manifest já sabe, sem reler o arquivo
+        if md5:
+            extra["Metadata"] = {"md5": md5}
+        with open(caminho, "rb") as f:
+            leitor = _LeitorLimitado(f, limitador)
+            self._s3.upload_fileobj(leitor, self.bucket, chave, ExtraArgs=extra)
+        # tamanho e checksums como o bucket os calculou
+        cab = self._s3.head_object(Bucket=self.bucket, Key=chave, ChecksumMode="ENABLED")
+        etag = cab["ETag"].strip('"')
+        crc32 = cab.get("ChecksumCRC32")
+        if crc32 and ("-" in crc32 or cab.get("ChecksumType") == "COMPOSITE"):
+            crc32 = None  # checksum das partes, não do objeto inteiro
+        return {"id": chave, "nome": nome, "tamanho": cab["ContentLength"],
+                "md5": etag if "-" not in etag else None, "crc32": crc32,
+                "md5_lido": leitor.md5.hexdigest(), "crc32_lido": _crc32_b64(leitor.crc32)}
+
+    def listar(self, pasta: str = "", desde: float | None = None) -> list[dict]:
+        prefixo = self._chave("", pasta)
+        prefixo = prefixo + "/" if prefixo else ""
+        itens = []
+        for pagina in self._s3.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=prefixo, Delimiter="/"):
+            for obj in pagina.get("Contents", []):
+                if desde is not None and obj["LastModified"] <= datetime.fromtimestamp(desde, timezone.utc):
+                    continue
+                itens.append({"id": obj["Key"], "nome": obj["Key"][len(prefixo):], "tamanho": obj["Size"],
+                              "md5": self._md5(obj["Key"], obj["ETag"])})
+        return itens
+
+    def consultar(self, nome: str, pasta: str = "") -> dict | None:
+        chave = self._chave(nome, pasta)
+        try:
+            cab = self._s3.head_object(Bucket=self.bucket, Key=chave)
+        except self._s3.exceptions.ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        etag = cab["ETag"].strip('"')
+        md5 = etag if "-" not in etag else cab.get("Metadata", {}).get("md5")
+        return {"id": chave, "nome": nome, "tamanho": cab["ContentLength"], "md5": md5}
+
+    def remover(self, nome: str, pasta: str = "", id_item: str | None = None):
+        self._s3.delete_object(Bucket=self.bucket, Key=id_item or self._chave(nome, pasta))
+
+    def subpastas(self, pasta: str = "") -> dict[str, str]:
+        prefixo = self._chave("", pasta)
+        prefixo = prefixo + "/" if prefixo else ""
+        nomes = set()
+        for pagina in self._s3.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=prefixo, Delimiter="/"):
+            nomes.update(p["Prefix"][len(prefixo):].rstrip("/") for p in pagina.get("CommonPrefixes", []))
+        return {nome: _subcaminho(pasta.strip("/"), nome) for nome in nomes}
+
+    def criar_pasta(self, nome: str, pasta: str = "") -> str:
+        # no S3 não há pastas: o prefixo passa a existir com o primeiro objeto
+        return _subcaminho(pasta.strip("/"), nome)
+
+
+# --- Google Drive ---
+class GoogleDriveBackend(StorageBackend):
+    """Destino no Google Drive: `pasta` é o id da pasta; envio pelo upload resumível."""
+    nome = "drive"
+
+    def __init__(self, autenticacao, pool, sessoes=None):
+        self.autenticacao = autenticacao
+        self.pool = pool
+        self.sessoes = sessoes
+
+    def _enviar(self, caminho, nome: str, pasta: str, tamanho: int, **kwargs) -> dict:
+        hash_envio = HashContinuo()
+        try:
+            remoto = enviar_resumivel(caminho, {"name": nome, "parents": [pasta]} if pasta else {"name": nome},
+                                      self.autenticacao.obter_token, self.pool, hash_envio=hash_envio, **kwargs)
+        except ErroUpload as e:
+            if pasta and e.status == 404:  # pai inexistente: a sessão nem chega a abrir
+                raise PastaInexistente(pasta) from e
+            raise
+        return {**self._item(remoto, nome), "md5_lido": hash_envio.hexdigest(tamanho)}
+
+    def enviar(self, caminho, nome: str, pasta: str = "", limitador=None, log=print) -> dict:
+        return self._enviar(caminho, nome, pasta, Path(caminho).stat().st_size,
+                            sessoes=self.sessoes, limitador=limitador, log=log)
+
+    def enviar_fluxo(self, blocos, nome: str, tamanho: int, pasta: str = "", limitador=None, log=print) -> dict:
+        return self._enviar(Path(nome), nome, pasta, tamanho, limitador=limitador, log=log,
+                            fonte=LeitorFluxo(blocos), total=tamanho)
+
+    @staticmethod
+    def _item(remoto: dict, nome: str) -> dict:
+        # sem "size" na resposta o tamanho fica desconhecido (e a verificação acusa)
+        return {"id": remoto.get("id"), "nome": remoto.get("name", nome),
+                "tamanho": int(remoto["size"]) if "size" in remoto else None, "md5": remoto.get("md5Checksum")}
+
+    def _consulta(self, q: str) -> list[dict]:
+        drive = self.autenticacao.drive()
+        return [
+            {"id": f["id"], "nome": f["title"], "tamanho": int(f.get("fileSize", 0)), "md5": f.get("md5Checksum")}
+            for f in drive.ListFile({"q": q, "maxResults": 1000}).GetList()
+        ]
+
+    def listar(self, pasta: str = "", desde: float | None = None) -> list[dict]:
+        q = f"'{pasta or 'root'}' in parents and mimeType != '{MIME_PASTA_DRIVE}' and trashed = false"
+        if desde is not None:
+            q += f" and modifiedDate > '{datetime.fromtimestamp(desde, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')}'"
+        return self._consulta(q)
+
+    def consultar(self, nome: str, pasta: str = "") -> dict | None:
+        nome_q = nome.replace("\\", "\\\\").replace("'", "\\'")
+        itens = self._consulta(f"'{pasta or 'root'}' in parents and title = '{nome_q}' and trashed = false")
+        return itens[0] if itens else None
+
+    def remover(self, nome: str, pasta: str = "", id_item: str | None = None):
+        if id_item is None:
+            item = self.consultar(nome, pasta)
+            id_item = item["id"] if item else None
+        if id_item:
+            self.autenticacao.drive().CreateFile({"id": id_item}).Trash()
+
+    def subpastas(self, pasta: str = "") -> dict[str, str]:
+        drive = self.autenticacao.drive()
+        q = f"'{pasta or 'root'}' in parents and mimeType = '{MIME_PASTA_DRIVE}' and trashed = false"
+        return {f["title"]: f["id"] for f in drive.ListFile({"q": q, "maxResults": 1000}).GetList()}
+
+    def criar_pasta(self, nome: str, pasta: str = "") -> str:
+        meta = {"title": nome, "mimeType": MIME_PASTA_DRIVE}
+        if pasta:
+            meta["parents"] = [{"id": pasta}]
+        nova = self.autenticacao.drive().CreateFile(meta)
+        nova.Upload()
+        return nova["id"]
+
+
+def criar_backend(conf: dict, autenticacao=None, pool=None, sessoes=None) -> tuple[StorageBackend, str]:
+    """
+    Destino configurado em "armazenamentoRemoto" e a pasta padrão nele:
+      {"tipo": "drive", "pasta": "<id>"} | {"tipo": "local", "raiz": "E:/offsite", "pasta": ""} |
+      {"tipo": "s3", "bucket": "...", "prefixo": "...", "endpoint": "...", "regiao": "...",
+       "chaveAcesso": "...", "chaveSecreta": "..."}
+    """
+    opcoes = conf.get("armazenamentoRemoto") or {}
+    tipo = opcoes.get("tipo", "drive")
+    pasta = opcoes.get("pasta", "")
+    if tipo == "local":
+        return DiretorioLocal(opcoes["raiz"]), pasta
+    if tipo == "s3":
+        return S3(opcoes["bucket"], opcoes.get("prefixo", ""), opcoes.get("endpoint"), opcoes.get("regiao"),
+                  opcoes.get("chaveAcesso"), opcoes.get("chaveSecreta")), pasta
+    if tipo == "drive":
+        return GoogleDriveBackend(autenticacao, pool, sessoes), pasta
+    raise ValueError(f"tipo de armazenamento remoto desconhecido: {tipo}")
@@ -0,0 +1,56 @@
+# arvore_backup.py
+"""
+Leitura da árvore de backups: <backupDir>/BACKUP yyyy/MÊS/dd_mm_yyyy.
+
+Usa os.scandir nível a nível (sem stat dos zips), então listar dez anos de
+pastas leva poucos milissegundos.
+"""
+
+import os
+from datetime import date, datetime
+from pathlib import Path
+
+MESES = [
+    "JANEIRO", "FEVEREIRO", "MARÇO", "ABRIL", "MAIO", "JUNHO",
+    "JULHO", "AGOSTO", "SETEMBRO", "OUTUBRO", "NOVEMBRO", "DEZEMBRO"
+]
+
+PREFIXO_ANO = "BACKUP "
+
+
+def _subpastas(caminho):
+    try:
+        with os.scandir(caminho) as it:
+            return [e for e in it if e.is_dir(follow_symlinks=False)]
+    except OSError:
+        return []
+
+
+def data_da_pasta(nome: str) -> date | None:
+    """Converte 'dd_mm_yyyy' em date (None se o nome não seguir o padrão)."""
+    try:
+        return datetime.strptime(nome, "%d_%m_%Y").date()
+    except ValueError:
+        return None
+
+
+def partes_da_pasta(data: date) -> list[str]:
+    """['BACKUP yyyy', 'MÊS', 'dd_mm_yyyy'] da pasta do dia `data`, relativa ao backupDir."""
+    return [f"{PREFIXO_ANO}{data:%Y}", MESES[data.month - 1], f"{data:%d_%m_%Y}"]
+
+
+def listar_pastas_dia(base_dir) -> list[tuple[date, Path]]:
+    """Todas as pastas de dia da árvore, ordenadas por data (mais antiga primeiro)."""
+    pastas = []
+    for ano in _subpastas(base_dir):
+        if not ano.name.startswith(PREFIXO_ANO):
+            continue
+        for mes in _subpastas(ano.path):
+            if mes.name not in MESES:
+                continue
+            for dia in _subpastas(mes.path):
+                data = data_da_pasta(dia.name)
+                if data is not None:
+                    pastas.append((data, Path(dia.path)))
+    pastas.sort(key=lambda item: item[0])
+    return pastas
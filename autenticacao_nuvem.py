@@ -0,0 +1,141 @@
+# autenticacao_nuvem.py
+"""
+Autenticação do Google Drive com credenciais guardadas e renovação silenciosa.
+
+As credenciais ficam em `<pasta>/credentials.json` (pasta do BackupBot no
+AppData, com caminho absoluto, independente do diretório atual). Nas execuções
+seguintes elas são só carregadas do disco e, se o access token expirou,
+renovadas pelo refresh token, sem navegador. O fluxo interativo
+(LocalWebserverAuth -> CommandLineAuth) só acontece na primeira vez ou se o
+refresh token for revogado, e só quando pedido: na thread principal ou, com
+`autorizar(em_segundo_plano=True)`, na thread da fila de upload, que avisa a
+interface enquanto espera o navegador. Nas demais threads de upload e do agendador
+a falta de autorização vira AutorizacaoNecessaria, sem abrir navegador nem esperar
+input(). Um único cliente autenticado é compartilhado pelo processo inteiro.
+"""
+
+import sys, threading
+from pathlib import Path
+from pydrive2.auth import GoogleAuth, RefreshError
+from pydrive2.drive import GoogleDrive
+
+ESCOPO_DRIVE = ["https://www.googleapis.com/auth/drive"]
+
+
+class AutorizacaoNecessaria(RuntimeError):
+    """Sem credenciais válidas e fora da thread principal: é preciso autorizar pela interface."""
+
+
+class GerenciadorAutenticacao:
+    def __init__(self, pasta, client_secrets=None, log=print):
+        self.pasta = Path(pasta)
+        self.credenciais = self.pasta / "credentials.json"
+        if client_secrets is None:
+            client_secrets = self.pasta / "client_secrets.json"
+            if not client_secrets.exists():
+                client_secrets = Path(__file__).parent / "client_secrets.json"
+        self.client_secrets = Path(client_secrets)
+        self.log = log
+        self._lock = threading.RLock()
+        self._autorizando = threading.Lock()
+        self._gauth = None
+        self._drive = None
+
+    def _novo_gauth(self) -> GoogleAuth:
+        settings = {
+            **GoogleAuth.DEFAULT_SETTINGS,
+            "client_config_backend": "file",
+            "client_config_file": str(self.client_secrets),
+            "save_credentials": False,  # salvamos nós mesmos, em caminho absoluto
+            "get_refresh_token": True,
+            "oauth_scope": ESCOPO_DRIVE,
+        }
+        # com `settings=` o pydrive2 ignora `settings_file`: só estas configurações valem
+        return GoogleAuth(settings=settings)
+
+    def _salvar(self):
+        self.pasta.mkdir(parents=True, exist_ok=True)
+        try:
+            self._gauth.SaveCredentialsFile(str(self.credenciais))
+        except Exception as e:
+            self.log(f"⚠️ Não foi possível salvar as credenciais da nuvem: {e}")
+
+    def autorizar(self, em_segundo_plano: bool = False):
+        """
+        Fluxo interativo (navegador; linha de comando só com um terminal, na thread
+        principal). Só na thread principal ou, com `em_segundo_plano`, numa thread dedicada
+        (a da fila de upload); nunca segurando o lock: os uploads em andamento recebem
+        AutorizacaoNecessaria em vez de ficarem presos esperando.
+        """
+        principal = threading.current_thread() is threading.main_thread()
+        if not (principal or em_segundo_plano):
+            raise AutorizacaoNecessaria("autorização do Google Drive só pode ser feita pela interface do bot.")
+        if not self._autorizando.acquire(blocking=False):
+            raise AutorizacaoNecessaria("autorização do Google Drive já em andamento.")
+        try:
+            self.log("☁️ Autorização do Google Drive necessária (primeiro uso ou acesso revogado).")
+            gauth = self._novo_gauth()
+            try:
+                gauth.LocalWebserverAuth()  # abre navegador
+            except Exception as e:
+                if not (principal and sys.stdin and sys.stdin.isatty()):
+                    raise AutorizacaoNecessaria(f"autorização do Google Drive não concluída: {e}") from e
+                self.log(f"⚠️ LocalWebserverAuth falhou: {e} — tentando CommandLineAuth (útil em servidores).")
+                gauth.CommandLineAuth()
+            with self._lock:
+                self._gauth = gauth
+                self._salvar()
+                self._drive = GoogleDrive(gauth)
+        finally:
+            self._autorizando.release()
+
+    def _autenticar(self):
+        gauth = self._novo_gauth()
+        if self.credenciais.exists():
+            gauth.LoadCredentialsFile(str(self.credenciais))
+        if gauth.credentials is None:
+            raise AutorizacaoNecessaria("Google Drive ainda não autorizado.")
+        self._gauth = gauth
+        if gauth.access_token_expired:
+            self._renovar()
+        else:
+            gauth.Authorize()
+        self._drive = GoogleDrive(gauth)
+
+    def _renovar(self):
+        try:
+            self._gauth.Refresh()
+        except RefreshError as e:
+            self.log(f"⚠️ Renovação do token falhou ({e}).")
+            self._drive = None  # a próxima chamada tenta as credenciais do disco de novo
+            raise AutorizacaoNecessaria(f"acesso ao Google Drive revogado ou expirado ({e}).") from e
+        self._salvar()
+
+    def _com_autorizacao(self, fn):
+        try:
+            with self._lock:
+                return fn()
+        except AutorizacaoNecessaria:
+            if threading.current_thread() is not threading.main_thread():
+                raise
+        self.autorizar()
+        with self._lock:
+            return fn()
+
+    def drive(self) -> GoogleDrive:
+        """Cliente autenticado do processo (criado na primeira chamada)."""
+        def cliente():
+            if self._drive is None:
+                self._autenticar()
+            return self._drive
+        return self._com_autorizacao(cliente)
+
+    def obter_token(self, forcar: bool = False) -> str:
+        """Access token atual, renovado se expirou (ou se `forcar`, ex.: após um 401)."""
+        def token():
+            if self._drive is None:
+                self._autenticar()
+            elif forcar or self._gauth.access_token_expired:
+                self._renovar()
+            return self._gauth.credentials.access_token
+        return self._com_autorizacao(token)
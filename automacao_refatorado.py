@@ -8,7 +8,7 @@ Objetivo: manter comportamento atual, mas facilitar testes e correções locais
 (mais funções menores, sinalização entre fluxo principal e watcher).
 """
 
-import os, time, threading, traceback, json, pyautogui, psutil, sys
+import os, time, threading, traceback, json, pyautogui, psutil, sys, contextvars
 from fecharClipp import fechar_clipp_e_confirmar_backup_refatorado
 from pathlib import Path
 from pywinauto import Desktop, Application
@@ -16,7 +16,10 @@ from utils import get_config_path
 from tentar_login_refatorado import tentar_login_refatorado
 from winutils import get_desktop, safe_click
 from backup_watcher import BackupWatcher
-from utils import log, salvar_screenshot, APPDATA, LOG_DIR, LOG_FILE, find_and_click_information_ok
+from utils import log, salvar_screenshot, APPDATA, LOG_DIR, LOG_FILE, find_and_click_information_ok, begin_run, end_run
+from fases import fase, medida, ExecucaoMedida
+
+FASES_STATS = LOG_DIR / "fases_stats.json"
 
 backup_watcher = BackupWatcher()
 sys.path.append(str(Path(__file__).parent))
@@ -43,7 +46,9 @@ class SecurityWatcher:
         if self._thread and self._thread.is_alive():
             return
         self._stop_event.clear()
-        self._thread = threading.Thread(target=self._run, daemon=True, name="SecurityWatcher")
+        # a thread herda a execução em andamento (run_id do log)
+        self._thread = threading.Thread(target=contextvars.copy_context().run, args=(self._run,),
+                                        daemon=True, name="SecurityWatcher")
         self._thread.start()
         # Espera um breve momento até a thread marcar como em execução
         start_time = time.time()
@@ -119,6 +124,7 @@ class SecurityWatcher:
 
 
 # --- Função refatorada para abrir o Clipp e garantir que ele abriu antes de retornar ---
+@medida("abrir_clipp", ok=bool)
 def abrir_clipp_com_tratativa_refatorado(exe_path: Path, watcher: SecurityWatcher = None, timeout_open: int = 30) -> bool:
     """
     Abre o executável do Clipp e retorna apenas quando detectar que o Clipp realmente abriu.
@@ -181,7 +187,8 @@ def abrir_clipp_com_tratativa_refatorado(exe_path: Path, watcher: SecurityWatche
         os.chdir(exe_path.parent)
         log(f"Iniciando {exe_path.name} no diretório {exe_path.parent}")
         try:
-            app = Application(backend="win32").start(f'"{exe_path}"', work_dir=str(exe_path.parent), timeout=30)
+            with fase("iniciar_processo"):
+                app = Application(backend="win32").start(f'"{exe_path}"', work_dir=str(exe_path.parent), timeout=30)
         except Exception as e_start:
             log(f"❌ Falha ao iniciar aplicativo: {e_start}")
             salvar_screenshot("erro_iniciar_clipp")
@@ -213,11 +220,13 @@ def abrir_clipp_com_tratativa_refatorado(exe_path: Path, watcher: SecurityWatche
                     aviso_presente = True
                     log("⚠️ Aviso de segurança detectado pelo fluxo principal — aguardando SecurityWatcher agir...")
                     # Espera até que o watcher sinalize que tratou (ou timeout curto)
-                    handled = watcher.handled_event.wait(timeout=12)
-                    if handled:
-                        log("✅ Fluxo principal: watcher sinalizou que tratou o aviso.")
-                    else:
-                        log("⚠️ Fluxo principal: watcher não sinalizou dentro do timeout; prosseguindo checagens.")
+                    with fase("aviso_seguranca") as etapa:
+                        handled = watcher.handled_event.wait(timeout=12)
+                        if handled:
+                            log("✅ Fluxo principal: watcher sinalizou que tratou o aviso.")
+                        else:
+                            etapa.falhou("timeout")
+                            log("⚠️ Fluxo principal: watcher não sinalizou dentro do timeout; prosseguindo checagens.")
                     break
 
             if not aviso_presente:
@@ -239,6 +248,23 @@ def abrir_clipp_com_tratativa_refatorado(exe_path: Path, watcher: SecurityWatche
         return False
     
 def executar_backup_completo(config_path: Path | None = None) -> str:
+    """
+    Executa o fluxo completo do backup como uma execução do log (begin_run/end_run: todas
+    as linhas, inclusive das threads abertas no caminho, levam o mesmo run_id) medindo
+    cada fase (ver fases): no fim, o log traz o tempo de cada uma comparado com a
+    mediana das execuções anteriores.
+    """
+    begin_run()
+    status = "erro"
+    try:
+        with ExecucaoMedida("backup_completo", historico=FASES_STATS) as execucao:
+            execucao.status = status = _executar_backup_completo(config_path)
+    finally:
+        end_run(status == "done", status=status)
+    return status
+
+
+def _executar_backup_completo(config_path: Path | None = None) -> str:
     """
     Executa o fluxo completo do backup:
       1. Lê config.json
@@ -310,14 +336,19 @@ def executar_backup_completo(config_path: Path | None = None) -> str:
 
         # --- 6. Esperar conclusão do backup ---
         log("⏳ Aguardando conclusão do backup...")
-        backup_watcher.completed_event.wait(timeout=backup_watcher.timeout_total)
+        with fase("aguardar_backup") as etapa:
+            if not backup_watcher.completed_event.wait(timeout=backup_watcher.timeout_total):
+                etapa.falhou("timeout")
 
         from backup_manager import gerenciar_backup
         if backup_watcher.completed_event.is_set():
             log("Backup finalizado — nenhum arquivo adicional será criado.")
-            gerenciar_backup(backup_dir=conf.get("backupDir", "D:\\BACKUP"), log=log, esperado_minimo=1)
+            destino = gerenciar_backup(backup_dir=conf.get("backupDir", "D:\\BACKUP"), log=log, esperado_minimo=1)
             watcher.stop()
             backup_watcher.stop()
+            if destino is None:
+                log("❌ Os arquivos do backup não foram armazenados corretamente.")
+                return "erro"
             return "done"
         else:
             log("⚠️ Timeout aguardando conclusão do backup.")
@@ -1,25 +1,31 @@
 import os
 import time
-import shutil, json
+import json
+import threading
+import contextvars
 from datetime import datetime
 from pathlib import Path
+from monitor_arquivos import FileArrivalMonitor, CRIADO, FECHADO, REMOVIDO
+from estabilidade import StabilityTracker
+from manifest import registrar_arquivos, carregar_manifest
+from transferencia import mover_arquivo, copias_interrompidas, descartar_parcial
+from dedup import ContentStore, CAS_DIR
+from arvore_backup import listar_pastas_dia, partes_da_pasta, data_da_pasta
+from retencao import aplicar_retencao
+from catalogo import BackupCatalog
+from chunk_store import ChunkStore, CHUNKS_DIR, compactar_pasta
+from verificacao_zip import verificar_pasta
+from recompressao import recomprimir_pasta
+from fila_upload import UploadQueue, FILA_NOME
+from fases import fase, medida
 
 _this_dir = Path(__file__).parent
 _conf_path = _this_dir / "config.json"
 with open(_conf_path, encoding="utf-8") as f:
     conf = json.load(f)
 
-MESES = [
-    "JANEIRO", "FEVEREIRO", "MARÇO", "ABRIL", "MAIO", "JUNHO",
-    "JULHO", "AGOSTO", "SETEMBRO", "OUTUBRO", "NOVEMBRO", "DEZEMBRO"
-]
-
 def criar_pasta_backup(base_dir: str) -> Path:
-    hoje = datetime.now()
-    ano = hoje.strftime("%Y")
-    mes_nome = MESES[hoje.month - 1]
-    nome_pasta = hoje.strftime("%d_%m_%Y")
-    destino = Path(base_dir) / f"BACKUP {ano}" / mes_nome / nome_pasta
+    destino = Path(base_dir).joinpath(*partes_da_pasta(datetime.now().date()))
     destino.mkdir(parents=True, exist_ok=True)
     return destino
 
@@ -33,25 +39,12 @@ def _eh_nome_backup(nome: str, padrao: str) -> bool:
     # aceitar se contiver .zip em algum ponto após o prefixo (ex: .zip, .zip_done, .zip.part)
     return ".zip" in n
 
-def _arquivo_estavel(caminho: Path, intervalo: int = 5) -> bool:
-    """
-    Verifica se arquivo estável: tamanho igual após `intervalo` segundos.
-    Retorna True se o arquivo existir e tamanho não mudou na janela de verificação.
-    """
-    try:
-        if not caminho.exists():
-            return False
-        t1 = caminho.stat().st_size
-        time.sleep(intervalo)
-        t2 = caminho.stat().st_size
-        return t1 == t2
-    except Exception:
-        return False
-
-def aguardar_arquivos_backup(origem_dir: str, log=print, timeout_seg=900, intervalo=5, esperado=1):
+def aguardar_arquivos_backup(origem_dir: str, log=print, timeout_seg=900, intervalo=5, esperado=1,
+                             janela_estavel=5, amostras_minimas=2):
     """
     Aguarda até detectar 'esperado' arquivos CLIPPddmmyyyy*.zip (aceitando sufixos).
-    Verifica estabilidade do arquivo antes de considerá-lo.
+    Verifica estabilidade do arquivo antes de considerá-lo: todos os candidatos são
+    amostrados juntos e ficam estáveis após `janela_estavel` segundos sem mudança.
     """
     inicio = time.time()
     hoje = datetime.now().strftime("%d%m%Y")
@@ -59,39 +52,53 @@ def aguardar_arquivos_backup(origem_dir: str, log=print, timeout_seg=900, interv
 
     log(f"Aguardando geração dos arquivos de backup (padrão: {padrao}*, aguardando {esperado})...")
     encontrados = {}
+    em_escrita = set()
+    tracker = StabilityTracker(quiet_window=janela_estavel, min_samples=amostras_minimas)
 
-    while time.time() - inicio < timeout_seg:
-        try:
-            nomes = os.listdir(origem_dir)
-        except Exception as e:
-            log(f"Erro lendo diretório '{origem_dir}': {e}")
-            time.sleep(intervalo)
-            continue
+    # o monitor avisa quando algo muda no diretório, em vez de listá-lo a cada `intervalo`;
+    # escritas em andamento não acordam o loop — o tracker as percebe pelo stat
+    with FileArrivalMonitor(origem_dir, filtro=lambda nome: _eh_nome_backup(nome, padrao),
+                            eventos=(CRIADO, FECHADO, REMOVIDO)) as monitor:
+        while time.time() - inicio < timeout_seg:
+            if not os.path.isdir(origem_dir):
+                log(f"Erro lendo diretório '{origem_dir}': diretório não encontrado")
+                monitor.aguardar(timeout=intervalo)
+                continue
+
+            # verifica candidatos que batem no nome (uma única passada de stat para todos)
+            candidatos = [Path(origem_dir) / nome for nome in monitor.arquivos()
+                          if nome not in encontrados]
+            for caminho in tracker.atualizar(candidatos):
+                encontrados[caminho.name] = caminho
+                log(f"Arquivo estável detectado: {caminho.name}")
+            for caminho in candidatos:
+                if caminho.name not in encontrados and caminho.name not in em_escrita:
+                    em_escrita.add(caminho.name)
+                    log(f"Arquivo ainda em escrita ou instável: {caminho.name}")
 
-        # verifica candidatos que batem no nome
-        candidatos = [f for f in nomes if _eh_nome_backup(f, padrao)]
-        # checa estabilidade e adiciona aos encontrados se estáveis
-        for nome in candidatos:
-            if nome in encontrados:
-                continue  # já verificado como estável
-            caminho = Path(origem_dir) / nome
-            if _arquivo_estavel(caminho, intervalo=5):
-                encontrados[nome] = caminho
-                log(f"Arquivo estável detectado: {nome}")
-            else:
-                log(f"Arquivo ainda em escrita ou instável: {nome}")
-
-        if len(encontrados) >= esperado:
-            lista = sorted(encontrados.keys())
-            log(f"Detectados {len(lista)} arquivos de backup estáveis: {lista}")
-            return lista  # retorna lista de nomes (strings)
-        time.sleep(intervalo)
+            if len(encontrados) >= esperado:
+                lista = sorted(encontrados.keys())
+                log(f"Detectados {len(lista)} arquivos de backup estáveis: {lista}")
+                return lista  # retorna lista de nomes (strings)
+            # acorda em criação/fechamento de arquivo ou quando algum candidato completar a janela
+            monitor.aguardar(timeout=tracker.proxima_verificacao(intervalo))
 
     log("Timeout esperando arquivos de backup.")
     return []
 
-def mover_arquivos(origem_dir: str, destino_dir: Path, arquivos: list, log=print):
-    """Move apenas os arquivos .zip válidos, ignorando *_done ou temporários."""
+def mover_arquivos(origem_dir: str, destino_dir: Path, arquivos: list, log=print, cas: ContentStore | None = None,
+                   upload_fluxo=None):
+    """
+    Move apenas os arquivos .zip válidos, ignorando *_done ou temporários,
+    e registra nome/tamanho/mtime/SHA-256 de cada um no manifest.json da pasta.
+    Com `cas`, arquivos idênticos a um backup anterior viram hardlink em vez de cópia.
+    Com `upload_fluxo(nome, tamanho) -> consumidor`, uma cópia entre volumes também envia
+    o zip para a nuvem com os mesmos blocos lidos (uma leitura para cópia, hash e upload).
+    Retorna a lista de caminhos no destino.
+    """
+    movidos = []
+    hashes = {}
+    novos = []  # movidos de fato (ainda não estão no store)
     for nome in arquivos:
         # ignora arquivos temporários
         if nome.lower().endswith("_done.zip") or nome.lower().endswith(".zip_done") or nome.lower().endswith(".zip.part"):
@@ -116,23 +123,243 @@ def mover_arquivos(origem_dir: str, destino_dir: Path, arquivos: list, log=print
                 i += 1
 
         try:
-            shutil.move(str(origem), str(destino))
-            log(f"Arquivo movido: {origem.name} → {destino.name}")
+            if cas is not None:
+                sha256 = cas.procurar_duplicata(origem)
+                if sha256:
+                    cas.armazenar_duplicata(origem, destino, sha256)
+                    log(f"Arquivo idêntico a backup anterior: {origem.name} → {destino.name} (hardlink, nada copiado)")
+                    movidos.append(destino)
+                    hashes[destino.name] = sha256
+                    continue
+
+            # rename no mesmo volume; cópia resumível (.part + checkpoint) entre volumes
+            consumidores = {"upload": upload_fluxo(destino.name, origem.stat().st_size)} if upload_fluxo else None
+            resultado = mover_arquivo(origem, destino, log=log, consumidores=consumidores)
+            movidos.append(destino)
+            novos.append(destino)
+            if resultado:
+                hashes[destino.name] = resultado
+                if isinstance(resultado.get("upload"), Exception):
+                    log(f"⚠️ Upload durante a cópia de {destino.name} falhou ({resultado['upload']}); fica para a fila.")
         except Exception as e:
             log(f"Erro ao mover {origem.name}: {e}")
 
-def gerenciar_backup(backup_dir: str, log=print, esperado_minimo=1) -> Path | None:
+    manifest = None
+    if movidos:
+        try:
+            manifest = registrar_arquivos(destino_dir, movidos, hashes=hashes)
+            log(f"Manifest atualizado em {destino_dir} ({len(movidos)} arquivo(s)).")
+        except Exception as e:
+            log(f"Erro ao gravar manifest em {destino_dir}: {e}")
+
+    if cas is not None and manifest:
+        for caminho in novos:
+            try:
+                cas.adicionar(caminho, manifest["arquivos"][caminho.name]["sha256"])
+            except Exception as e:
+                log(f"⚠️ Não foi possível registrar {caminho.name} no armazenamento deduplicado: {e}")
+        log(cas.relatorio())
+    return movidos
+
+def retomar_copias_interrompidas(backup_dir, hoje: Path | None = None, log=print, dias: int = 7) -> list[Path]:
+    """
+    Uma cópia entre volumes que caiu deixa `.part` + `.part.json` na pasta do dia; a execução
+    do mesmo dia retoma, mas a de um dia seguinte copia para outra pasta e o par ficaria lá.
+    Nas últimas `dias` pastas (menos `hoje`), retoma as cópias cuja origem continua igual à
+    do checkpoint e apaga as outras. Retorna os zips que terminaram de copiar.
+    """
+    retomados = []
+    for data, pasta in listar_pastas_dia(backup_dir)[-dias:]:
+        if pasta == hoje:
+            continue
+        movidos = []
+        for destino, origem in copias_interrompidas(pasta):
+            if origem is None:
+                descartar_parcial(destino)
+                log(f"🧹 Cópia interrompida descartada: {destino.name} em {pasta}")
+                continue
+            try:
+                resultado = mover_arquivo(origem, destino, log=log)
+                descartar_parcial(destino)  # se o volume mudou e o mover foi um rename
+                registrar_arquivos(pasta, [destino], hashes={destino.name: resultado} if resultado else None)
+                movidos.append(destino)
+            except Exception as e:
+                log(f"⚠️ Não foi possível retomar a cópia de {origem.name} para {pasta}: {e}")
+        if not movidos:
+            continue
+        retomados += movidos
+        try:
+            BackupCatalog(backup_dir).registrar_pasta(data, pasta, carregar_manifest(pasta))
+            if conf.get("uploadAutomatico", False):
+                UploadQueue(backup_dir).enfileirar(movidos, data)
+        except Exception as e:
+            log(f"⚠️ Falha ao registrar as cópias retomadas em {pasta}: {e}")
+    return retomados
+
+def _pastas_nao_enviadas(backup_dir) -> set[Path]:
+    """
+    Pastas de dia que ainda não estão na nuvem: as que têm arquivos na fila de upload e,
+    com upload configurado ("uploadAutomatico" ou "armazenamentoRemoto"), as que o
+    catálogo não marca como totalmente enviadas. Os dias de antes do manifest saem daqui
+    quando o agendador da fila os confere com o destino (ou os envia).
+    """
+    nao_enviadas = set()
+    if (Path(backup_dir) / FILA_NOME).exists():
+        nao_enviadas |= UploadQueue(backup_dir).pastas_pendentes()
+    if conf.get("uploadAutomatico", False) or conf.get("armazenamentoRemoto"):
+        catalogo = BackupCatalog(backup_dir)
+        catalogo.completar()  # pastas de antes do manifest: os zips do disco contam como pendentes
+        enviadas = catalogo.pastas_enviadas()
+        nao_enviadas |= {pasta for _data, pasta in listar_pastas_dia(backup_dir) if pasta not in enviadas}
+    return nao_enviadas
+
+_manutencao_lock = threading.Lock()
+
+def _manutencao(backup_dir, destino: Path, log=print):
+    """
+    Recompressão, armazenamento em blocos e retenção dos dias anteriores a `destino`, em
+    sequência: a coleta de blocos da retenção não pode rodar no meio de uma compactação.
+    Só mexe em dias que já estão na nuvem (ver `_pastas_nao_enviadas`); a retenção nunca
+    apaga os que não estão.
+    """
+    if not _manutencao_lock.acquire(blocking=False):
+        log("ℹ️ A manutenção da execução anterior ainda está em andamento; esta fica para a próxima.")
+        return
+    try:
+        try:
+            nao_enviadas = _pastas_nao_enviadas(backup_dir)
+        except Exception as e:
+            log(f"⚠️ Não foi possível saber o que já está na nuvem; a manutenção fica para a próxima: {e}")
+            return
+        anteriores = [pasta for _data, pasta in listar_pastas_dia(backup_dir)
+                      if pasta != destino and pasta not in nao_enviadas]
+
+        # recompressão (config "recompressao": {"formato": "xz"|"zstd", "nivel": N, "nucleos": N})
+        # dos dias anteriores já enviados; o dia atual fica como o Clipp gerou
+        recompressao = conf.get("recompressao")
+        if recompressao:
+            with fase("recompressao", pastas=len(anteriores)):
+                for pasta in anteriores:
+                    try:
+                        recomprimir_pasta(pasta, formato=recompressao.get("formato", "xz"),
+                                          nivel=int(recompressao.get("nivel", 6)),
+                                          nucleos=recompressao.get("nucleos"), log=log)
+                    except Exception as e:
+                        log(f"⚠️ Falha na recompressão de {pasta}: {e}")
+
+        # armazenamento em blocos (config "armazenamentoChunks"): o dia atual fica completo,
+        # os anteriores já enviados viram receitas que reconstroem o zip byte a byte
+        if conf.get("armazenamentoChunks", False):
+            with fase("chunks", pastas=len(anteriores)):
+                try:
+                    store = ChunkStore(Path(backup_dir) / CHUNKS_DIR)
+                    liberados = 0
+                    for pasta in anteriores:
+                        liberados += compactar_pasta(store, pasta, log=log)
+                    if liberados > 0:
+                        log(f"🧩 Armazenamento em blocos: {liberados / 1024**2:.1f} MB liberados.")
+                except Exception as e:
+                    log(f"⚠️ Falha no armazenamento em blocos: {e}")
+
+        # retenção GFS (config "retencao": {"diarios": N, "semanais": M, "mensais": K});
+        # o que ainda não está na nuvem nunca é apagado
+        politica = conf.get("retencao")
+        if politica:
+            try:
+                aplicar_retencao(backup_dir, log=log, dry_run=bool(politica.get("dryRun", False)),
+                                 em_segundo_plano=False, protegidas=nao_enviadas,
+                                 **{k: int(politica.get(k, 0)) for k in ("diarios", "semanais", "mensais")})
+            except Exception as e:
+                log(f"⚠️ Falha ao aplicar retenção: {e}")
+    finally:
+        _manutencao_lock.release()
+
+@medida("gerenciar_backup", ok=lambda destino: destino is not None)
+def gerenciar_backup(backup_dir: str, log=print, esperado_minimo=1, deduplicar: bool | None = None) -> Path | None:
     """
     Cria a pasta do dia, aguarda a geração dos arquivos de backup e os move.
-    Retorna o Path da pasta de destino ou None em caso de erro.
+    `deduplicar` (padrão: config "deduplicarBackups") liga o armazenamento por conteúdo.
+    Retorna o Path da pasta de destino, ou None em caso de erro: nenhum arquivo gerado,
+    algum que não foi movido ou zip corrompido (os passos seguintes rodam mesmo assim).
     """
     destino = criar_pasta_backup(backup_dir)
-    arquivos = aguardar_arquivos_backup(backup_dir, log=log, esperado=esperado_minimo)
+    # o dia é o da pasta criada no início: uma execução que passa da meia-noite continua nele
+    data_backup = data_da_pasta(destino.name)
+    # antes de aguardar: uma origem retomada sai da pasta de backups e não é pega de novo
+    try:
+        retomar_copias_interrompidas(backup_dir, hoje=destino, log=log)
+    except Exception as e:
+        log(f"⚠️ Falha ao procurar cópias interrompidas: {e}")
+    with fase("aguardar_arquivos"):
+        arquivos = aguardar_arquivos_backup(backup_dir, log=log, esperado=esperado_minimo)
 
     if not arquivos:
         return None
 
-    mover_arquivos(backup_dir, destino, arquivos, log=log)
-    log(f"✅ Backup concluído e armazenado em: {destino}")
-    return destino
+    if deduplicar is None:
+        deduplicar = conf.get("deduplicarBackups", False)
+    cas = None
+    if deduplicar:
+        try:
+            cas = ContentStore(Path(backup_dir) / CAS_DIR, log=log)
+        except Exception as e:
+            log(f"⚠️ Armazenamento deduplicado indisponível: {e}")
+
+    # upload junto com a cópia entre volumes (config "uploadDuranteCopia"); o que não subir
+    # assim continua na fila de upload
+    upload_fluxo = None
+    if conf.get("uploadAutomatico", False) and conf.get("uploadDuranteCopia", False):
+        try:
+            from upload_nuvem import fabrica_upload_fluxo
+            upload_fluxo = fabrica_upload_fluxo(data=data_backup)
+        except Exception as e:
+            log(f"⚠️ Upload durante a cópia indisponível: {e}")
+
+    with fase("mover", arquivos=len(arquivos)):
+        movidos = mover_arquivos(backup_dir, destino, arquivos, log=log, cas=cas, upload_fluxo=upload_fluxo)
+    # temporários (_done, .part) são descartados de propósito; os outros têm que ter chegado
+    esperados = [nome for nome in arquivos if not nome.lower().endswith(("_done.zip", ".zip_done", ".zip.part"))]
+    falhou = len(movidos) < len(esperados)
+    if falhou:
+        log(f"❌ {len(esperados) - len(movidos)} de {len(esperados)} arquivo(s) de backup não foram movidos para {destino}")
+    else:
+        log(f"✅ Backup concluído e armazenado em: {destino}")
+
+    # CRC de todas as entradas, em paralelo; resultado no log e no manifest
+    if movidos and conf.get("verificarZips", True):
+        with fase("verificar_zips"):
+            try:
+                resultados = verificar_pasta(destino, movidos, log=log)
+                if not all(r["ok"] for r in resultados.values()):
+                    falhou = True
+                    log(f"⚠️ Há zips corrompidos em {destino} — verifique antes de depender deste backup.")
+            except Exception as e:
+                log(f"⚠️ Falha ao verificar integridade dos zips: {e}")
+
+    # catálogo incremental: consultas de "último backup" não precisam mais varrer o disco
+    with fase("catalogo"):
+        try:
+            catalogo = BackupCatalog(backup_dir)
+            if catalogo.vazio():
+                catalogo.sincronizar()
+            catalogo.registrar_pasta(data_backup, destino, carregar_manifest(destino))
+        except Exception as e:
+            log(f"⚠️ Falha ao atualizar o catálogo de backups: {e}")
+
+    # fila persistente de upload (config "uploadAutomatico"): o agendador em background envia
+    # e, se falhar, tenta de novo com backoff — mesmo depois de reiniciar o bot
+    if movidos and conf.get("uploadAutomatico", False):
+        with fase("fila_upload"):
+            try:
+                fila = UploadQueue(backup_dir)
+                fila.enfileirar(movidos, data_backup)
+                log(fila.relatorio())
+            except Exception as e:
+                log(f"⚠️ Falha ao enfileirar o upload: {e}")
+
+    # recompressão, armazenamento em blocos e retenção ficam numa thread própria: a automação não espera por eles
+    if conf.get("recompressao") or conf.get("armazenamentoChunks", False) or conf.get("retencao"):
+        threading.Thread(target=contextvars.copy_context().run, args=(_manutencao, backup_dir, destino, log),
+                         daemon=True, name="ManutencaoBackup").start()
+    return None if falhou else destino
 
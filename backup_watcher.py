@@ -1,7 +1,10 @@
-import time, threading, pyautogui, traceback, json, os
+import time, threading, pyautogui, traceback, json, os, contextvars
 from datetime import datetime
 from pathlib import Path
 from utils import log, salvar_screenshot, find_and_click_information_ok, APPDATA, LOG_DIR
+from monitor_arquivos import FileArrivalMonitor, CRIADO, FECHADO, REMOVIDO
+from estabilidade import StabilityTracker
+from fases import abrir_fase
 
 class BackupWatcher:
     """
@@ -11,8 +14,9 @@ class BackupWatcher:
     - Ajusta dinamicamente o timeout com base no tempo gasto
     """
 
-    def __init__(self, poll_interval: float = 2.0, timeout_total: int = 7200):
+    def __init__(self, poll_interval: float = 2.0, timeout_total: int = 7200, janela_estavel: float = 3.0):
         self.poll_interval = poll_interval
+        self.janela_estavel = janela_estavel
         self.timeout_total = timeout_total
         self._stop_event = threading.Event()
         self._thread = None
@@ -67,7 +71,9 @@ class BackupWatcher:
         if self._thread and self._thread.is_alive():
             return
         self._stop_event.clear()
-        self._thread = threading.Thread(target=self._run, daemon=True, name="BackupWatcher")
+        # a thread herda a execução em andamento (run_id do log)
+        self._thread = threading.Thread(target=contextvars.copy_context().run, args=(self._run,),
+                                        daemon=True, name="BackupWatcher")
         self._thread.start()
         start = time.time()
         while time.time() - start < 3 and not self.running_event.is_set():
@@ -87,12 +93,17 @@ class BackupWatcher:
         log(f"🧩 BackupWatcher iniciado (timeout atual: {self.timeout_total}s).")
         self.inicio_backup = time.time()
         ultimo_check_info = 0  # ← controle para espaçar a verificação da janela "Informação"
+        monitor = None  # FileArrivalMonitor criado quando o diretório de backup existir
+        tracker = StabilityTracker(quiet_window=self.janela_estavel, min_samples=2)
+        # o Clipp gerando o backup até o primeiro zip aparecer; depois, a espera pela estabilidade
+        etapa = abrir_fase("backup_clipp")
 
         try:
             while not self._stop_event.is_set():
                 tempo_decorrido = time.time() - self.inicio_backup
                 if tempo_decorrido > self.timeout_total:
                     log(f"⚠️ Tempo limite de {self.timeout_total}s atingido sem concluir o backup.")
+                    etapa.falhou("timeout")
                     break
 
                 # 🔹 1) Verificar a janela 'Informação' apenas a cada 30 segundos
@@ -130,18 +141,22 @@ class BackupWatcher:
 
                     hoje = datetime.now().strftime("%d%m%Y")
                     padrao = f"CLIPP{hoje}"
-                    arquivos = [f for f in os.listdir(backup_dir)
-                                if f.startswith(padrao) and f.endswith(".zip")]
+                    if monitor is None:
+                        monitor = FileArrivalMonitor(
+                            backup_dir,
+                            filtro=lambda f: f.startswith(padrao) and f.endswith(".zip"),
+                            poll_interval=self.poll_interval,
+                            eventos=(CRIADO, FECHADO, REMOVIDO),
+                        )
+                        monitor.start()
+                    arquivos = monitor.arquivos()
 
                     if arquivos:
-                        estaveis = True
-                        for nome in arquivos:
-                            caminho = backup_dir / nome
-                            tamanho_inicial = caminho.stat().st_size
-                            time.sleep(3)
-                            if not caminho.exists() or caminho.stat().st_size != tamanho_inicial:
-                                estaveis = False
-                                break
+                        if etapa.nome == "backup_clipp":
+                            etapa.encerrar()
+                            etapa = abrir_fase("estabilidade", arquivos=len(arquivos))
+                        # uma passada de stat para todos; estáveis após `janela_estavel` sem mudança
+                        estaveis = len(tracker.atualizar([backup_dir / nome for nome in arquivos])) == len(arquivos)
 
                         if estaveis:
                             duracao = time.time() - self.inicio_backup
@@ -157,7 +172,11 @@ class BackupWatcher:
                 except Exception as e:
                     log(f"⚠️ Erro ao verificar arquivos de backup: {e}")
 
-                time.sleep(self.poll_interval)
+                # acorda na chegada/alteração de um zip; senão segue o ritmo do poll_interval
+                if monitor is not None:
+                    monitor.aguardar(timeout=tracker.proxima_verificacao(self.poll_interval))
+                else:
+                    time.sleep(self.poll_interval)
 
         except Exception as e:
             salvar_screenshot("erro_backupwatcher")
@@ -165,6 +184,9 @@ class BackupWatcher:
             log(traceback.format_exc())
 
         finally:
+            if monitor is not None:
+                monitor.stop()
+            etapa.encerrar(None if self.completed_event.is_set() or etapa.status != "ok" else "interrompido")
             self.running_event.clear()
             log("🟢 BackupWatcher encerrado.")
 
@@ -0,0 +1,108 @@
+# benchmarks/bench_chunk_store.py
+"""
+Benchmark do armazenamento em blocos (chunk_store) sobre uma série sintética de zips.
+
+Simula N dias de backup do Clipp: um zip ZIP_DEFLATED com o banco (páginas de 8 KB
+com registros em texto, comprimíveis como um .FDB) e os XMLs das notas. A cada dia
+algumas páginas do banco são regravadas (a maioria numa região "quente"), o banco
+cresce no fim e entram XMLs novos.
+Mede a razão de armazenamento (bytes dos zips / bytes gravados no store) e o MB/s
+de ingestão, com os blocos tirados das entradas descomprimidas (o padrão) e do zip
+como está, para comparação.
+
+Uso: python benchmarks/bench_chunk_store.py [dias] [MB do banco]
+"""
+
+import sys, time, random, shutil, tempfile, zipfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from chunk_store import ChunkStore  # noqa: E402
+
+PAGINA = 8192
+NOMES = ["ARROZ", "FEIJAO", "CAFE", "ACUCAR", "OLEO", "LEITE", "SABAO", "FARINHA", "MACARRAO", "SAL"]
+
+
+def _pagina(rnd: random.Random) -> bytes:
+    linhas, tamanho = [], 0
+    while tamanho < PAGINA - 64:
+        linha = (f"{rnd.randrange(10**6):06d};{rnd.choice(NOMES)} {rnd.randrange(1000)};"
+                 f"{rnd.randrange(1, 500)};{rnd.uniform(1, 999):.2f};2026-{rnd.randrange(1, 13):02d}-"
+                 f"{rnd.randrange(1, 29):02d}\n")
+        linhas.append(linha)
+        tamanho += len(linha)
+    return "".join(linhas).encode().ljust(PAGINA, b"\0")
+
+
+def _xml(rnd: random.Random, n: int) -> bytes:
+    itens = "".join(f"<det nItem=\"{i}\"><prod>{rnd.choice(NOMES)}</prod><vProd>{rnd.uniform(1, 99):.2f}</vProd></det>"
+                    for i in range(rnd.randrange(1, 30)))
+    return f"<?xml version=\"1.0\"?><NFe><infNFe Id=\"NFe{n:044d}\">{itens}</infNFe></NFe>".encode()
+
+
+def _gerar_serie(pasta: Path, dias: int, mb: int) -> list[Path]:
+    rnd = random.Random(42)
+    paginas = [_pagina(rnd) for _ in range(mb * 1024 * 1024 // PAGINA)]
+    xmls = {}
+    zips = []
+    for dia in range(dias):
+        if dia:
+            # o movimento do dia regrava ~0,5% das páginas, quase todas nas tabelas "quentes"
+            # (estoque, saldos: os primeiros 5% do banco) e umas poucas espalhadas, e o
+            # banco cresce ~0,5% no fim
+            quentes = max(1, len(paginas) // 20)
+            for _ in range(len(paginas) // 200):
+                paginas[rnd.randrange(quentes)] = _pagina(rnd)
+            for _ in range(len(paginas) // 2000):
+                paginas[rnd.randrange(len(paginas))] = _pagina(rnd)
+            paginas += [_pagina(rnd) for _ in range(len(paginas) // 200)]
+        for _ in range(40):
+            n = len(xmls)
+            xmls[f"XML/{n:06d}-nfe.xml"] = _xml(rnd, n)
+
+        caminho = pasta / f"CLIPP{dia + 1:02d}012026.zip"
+        with zipfile.ZipFile(caminho, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("CLIPP.FDB", b"".join(paginas))
+            for nome, dados in xmls.items():
+                zf.writestr(nome, dados)
+        zips.append(caminho)
+    return zips
+
+
+def _medir(zips: list[Path], raiz: Path, entradas: bool) -> tuple[int, int, float]:
+    store = ChunkStore(raiz)
+    total, novos = 0, 0
+    inicio = time.perf_counter()
+    for caminho in zips:
+        receita = store.ingerir(caminho, entradas=entradas)
+        total += receita["tamanho"]
+        novos += receita["bytes_novos"]
+    duracao = time.perf_counter() - inicio
+
+    receita = store.ingerir(zips[-1], entradas=entradas)
+    assert store.verificar(receita), "reconstrução não confere"
+    restaurado = store.reconstruir(receita, raiz.parent / "restaurado.zip")
+    assert restaurado.read_bytes() == zips[-1].read_bytes()
+    restaurado.unlink()
+    return total, novos, duracao
+
+
+def main():
+    dias = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    mb = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    tmp = Path(tempfile.mkdtemp(prefix="bench_chunks_"))
+    try:
+        zips = _gerar_serie(tmp, dias, mb)
+        total = sum(z.stat().st_size for z in zips)
+        print(f"zips: {dias} dias, banco de {mb} MB no 1º dia; {total / 1024**2:.1f} MB no total (deflate)")
+        for entradas, rotulo in ((True, "entradas descomprimidas"), (False, "zip como está")):
+            total, novos, duracao = _medir(zips, tmp / ("store_entradas" if entradas else "store_zip"), entradas)
+            print(f"{rotulo}: {novos / 1024**2:.1f} MB gravados (razão {total / max(novos, 1):.2f}x), "
+                  f"ingestão {total / 1024**2 / duracao:.1f} MB/s")
+        print("reconstrução byte a byte: OK")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# benchmarks/bench_log.py
+"""
+Benchmark do log: gravação síncrona (abre, acrescenta e fecha o .txt e o .jsonl a
+cada mensagem, como o utils.log fazia) contra o EscritorLog em segundo plano.
+
+Mede a latência de cada chamada de log vista por quem loga (mediana e p99, em µs)
+e a vazão total até tudo estar no disco. O eco no console fica desligado nos dois
+casos, para medir só o custo de gravação.
+
+Uso: python benchmarks/bench_log.py [mensagens]
+"""
+
+import sys, time, uuid, shutil, tempfile, statistics
+from datetime import datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from log_assincrono import EscritorLog, linha_txt, linha_json  # noqa: E402
+
+
+def _sincrono(pasta: Path, sessao: str):
+    txt, jsonl = pasta / "backup_log.txt", pasta / "backup_log.jsonl"
+
+    def log(ts, mensagem, run_id, event):
+        with open(txt, "a", encoding="utf-8") as f:
+            f.write(linha_txt(ts, mensagem))
+        with open(jsonl, "a", encoding="utf-8") as f:
+            f.write(linha_json(ts, mensagem, sessao, run_id, event))
+    return log, lambda: None
+
+
+def _assincrono(pasta: Path, sessao: str):
+    escritor = EscritorLog(pasta / "backup_log.txt", pasta / "backup_log.jsonl", sessao, eco=None)
+    return escritor.registrar, escritor.stop
+
+
+def _medir(nome: str, criar, pasta: Path, n: int) -> dict:
+    pasta.mkdir()
+    sessao = uuid.uuid4().hex
+    log, fechar = criar(pasta, sessao)
+    run_id = uuid.uuid4().hex
+    latencias = []
+    inicio = time.perf_counter()
+    for i in range(n):
+        ts = datetime.now().isoformat(sep=" ", timespec="seconds")
+        t0 = time.perf_counter()
+        log(ts, f"🔎 Verificando estabilidade de CLIPP{i % 7}.zip ({i})", run_id, None)
+        latencias.append(time.perf_counter() - t0)
+    chamadas = time.perf_counter() - inicio
+    fechar()
+    total = time.perf_counter() - inicio
+    linhas = sum(1 for _ in open(pasta / "backup_log.jsonl", encoding="utf-8"))
+    assert linhas == n, f"{nome}: {linhas} linhas gravadas de {n}"
+    latencias.sort()
+    return {"nome": nome, "mediana": statistics.median(latencias) * 1e6,
+            "p99": latencias[int(len(latencias) * 0.99)] * 1e6, "chamadas": chamadas, "total": total}
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    tmp = Path(tempfile.mkdtemp(prefix="bench_log_"))
+    try:
+        medidas = [_medir("síncrono", _sincrono, tmp / "sincrono", n),
+                   _medir("assíncrono", _assincrono, tmp / "assincrono", n)]
+        print(f"mensagens: {n}")
+        for m in medidas:
+            print(f"{m['nome']:>10}: log() mediana {m['mediana']:7.1f} µs, p99 {m['p99']:7.1f} µs; "
+                  f"{n / m['total']:9.0f} msg/s até o disco ({m['total']:.2f}s)")
+        s, a = medidas
+        print(f"assíncrono: log() {s['mediana'] / a['mediana']:.0f}x mais rápido na mediana, "
+              f"vazão {s['total'] / a['total']:.1f}x; nenhuma linha perdida")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# benchmarks/bench_tee.py
+"""
+Benchmark do pipeline_tee: cópia + hash + upload com uma leitura só, contra o
+fluxo em três passadas (cópia entre volumes, hash do destino, upload relendo o
+destino).
+
+O "upload" vai para um DiretorioLocal, então o teste roda sem rede. Mede o tempo
+e os bytes que o processo leu do disco (psutil; inclui leituras via mmap). Antes
+de cada etapa o cache de páginas dos arquivos é descartado quando o SO permite
+(posix_fadvise), para que cada passada seja uma leitura fria, como num HD.
+
+Uso: python benchmarks/bench_tee.py [arquivos] [MB por arquivo]
+"""
+
+import os, sys, time, shutil, tempfile
+from pathlib import Path
+
+import psutil
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from manifest import calcular_hashes  # noqa: E402
+from transferencia import copiar_resumivel  # noqa: E402
+from armazenamento import DiretorioLocal  # noqa: E402
+
+
+def _lidos() -> int:
+    return psutil.Process().io_counters().read_bytes
+
+
+def _descartar_cache(*caminhos):
+    if not hasattr(os, "posix_fadvise"):
+        return
+    for caminho in caminhos:
+        if caminho.exists():
+            fd = os.open(caminho, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
+
+
+def _gerar(pasta: Path, n: int, mb: int) -> list[Path]:
+    arquivos = []
+    for i in range(n):
+        caminho = pasta / f"CLIPP{i:02d}.zip"
+        with open(caminho, "wb") as f:
+            for _ in range(mb):
+                f.write(os.urandom(1024 * 1024))
+        arquivos.append(caminho)
+    return arquivos
+
+
+def _tres_passadas(origens, destino_dir: Path, remoto: DiretorioLocal) -> dict:
+    hashes = {}
+    for origem in origens:
+        destino = destino_dir / origem.name
+        _descartar_cache(origem)
+        shutil.copyfile(origem, destino)          # 1ª leitura: cópia entre volumes
+        _descartar_cache(destino)
+        hashes[origem.name] = calcular_hashes(destino)  # 2ª leitura: hash para o manifest
+        _descartar_cache(destino)
+        remoto.enviar(destino, origem.name, "tres")  # 3ª leitura: upload
+    return hashes
+
+
+def _tee(origens, destino_dir: Path, remoto: DiretorioLocal) -> dict:
+    hashes = {}
+    for origem in origens:
+        destino = destino_dir / origem.name
+        _descartar_cache(origem)
+        tamanho = origem.stat().st_size
+        r = copiar_resumivel(origem, destino, log=lambda *_: None, consumidores={
+            "upload": lambda blocos, nome=origem.name: remoto.enviar_fluxo(blocos, nome, tamanho, "tee"),
+        })
+        if isinstance(r["upload"], Exception):
+            raise r["upload"]
+        hashes[origem.name] = {"sha256": r["sha256"], "md5": r["md5"]}
+    return hashes
+
+
+def _medir(nome: str, fn, *args):
+    lidos, inicio = _lidos(), time.perf_counter()
+    resultado = fn(*args)
+    duracao, lidos = time.perf_counter() - inicio, _lidos() - lidos
+    return nome, duracao, lidos, resultado
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    mb = int(sys.argv[2]) if len(sys.argv) > 2 else 256
+    tmp = Path(tempfile.mkdtemp(prefix="bench_tee_"))
+    try:
+        origens = _gerar(tmp, n, mb)
+        total = n * mb
+        remoto = DiretorioLocal(tmp / "remoto")
+        medidas = []
+        for nome, fn in (("3 passadas", _tres_passadas), ("tee", _tee)):
+            destino_dir = tmp / nome.replace(" ", "_")
+            destino_dir.mkdir()
+            medidas.append(_medir(nome, fn, origens, destino_dir, remoto))
+
+        assert medidas[0][3] == medidas[1][3], "hashes diferentes entre os dois fluxos"
+        for origem in origens:
+            assert (tmp / "remoto" / "tee" / origem.name).read_bytes() == origem.read_bytes()
+
+        print(f"arquivos: {n} x {mb} MB = {total} MB")
+        for nome, duracao, lidos, _ in medidas:
+            print(f"{nome:>10}: {duracao:6.2f}s  {total / duracao:7.1f} MB/s  lidos {lidos / 1024**2:8.1f} MB "
+                  f"({lidos / 1024**2 / total:.2f}x o tamanho)")
+        (_, d3, l3, _), (_, dt, lt, _) = medidas
+        print(f"tee: {l3 / max(lt, 1):.2f}x menos bytes lidos, {d3 / dt:.2f}x mais rápido; hashes e cópia remota conferem")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# cache_remoto.py
+"""
+Cache em disco da listagem remota (nome, tamanho, checksum por pasta da nuvem).
+
+Serve para não reenviar o que já está lá: um arquivo cujo MD5 (e tamanho) já
+existe na pasta remota é pulado sem nenhuma chamada à API. A listagem de cada
+pasta é atualizada de forma incremental (só o que mudou desde a última
+consulta, mais o que o próprio bot enviou) e refeita do zero quando fica velha
+demais ou quando algo não bate com o esperado (`invalidar`).
+"""
+
+import os, json, time, threading
+from pathlib import Path
+
+IDADE_MAXIMA = 24 * 3600       # listagem completa refeita após 1 dia
+INTERVALO_INCREMENTAL = 10 * 60  # abaixo disso o cache é usado sem consultar a nuvem
+
+
+class RemoteManifestCache:
+    """
+    `listar(id_pasta, desde: float | None) -> list[dict]` consulta a nuvem e devolve
+    [{"id", "nome", "tamanho", "md5"}]; com `desde` (epoch), só o que mudou depois disso.
+    """
+
+    def __init__(self, caminho, listar, idade_maxima: float = IDADE_MAXIMA,
+                 intervalo_incremental: float = INTERVALO_INCREMENTAL):
+        self.caminho = Path(caminho)
+        self.listar = listar
+        self.idade_maxima = idade_maxima
+        self.intervalo_incremental = intervalo_incremental
+        self._lock = threading.Lock()
+        self._dados = self._ler()
+
+    def _ler(self) -> dict:
+        try:
+            dados = json.loads(self.caminho.read_text(encoding="utf-8"))
+            if isinstance(dados.get("pastas"), dict):
+                return dados
+        except Exception:
+            pass
+        return {"versao": 1, "pastas": {}}
+
+    def _gravar(self):
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.caminho.with_name(self.caminho.name + ".tmp")
+        tmp.write_text(json.dumps(self._dados, indent=2, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.caminho)
+
+    def _atualizar(self, id_pasta: str) -> dict:
+        """Listagem da pasta, consultando a nuvem só quando necessário (chamado com o lock)."""
+        agora = time.time()
+        pasta = self._dados["pastas"].get(id_pasta)
+        if pasta and agora - pasta.get("completa_em", 0) < self.idade_maxima:
+            if agora - pasta.get("consultada_em", 0) < self.intervalo_incremental:
+                return pasta
+            # margem de 1 min para diferenças de relógio entre a máquina e o servidor
+            for item in self.listar(id_pasta, pasta["consultada_em"] - 60):
+                pasta["arquivos"][item["nome"]] = {k: item.get(k) for k in ("id", "nome", "tamanho", "md5")}
+            pasta["consultada_em"] = agora
+        else:
+            pasta = {
+                "completa_em": agora,
+                "consultada_em": agora,
+                "arquivos": {item["nome"]: item for item in self.listar(id_pasta, None)},
+            }
+            self._dados["pastas"][id_pasta] = pasta
+        self._gravar()
+        return pasta
+
+    def arquivos(self, id_pasta: str) -> dict:
+        """{nome: {"id", "nome", "tamanho", "md5"}} da pasta remota."""
+        with self._lock:
+            return dict(self._atualizar(id_pasta)["arquivos"])
+
+    def ja_enviado(self, id_pasta: str, nome: str, tamanho: int, md5: str) -> bool:
+        """
+        True se a pasta remota já tem um arquivo com este MD5 e tamanho. Se existir um
+        arquivo com o mesmo nome e checksum diferente, a listagem é invalidada (pode
+        estar desatualizada) e a próxima consulta a refaz do zero.
+        """
+        with self._lock:
+            arquivos = self._atualizar(id_pasta)["arquivos"]
+            mesmo_nome = arquivos.get(nome)
+            if mesmo_nome and (mesmo_nome.get("md5") != md5 or mesmo_nome.get("tamanho") != tamanho):
+                self._invalidar(id_pasta)
+                return False
+            return any(a.get("md5") == md5 and a.get("tamanho") == tamanho for a in arquivos.values())
+
+    def registrar(self, id_pasta: str, item: dict):
+        """
+        Acrescenta um arquivo recém-enviado (e já verificado) à listagem, sem nova consulta à
+        nuvem. Sem MD5 do destino (S3 multipart), vale o MD5 dos bytes enviados.
+        """
+        with self._lock:
+            pasta = self._dados["pastas"].get(id_pasta)
+            if pasta is None:
+                return  # sem listagem base; a próxima consulta vai trazê-lo
+            pasta["arquivos"][item["nome"]] = {**{k: item.get(k) for k in ("id", "nome", "tamanho")},
+                                              "md5": item.get("md5") or item.get("md5_lido")}
+            self._gravar()
+
+    def _invalidar(self, id_pasta: str | None):
+        if id_pasta is None:
+            self._dados["pastas"].clear()
+        else:
+            self._dados["pastas"].pop(id_pasta, None)
+        self._gravar()
+
+    def invalidar(self, id_pasta: str | None = None):
+        """Descarta a listagem de `id_pasta` (ou de todas)."""
+        with self._lock:
+            self._invalidar(id_pasta)
@@ -0,0 +1,216 @@
+# catalogo.py
+"""
+Catálogo SQLite da árvore de backups (<backupDir>/.catalogo.sqlite3).
+
+Mantido incrementalmente pelo gerenciar_backup: uma linha por pasta de dia e uma
+por arquivo (tamanho, sha256, estado do upload). Consultas como "último backup",
+"backup do dia X" ou "backups entre A e B" respondem em milissegundos sem
+varrer o disco. Se o catálogo estiver vazio, `sincronizar()` o reconstrói a
+partir da árvore e dos manifest.json. Zips que nenhum manifest conhece (pastas de
+antes do manifest) entram com tamanho e mtime do disco; os hashes ficam para
+quando alguém precisar deles.
+"""
+
+import os, sqlite3, threading
+from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+from arvore_backup import listar_pastas_dia
+from manifest import carregar_manifest
+
+CATALOGO_NOME = ".catalogo.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pastas (
+    data TEXT PRIMARY KEY,
+    caminho TEXT NOT NULL,
+    atualizado_em TEXT
+);
+CREATE TABLE IF NOT EXISTS arquivos (
+    data TEXT NOT NULL REFERENCES pastas(data) ON DELETE CASCADE,
+    nome TEXT NOT NULL,
+    tamanho INTEGER,
+    mtime REAL,
+    sha256 TEXT,
+    md5 TEXT,
+    upload_estado TEXT NOT NULL DEFAULT 'pendente',
+    upload_em TEXT,
+    PRIMARY KEY (data, nome)
+);
+CREATE INDEX IF NOT EXISTS idx_arquivos_upload ON arquivos(upload_estado, data);
+"""
+
+_lock = threading.Lock()
+
+
+class BackupCatalog:
+    def __init__(self, base_dir, caminho_db=None):
+        self.base_dir = Path(base_dir)
+        self.caminho_db = Path(caminho_db) if caminho_db else self.base_dir / CATALOGO_NOME
+        with self._conectar() as con:
+            con.executescript(_SCHEMA)
+            colunas = {linha[1] for linha in con.execute("PRAGMA table_info(arquivos)")}
+            if "md5" not in colunas:  # catálogos criados antes da coluna md5
+                con.execute("ALTER TABLE arquivos ADD COLUMN md5 TEXT")
+
+    @contextmanager
+    def _conectar(self):
+        with _lock:
+            con = sqlite3.connect(self.caminho_db, timeout=10)
+            try:
+                con.execute("PRAGMA foreign_keys = ON")
+                yield con
+                con.commit()
+            finally:
+                con.close()
+
+    # --- Escrita ---
+    def registrar_pasta(self, data: date, pasta, manifest: dict | None = None):
+        """Insere/atualiza a pasta do dia e seus arquivos (a partir do manifest)."""
+        with self._conectar() as con:
+            self._registrar(con, data, Path(pasta), manifest)
+
+    @staticmethod
+    def _zips_fora_do_manifest(pasta: Path, conhecidos: set) -> list[dict]:
+        entradas = []
+        try:
+            with os.scandir(pasta) as it:
+                for e in it:
+                    if e.name in conhecidos or not e.name.lower().endswith(".zip") or not e.is_file():
+                        continue
+                    st = e.stat()
+                    entradas.append({"nome": e.name, "tamanho": st.st_size, "mtime": st.st_mtime})
+        except OSError:
+            pass
+        return entradas
+
+    @classmethod
+    def _registrar(cls, con, data: date, pasta: Path, manifest: dict | None):
+        manifest = manifest if manifest is not None else carregar_manifest(pasta)
+        entradas = list(manifest.get("arquivos", {}).values())
+        entradas += cls._zips_fora_do_manifest(pasta, {e["nome"] for e in entradas})
+        chave = data.isoformat()
+        con.execute(
+            "INSERT INTO pastas(data, caminho, atualizado_em) VALUES (?, ?, ?) "
+            "ON CONFLICT(data) DO UPDATE SET caminho = excluded.caminho, atualizado_em = excluded.atualizado_em",
+            (chave, str(pasta), datetime.now().isoformat(timespec="seconds")),
+        )
+        con.executemany(
+            "INSERT INTO arquivos(data, nome, tamanho, mtime, sha256, md5) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(data, nome) DO UPDATE SET tamanho = excluded.tamanho, mtime = excluded.mtime, "
+            # hash desconhecido de um lado e mesmo tamanho: o mesmo arquivo, agora com ou sem manifest
+            "sha256 = CASE WHEN excluded.sha256 IS NULL AND arquivos.tamanho IS excluded.tamanho "
+            "THEN arquivos.sha256 ELSE excluded.sha256 END, md5 = COALESCE(excluded.md5, arquivos.md5), "
+            "upload_estado = CASE WHEN arquivos.sha256 IS excluded.sha256 OR ((arquivos.sha256 IS NULL "
+            "OR excluded.sha256 IS NULL) AND arquivos.tamanho IS excluded.tamanho) "
+            "THEN arquivos.upload_estado ELSE 'pendente' END",
+            [(chave, e["nome"], e.get("tamanho"), e.get("mtime"), e.get("sha256"), e.get("md5")) for e in entradas],
+        )
+
+    def remover_pasta(self, data: date):
+        with self._conectar() as con:
+            con.execute("DELETE FROM pastas WHERE data = ?", (data.isoformat(),))
+
+    def marcar_upload(self, data: date, nome: str, estado: str = "enviado"):
+        with self._conectar() as con:
+            con.execute(
+                "UPDATE arquivos SET upload_estado = ?, upload_em = ? WHERE data = ? AND nome = ?",
+                (estado, datetime.now().isoformat(timespec="seconds"), data.isoformat(), nome),
+            )
+
+    def marcar_uploads(self, itens, estado: str = "enviado"):
+        """marcar_upload em lote para [(data, nome), ...] (uma transação)."""
+        agora = datetime.now().isoformat(timespec="seconds")
+        with self._conectar() as con:
+            con.executemany(
+                "UPDATE arquivos SET upload_estado = ?, upload_em = ? WHERE data = ? AND nome = ?",
+                [(estado, agora, data.isoformat(), nome) for data, nome in itens],
+            )
+
+    def sincronizar(self):
+        """Reconstrói o catálogo a partir do disco (pastas que sumiram são removidas)."""
+        pastas = listar_pastas_dia(self.base_dir)
+        existentes = {data.isoformat() for data, _ in pastas}
+        with self._conectar() as con:
+            for data, pasta in pastas:
+                self._registrar(con, data, pasta, None)
+            for (chave,) in con.execute("SELECT data FROM pastas").fetchall():
+                if chave not in existentes:
+                    con.execute("DELETE FROM pastas WHERE data = ?", (chave,))
+
+    def completar(self) -> int:
+        """
+        Registra do disco as pastas que estão no catálogo sem nenhum arquivo (catalogadas antes
+        de os zips sem manifest entrarem). Retorna quantas pastas ganharam arquivos.
+        """
+        with self._conectar() as con:
+            vazias = con.execute(
+                "SELECT p.data, p.caminho FROM pastas p WHERE NOT EXISTS "
+                "(SELECT 1 FROM arquivos a WHERE a.data = p.data)"
+            ).fetchall()
+            completadas = 0
+            for chave, caminho in vazias:
+                self._registrar(con, date.fromisoformat(chave), Path(caminho), None)
+                completadas += con.execute("SELECT 1 FROM arquivos WHERE data = ? LIMIT 1", (chave,)).fetchone() is not None
+        return completadas
+
+    # --- Consultas ---
+    def vazio(self) -> bool:
+        with self._conectar() as con:
+            return con.execute("SELECT 1 FROM pastas LIMIT 1").fetchone() is None
+
+    def ultima(self) -> Path | None:
+        with self._conectar() as con:
+            linha = con.execute("SELECT caminho FROM pastas ORDER BY data DESC LIMIT 1").fetchone()
+        return Path(linha[0]) if linha else None
+
+    def por_data(self, data: date) -> Path | None:
+        with self._conectar() as con:
+            linha = con.execute("SELECT caminho FROM pastas WHERE data = ?", (data.isoformat(),)).fetchone()
+        return Path(linha[0]) if linha else None
+
+    def intervalo(self, inicio: date, fim: date) -> list[tuple[date, Path]]:
+        with self._conectar() as con:
+            linhas = con.execute(
+                "SELECT data, caminho FROM pastas WHERE data BETWEEN ? AND ? ORDER BY data",
+                (inicio.isoformat(), fim.isoformat()),
+            ).fetchall()
+        return [(date.fromisoformat(d), Path(c)) for d, c in linhas]
+
+    def arquivos(self, data: date) -> list[dict]:
+        with self._conectar() as con:
+            con.row_factory = sqlite3.Row
+            linhas = con.execute(
+                "SELECT nome, tamanho, mtime, sha256, upload_estado, upload_em FROM arquivos "
+                "WHERE data = ? ORDER BY nome", (data.isoformat(),),
+            ).fetchall()
+        return [dict(l) for l in linhas]
+
+    def arquivos_pendentes(self) -> list[dict]:
+        """Arquivos ainda não enviados, com a pasta de cada um: [{data, pasta, nome, tamanho, md5}]."""
+        with self._conectar() as con:
+            con.row_factory = sqlite3.Row
+            linhas = con.execute(
+                "SELECT a.data, p.caminho AS pasta, a.nome, a.tamanho, a.md5 FROM arquivos a "
+                "JOIN pastas p ON p.data = a.data WHERE a.upload_estado != 'enviado' ORDER BY a.data, a.nome"
+            ).fetchall()
+        return [{**dict(l), "data": date.fromisoformat(l["data"]), "pasta": Path(l["pasta"])} for l in linhas]
+
+    def pastas_enviadas(self) -> set[Path]:
+        """
+        Pastas de dia sem nenhum arquivo por enviar (uma pasta sem zips não tem nada a perder).
+        Chame `completar()` antes: pastas catalogadas sem linhas de arquivo podem ter zips no disco.
+        """
+        with self._conectar() as con:
+            linhas = con.execute(
+                "SELECT p.caminho FROM pastas p WHERE NOT EXISTS "
+                "(SELECT 1 FROM arquivos a WHERE a.data = p.data AND a.upload_estado != 'enviado')"
+            ).fetchall()
+        return {Path(c) for (c,) in linhas}
+
+    def pendentes_upload(self) -> list[tuple[date, str]]:
+        with self._conectar() as con:
+            linhas = con.execute(
+                "SELECT data, nome FROM arquivos WHERE upload_estado != 'enviado' ORDER BY data, nome"
+            ).fetchall()
+        return [(date.fromisoformat(d), n) for d, n in linhas]
@@ -0,0 +1,353 @@
+# chunk_store.py
+"""
+Armazenamento deduplicado por blocos (opcional) para zips CLIPP consecutivos.
+
+Cada zip é dividido em blocos definidos pelo conteúdo (CDC): o corte acontece
+onde o hash de uma janela de 48 bytes atende a uma máscara, então inserir ou
+alterar bytes num ponto só muda os blocos vizinhos e o resto continua igual ao
+do dia anterior. Cada bloco único é gravado uma vez em `<backupDir>/.chunks`;
+o zip vira uma receita `<nome>.chunks.json` (lista de blocos) que reconstrói o
+original byte a byte, conferido pelo SHA-256.
+
+Um hash rolante byte a byte em Python puro não passa de ~3 MB/s; por isso o
+hash da janela (crc32) só é avaliado nas posições de um byte-âncora, achadas
+com mmap.find (em C). O resultado continua dependendo apenas do conteúdo local.
+
+Os zips do Clipp são deflate: uma alteração no meio do banco muda todo o fluxo
+comprimido dali em diante, e blocos do zip cru quase não se repetem entre dias.
+Por isso cada entrada deflate é descomprimida e os blocos saem do conteúdo
+(gravados com zlib nível 1); a receita guarda o nível que reproduz exatamente o fluxo
+original, conferido na ingestão. Cabeçalhos, diretório central e entradas que
+nenhum nível reproduz (outro compressor, criptografia) ficam em blocos crus.
+"""
+
+import os, json, mmap, zlib, struct, hashlib, tempfile, zipfile
+from pathlib import Path
+
+CHUNKS_DIR = ".chunks"
+SUFIXO_RECEITA = ".chunks.json"
+SUFIXO_COMPRIMIDO = ".z"
+
+ANCORA = b"\x5a"
+JANELA = 48
+TAMANHO_MINIMO = 256 * 1024
+TAMANHO_MEDIO = 1024 * 1024
+TAMANHO_MAXIMO = 4 * 1024 * 1024
+
+# 6 é o padrão do zlib (e do zipfile); os outros em ordem de uso provável
+NIVEIS_DEFLATE = (6, 9, 1, 5, 7, 8, 4, 3, 2)
+AMOSTRA_NIVEL = 256 * 1024
+PEDACO = 1024 * 1024
+
+
+def _mascara(minimo: int, medio: int) -> int:
+    # âncoras aparecem ~1 a cada 256 bytes; a máscara espalha os cortes até ~`medio`
+    alvo = max(1, (medio - minimo) // 256)
+    return (1 << max(0, alvo.bit_length() - 1)) - 1
+
+
+def fronteiras(dados, minimo: int = TAMANHO_MINIMO, medio: int = TAMANHO_MEDIO,
+               maximo: int = TAMANHO_MAXIMO, inicio: int = 0, fim: int | None = None):
+    """Gera (inicio, fim) de cada bloco de `dados` (bytes ou mmap), só no trecho [inicio, fim)."""
+    mascara = _mascara(minimo, medio)
+    n = len(dados) if fim is None else fim
+    pos = inicio
+    while pos < n:
+        limite = min(pos + maximo, n)
+        corte = limite
+        i = dados.find(ANCORA, pos + max(minimo, JANELA), limite)
+        while i != -1:
+            if zlib.crc32(dados[i - JANELA + 1:i + 1]) & mascara == 0:
+                corte = i + 1
+                break
+            i = dados.find(ANCORA, i + 1, limite)
+        yield pos, corte
+        pos = corte
+
+
+def _trechos_zip(caminho, tamanho: int, minimo: int = TAMANHO_MINIMO) -> list[tuple[int, int, bool]]:
+    """
+    Divide o zip em trechos (inicio, fim, deflate) que cobrem o arquivo inteiro: os dados
+    comprimidos de cada entrada deflate e, entre eles, o resto (cabeçalhos, diretório
+    central, entradas guardadas e as menores que `minimo`). Se não for um zip legível, um único trecho cru.
+    """
+    cru = [(0, tamanho, False)]
+    try:
+        with zipfile.ZipFile(caminho) as zf:
+            infos = sorted(zf.infolist(), key=lambda i: i.header_offset)
+        trechos, pos = [], 0
+        with open(caminho, "rb") as f:
+            for info in infos:
+                # entradas pequenas (XMLs) já se repetem iguais entre dias nos blocos crus
+                if (info.compress_type != zipfile.ZIP_DEFLATED or info.flag_bits & 0x1
+                        or info.compress_size < minimo):
+                    continue
+                f.seek(info.header_offset)
+                cabecalho = f.read(30)
+                if cabecalho[:4] != b"PK\x03\x04":
+                    return cru
+                nome, extra = struct.unpack("<HH", cabecalho[26:30])
+                inicio = info.header_offset + 30 + nome + extra
+                fim = inicio + info.compress_size
+                if inicio < pos or fim > tamanho:
+                    return cru
+                if inicio > pos:
+                    trechos.append((pos, inicio, False))
+                trechos.append((inicio, fim, True))
+                pos = fim
+        if pos < tamanho:
+            trechos.append((pos, tamanho, False))
+        return trechos
+    except (zipfile.BadZipFile, OSError, struct.error):
+        return cru
+
+
+def _inflar(comprimido, destino) -> int:
+    """Descomprime o fluxo deflate cru `comprimido` em `destino`. Retorna os bytes gravados."""
+    d = zlib.decompressobj(-15)
+    total = 0
+    for i in range(0, len(comprimido), PEDACO):
+        saida = d.decompress(comprimido[i:i + PEDACO])
+        destino.write(saida)
+        total += len(saida)
+    saida = d.flush()
+    destino.write(saida)
+    if not d.eof or d.unused_data:
+        raise zlib.error("fluxo deflate incompleto")
+    return total + len(saida)
+
+
+def _reproduz(nivel: int, dados, comprimido) -> bool:
+    """True se comprimir `dados` no `nivel` gera exatamente `comprimido`."""
+    c = zlib.compressobj(nivel, zlib.DEFLATED, -15)
+    pos = 0
+    for i in range(0, len(dados), PEDACO):
+        saida = c.compress(dados[i:i + PEDACO])
+        if comprimido[pos:pos + len(saida)] != saida:
+            return False
+        pos += len(saida)
+    saida = c.flush()
+    return pos + len(saida) == len(comprimido) and comprimido[pos:] == saida
+
+
+def _nivel_deflate(dados, comprimido) -> int | None:
+    """Nível do zlib que reproduz `comprimido` a partir de `dados`, ou None."""
+    amostra = dados[:AMOSTRA_NIVEL]
+    for nivel in NIVEIS_DEFLATE:
+        # o início da saída já descarta quase todos os níveis errados sem comprimir tudo
+        saida = zlib.compressobj(nivel, zlib.DEFLATED, -15).compress(amostra)
+        if comprimido[:len(saida)] == saida and _reproduz(nivel, dados, comprimido):
+            return nivel
+    return None
+
+
+class ChunkStore:
+    def __init__(self, raiz, minimo: int = TAMANHO_MINIMO, medio: int = TAMANHO_MEDIO,
+                 maximo: int = TAMANHO_MAXIMO):
+        self.raiz = Path(raiz)
+        self.raiz.mkdir(parents=True, exist_ok=True)
+        self.minimo, self.medio, self.maximo = minimo, medio, maximo
+
+    def _bloco(self, sha256: str) -> Path:
+        return self.raiz / sha256[:2] / sha256
+
+    def _gravar_bloco(self, sha256: str, dados, comprimir: bool = False) -> int:
+        """Grava o bloco se ainda não existir. Retorna os bytes gravados (0 se já existia)."""
+        caminho = self._bloco(sha256)
+        comprimido = caminho.with_name(sha256 + SUFIXO_COMPRIMIDO)
+        if caminho.exists() or comprimido.exists():
+            return 0
+        if comprimir:
+            dados, caminho = zlib.compress(dados, 1), comprimido
+        caminho.parent.mkdir(exist_ok=True)
+        tmp = caminho.with_name(sha256 + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(dados)
+        os.replace(tmp, caminho)
+        return len(dados)
+
+    def _ler_bloco(self, sha256: str, tamanho: int) -> bytes:
+        caminho = self._bloco(sha256)
+        if caminho.exists():
+            dados = caminho.read_bytes()
+        else:
+            dados = zlib.decompress(caminho.with_name(sha256 + SUFIXO_COMPRIMIDO).read_bytes())
+        if len(dados) != tamanho:
+            raise IOError(f"bloco {sha256} corrompido ({len(dados)} de {tamanho} bytes)")
+        return dados
+
+    def _ingerir_trecho(self, dados, inicio: int, fim: int, comprimir: bool, blocos: list) -> int:
+        bytes_novos = 0
+        for a, b in fronteiras(dados, self.minimo, self.medio, self.maximo, inicio, fim):
+            bloco = dados[a:b]
+            sha256 = hashlib.sha256(bloco).hexdigest()
+            bytes_novos += self._gravar_bloco(sha256, bloco, comprimir)
+            blocos.append([sha256, len(bloco)])
+        return bytes_novos
+
+    def _ingerir_deflate(self, mm, inicio: int, fim: int, blocos: list) -> tuple[int | None, int]:
+        """
+        Blocos do conteúdo descomprimido de mm[inicio:fim], se algum nível do zlib reproduz o
+        fluxo original. Retorna (nível, bytes novos), ou (None, 0) sem gravar nada.
+        """
+        comprimido = memoryview(mm)[inicio:fim]
+        try:
+            with tempfile.TemporaryFile(dir=self.raiz) as tmp:
+                try:
+                    if not _inflar(comprimido, tmp):
+                        return None, 0
+                except zlib.error:
+                    return None, 0
+                tmp.flush()
+                with mmap.mmap(tmp.fileno(), 0, access=mmap.ACCESS_READ) as dados:
+                    nivel = _nivel_deflate(dados, comprimido)
+                    if nivel is None:
+                        return None, 0
+                    return nivel, self._ingerir_trecho(dados, 0, len(dados), True, blocos)
+        finally:
+            comprimido.release()
+
+    def ingerir(self, caminho, entradas: bool = True) -> dict:
+        """
+        Divide `caminho` em blocos, grava os inéditos e retorna a receita:
+        {"nome", "tamanho", "sha256", "blocos": [[sha256, tamanho], ...], "partes", "bytes_novos"}.
+        `partes` é [[nível ou None, nº de blocos], ...] em sequência: None são bytes do
+        arquivo, um nível são dados a comprimir com o zlib nele. Com `entradas=False` o
+        zip é dividido como está (só blocos crus).
+        """
+        caminho = Path(caminho)
+        total = hashlib.sha256()
+        blocos, partes, bytes_novos = [], [], 0
+        with open(caminho, "rb") as f:
+            tamanho = os.fstat(f.fileno()).st_size
+            if tamanho:
+                trechos = _trechos_zip(caminho, tamanho, self.minimo) if entradas else [(0, tamanho, False)]
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    for inicio, fim, deflate in trechos:
+                        antes = len(blocos)
+                        nivel = None
+                        if deflate:
+                            nivel, novos = self._ingerir_deflate(mm, inicio, fim, blocos)
+                            bytes_novos += novos
+                        if nivel is None:
+                            bytes_novos += self._ingerir_trecho(mm, inicio, fim, False, blocos)
+                        if partes and partes[-1][0] is None and nivel is None:
+                            partes[-1][1] += len(blocos) - antes
+                        else:
+                            partes.append([nivel, len(blocos) - antes])
+                    for i in range(0, tamanho, PEDACO):
+                        total.update(mm[i:i + PEDACO])
+        return {
+            "nome": caminho.name,
+            "tamanho": tamanho,
+            "sha256": total.hexdigest(),
+            "blocos": blocos,
+            "partes": partes,
+            "bytes_novos": bytes_novos,
+        }
+
+    def _ler_blocos(self, receita: dict):
+        """Gera os bytes do arquivo original; receitas sem `partes` são só blocos crus."""
+        blocos = iter(receita["blocos"])
+        for nivel, n in receita.get("partes") or [[None, len(receita["blocos"])]]:
+            if nivel is None:
+                for _ in range(n):
+                    yield self._ler_bloco(*next(blocos))
+                continue
+            c = zlib.compressobj(nivel, zlib.DEFLATED, -15)
+            for _ in range(n):
+                saida = c.compress(self._ler_bloco(*next(blocos)))
+                if saida:
+                    yield saida
+            yield c.flush()
+
+    def verificar(self, receita: dict) -> bool:
+        """Confere se os blocos da receita reconstroem exatamente o SHA-256 original."""
+        h = hashlib.sha256()
+        try:
+            for dados in self._ler_blocos(receita):
+                h.update(dados)
+        except (OSError, IOError, zlib.error):
+            return False
+        return h.hexdigest() == receita["sha256"]
+
+    def reconstruir(self, receita: dict, destino) -> Path:
+        """Remonta o arquivo original em `destino` (atômico) e confere o SHA-256."""
+        destino = Path(destino)
+        tmp = destino.with_name(destino.name + ".part")
+        h = hashlib.sha256()
+        with open(tmp, "wb") as f:
+            for dados in self._ler_blocos(receita):
+                f.write(dados)
+                h.update(dados)
+        if h.hexdigest() != receita["sha256"]:
+            tmp.unlink()
+            raise IOError(f"reconstrução de {receita['nome']} não confere com o SHA-256 original")
+        os.replace(tmp, destino)
+        return destino
+
+    def coletar_lixo(self, receitas) -> int:
+        """Apaga blocos não referenciados por nenhuma das `receitas`. Retorna quantos apagou."""
+        usados = {sha256 for receita in receitas for sha256, _ in receita["blocos"]}
+        apagados = 0
+        for sub in self.raiz.iterdir():
+            if not sub.is_dir():
+                continue
+            for bloco in sub.iterdir():
+                if bloco.name.removesuffix(SUFIXO_COMPRIMIDO) not in usados:
+                    bloco.unlink()
+                    apagados += 1
+        return apagados
+
+
+# --- Integração com a árvore de backups ---
+def receita_de(zip_path) -> Path:
+    """Caminho da receita de blocos que substitui `zip_path`."""
+    zip_path = Path(zip_path)
+    return zip_path.with_name(zip_path.name + SUFIXO_RECEITA)
+
+
+def compactar_pasta(store: ChunkStore, pasta, log=print) -> int:
+    """
+    Troca cada zip da `pasta` por sua receita (após verificar a reconstrução).
+    Retorna os bytes liberados (negativo quando os blocos novos ocupam mais que os zips).
+    """
+    liberados = 0
+    for zip_path in sorted(Path(pasta).glob("*.zip")):
+        receita = store.ingerir(zip_path)
+        if not store.verificar(receita):
+            log(f"⚠️ Blocos de {zip_path.name} não conferem; zip mantido.")
+            continue
+        receita_path = receita_de(zip_path)
+        tmp = receita_path.with_name(receita_path.name + ".tmp")
+        tmp.write_text(json.dumps(receita), encoding="utf-8")
+        os.replace(tmp, receita_path)
+        zip_path.unlink()
+        liberados += receita["tamanho"] - receita["bytes_novos"]
+        log(f"🧩 {zip_path.name} armazenado em blocos: {len(receita['blocos'])} bloco(s), "
+            f"{receita['bytes_novos'] / 1024**2:.1f} de {receita['tamanho'] / 1024**2:.1f} MB novos.")
+    return liberados
+
+
+def restaurar_pasta(store: ChunkStore, pasta, log=print, nomes=None) -> list[Path]:
+    """Reconstrói os zips da `pasta` (ou só os `nomes`) a partir das receitas (sem apagá-las)."""
+    restaurados = []
+    for receita_path in sorted(Path(pasta).glob("*" + SUFIXO_RECEITA)):
+        if nomes is not None and receita_path.name[:-len(SUFIXO_RECEITA)] not in nomes:
+            continue
+        receita = json.loads(receita_path.read_text(encoding="utf-8"))
+        destino = receita_path.with_name(receita["nome"])
+        store.reconstruir(receita, destino)
+        log(f"Zip reconstruído: {destino}")
+        restaurados.append(destino)
+    return restaurados
+
+
+def receitas_da_arvore(pastas) -> list[dict]:
+    """Todas as receitas das `pastas`. Uma receita ilegível gera exceção de propósito:
+    coletar_lixo com a lista incompleta apagaria blocos ainda em uso."""
+    receitas = []
+    for pasta in pastas:
+        for receita_path in Path(pasta).glob("*" + SUFIXO_RECEITA):
+            receitas.append(json.loads(receita_path.read_text(encoding="utf-8")))
+    return receitas
@@ -0,0 +1,115 @@
+# dedup.py
+"""
+Armazenamento endereçado por conteúdo (opcional) para zips de backup idênticos.
+
+Em dias sem movimento (domingos, feriados) o Clipp gera zips byte a byte iguais
+aos do dia anterior. Com o ContentStore cada conteúdo existe uma única vez em
+`<backupDir>/.cas/ab/<sha256>` e as pastas do dia recebem hardlinks para ele:
+um dia duplicado não copia nem ocupa bytes novos.
+"""
+
+import os, json
+from pathlib import Path
+from manifest import calcular_hash
+
+CAS_DIR = ".cas"
+_INDICE = "indice.json"
+
+
+class ContentStore:
+    def __init__(self, raiz, log=print):
+        self.raiz = Path(raiz)
+        self.log = log
+        self.raiz.mkdir(parents=True, exist_ok=True)
+        self._indice_path = self.raiz / _INDICE
+        try:
+            self._indice = json.loads(self._indice_path.read_text(encoding="utf-8"))  # sha256 -> tamanho
+        except Exception:
+            self._indice = {}
+        self.bytes_economizados = 0
+        self.duplicados = 0
+
+    def _blob(self, sha256: str) -> Path:
+        return self.raiz / sha256[:2] / sha256
+
+    def _salvar_indice(self):
+        tmp = self._indice_path.with_name(_INDICE + ".tmp")
+        tmp.write_text(json.dumps(self._indice), encoding="utf-8")
+        os.replace(tmp, self._indice_path)
+
+    def contem(self, sha256: str) -> bool:
+        return sha256 in self._indice and self._blob(sha256).exists()
+
+    def procurar_duplicata(self, caminho) -> str | None:
+        """
+        SHA-256 de `caminho` se já existir um blob igual no store.
+        Só lê o arquivo quando há algum blob com o mesmo tamanho.
+        """
+        tamanho = os.stat(caminho).st_size
+        if tamanho not in self._indice.values():
+            return None
+        sha256 = calcular_hash(caminho)
+        return sha256 if self.contem(sha256) else None
+
+    def vincular(self, sha256: str, destino):
+        """Cria `destino` como hardlink para o blob `sha256`."""
+        destino = Path(destino)
+        tmp = destino.with_name(destino.name + ".lnk.tmp")
+        if tmp.exists():
+            tmp.unlink()
+        os.link(self._blob(sha256), tmp)
+        os.replace(tmp, destino)
+
+    def adicionar(self, caminho, sha256: str) -> bool:
+        """
+        Registra `caminho` no store. Se o conteúdo já existia, `caminho` passa a ser
+        hardlink do blob (e conta como duplicado). Retorna True se deduplicou.
+        """
+        caminho = Path(caminho)
+        blob = self._blob(sha256)
+        if self.contem(sha256):
+            if os.path.samefile(blob, caminho):
+                return False
+            tamanho = caminho.stat().st_size
+            self.vincular(sha256, caminho)
+            self._registrar_economia(tamanho)
+            return True
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        if blob.exists():
+            blob.unlink()  # blob órfão fora do índice
+        os.link(caminho, blob)
+        self._indice[sha256] = caminho.stat().st_size
+        self._salvar_indice()
+        return False
+
+    def _registrar_economia(self, tamanho: int):
+        self.duplicados += 1
+        self.bytes_economizados += tamanho
+
+    def armazenar_duplicata(self, origem, destino, sha256: str):
+        """Usa o blob existente para `destino` e descarta `origem` sem copiar nada."""
+        tamanho = os.stat(origem).st_size
+        self.vincular(sha256, destino)
+        os.remove(origem)
+        self._registrar_economia(tamanho)
+
+    def remover_orfaos(self) -> int:
+        """Apaga blobs que não são mais referenciados por nenhuma pasta (st_nlink == 1)."""
+        removidos = 0
+        for sha256 in list(self._indice):
+            blob = self._blob(sha256)
+            try:
+                if blob.stat().st_nlink > 1:
+                    continue
+                blob.unlink()
+            except FileNotFoundError:
+                pass
+            del self._indice[sha256]
+            removidos += 1
+        if removidos:
+            self._salvar_indice()
+        return removidos
+
+    def relatorio(self) -> str:
+        return (f"Dedup: {self.duplicados} arquivo(s) duplicado(s), "
+                f"{self.bytes_economizados / 1024**2:.1f} MB economizados")
@@ -0,0 +1,72 @@
+# estabilidade.py
+"""
+Decide quando um arquivo de backup terminou de ser escrito.
+
+Em vez de dormir N segundos por arquivo e comparar o tamanho, o StabilityTracker
+guarda o histórico (tamanho, mtime) de todos os candidatos e, a cada passada
+única de os.stat, considera estável quem ficou parado por `quiet_window` segundos
+com pelo menos `min_samples` amostras iguais. O custo de confirmação é o mesmo
+para 1 ou 10 arquivos.
+"""
+
+import os, time
+from pathlib import Path
+
+
+class StabilityTracker:
+    def __init__(self, quiet_window: float = 5.0, min_samples: int = 2):
+        self.quiet_window = quiet_window
+        self.min_samples = max(1, min_samples)
+        # caminho -> [assinatura (tamanho, mtime_ns), desde (monotonic), amostras iguais]
+        self._historico = {}
+
+    def atualizar(self, caminhos) -> list[Path]:
+        """
+        Faz uma amostra de todos os `caminhos` e retorna os que já estão estáveis.
+        Caminhos que sumiram (ou deixaram de ser passados) são esquecidos.
+        """
+        agora = time.monotonic()
+        vistos = set()
+        estaveis = []
+        for caminho in caminhos:
+            caminho = Path(caminho)
+            try:
+                st = os.stat(caminho)
+            except OSError:
+                self._historico.pop(caminho, None)
+                continue
+            vistos.add(caminho)
+            assinatura = (st.st_size, st.st_mtime_ns)
+            registro = self._historico.get(caminho)
+            if registro is None or registro[0] != assinatura:
+                self._historico[caminho] = [assinatura, agora, 1]
+                continue
+            registro[2] += 1
+            if registro[2] >= self.min_samples and agora - registro[1] >= self.quiet_window:
+                estaveis.append(caminho)
+
+        for caminho in list(self._historico):
+            if caminho not in vistos:
+                del self._historico[caminho]
+        return estaveis
+
+    def estavel(self, caminho) -> bool:
+        registro = self._historico.get(Path(caminho))
+        if registro is None:
+            return False
+        return registro[2] >= self.min_samples and time.monotonic() - registro[1] >= self.quiet_window
+
+    def esquecer(self, caminho):
+        self._historico.pop(Path(caminho), None)
+
+    def proxima_verificacao(self, padrao: float) -> float:
+        """
+        Segundos até a próxima amostra útil: quando o candidato mais adiantado
+        completar a janela de silêncio (limitado a `padrao`).
+        """
+        agora = time.monotonic()
+        espera = padrao
+        for _assinatura, desde, _amostras in self._historico.values():
+            espera = min(espera, max(0.0, desde + self.quiet_window - agora))
+        # pequena folga para a próxima amostra já cair fora da janela
+        return min(padrao, espera + 0.05)
@@ -0,0 +1,214 @@
+# fases.py
+"""
+Medição do tempo de cada fase do backup (abrir o Clipp, login, fechar/confirmar,
+backup do Clipp, estabilidade, mover...).
+
+`fase(nome)` (gerenciador de contexto) ou `@medida(nome)` (decorador) marcam um
+trecho; fases abertas dentro de outras, na mesma thread, ficam aninhadas
+("fechar_clipp/alt_f4"). Início e fim de cada fase vão para o log estruturado
+como eventos SPAN_START / SPAN_END com a duração, pela saída registrada em
+`definir_saida` (o utils registra a sua; sem saída, só se mede).
+
+`ExecucaoMedida` junta as fases de todas as threads durante uma execução e, no
+fim, loga um resumo por fase com a mediana das execuções anteriores, marcando o
+que ficou bem mais lento (a primeira linha é o evento SPAN_SUMMARY, com o tempo de
+cada fase nos dados). O histórico fica num JSON (últimas HISTORICO execuções).
+"""
+
+import json, os, threading, time
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from statistics import median
+
+HISTORICO = 10
+LIMIAR_REGRESSAO = 1.5   # fase 50% mais lenta que a mediana...
+MINIMO_REGRESSAO = 2.0   # ...e pelo menos 2 s a mais
+
+_saida = None  # fn(event, mensagem, dados)
+_local = threading.local()
+_lock = threading.Lock()
+_execucoes = []  # ExecucaoMedida em andamento
+
+
+def definir_saida(fn):
+    """`fn(event, mensagem, dados)` recebe os eventos SPAN_* e as linhas do resumo (ex.: o log estruturado)."""
+    global _saida
+    _saida = fn
+
+
+def _emitir(event: str | None, mensagem: str, dados: dict | None):
+    if _saida is not None:
+        try:
+            _saida(event, mensagem, dados)
+        except Exception:
+            pass
+
+
+def _pilha() -> list:
+    pilha = getattr(_local, "pilha", None)
+    if pilha is None:
+        pilha = _local.pilha = []
+    return pilha
+
+
+class Fase:
+    """Um trecho medido. Use `fase`/`medida`; `abrir_fase` + `encerrar` só quando o trecho não cabe num bloco."""
+
+    def __init__(self, nome: str, caminho: str, dados: dict):
+        self.nome = nome
+        self.caminho = caminho
+        self.dados = dados
+        self.status = "ok"
+        self.thread = threading.current_thread().name
+        self.inicio = time.perf_counter()
+        self.duracao = None
+
+    def falhou(self, motivo: str | None = None):
+        self.status = "falha"
+        if motivo:
+            self.dados["motivo"] = motivo
+
+    def encerrar(self, status: str | None = None) -> float:
+        if self.duracao is not None:
+            return self.duracao
+        self.duracao = time.perf_counter() - self.inicio
+        if status:
+            self.status = status
+        pilha = _pilha()
+        if self in pilha:
+            pilha.remove(self)
+        _emitir("SPAN_END", f"⏱️ {self.caminho}: {self.duracao:.2f}s ({self.status})",
+                {"fase": self.caminho, "duracao_s": round(self.duracao, 3), "status": self.status,
+                 "thread": self.thread, **self.dados})
+        with _lock:
+            for execucao in _execucoes:
+                execucao.fases.append(self)
+        return self.duracao
+
+
+def abrir_fase(nome: str, **dados) -> Fase:
+    pilha = _pilha()
+    caminho = "/".join([*(f.nome for f in pilha), nome])
+    f = Fase(nome, caminho, dados)
+    pilha.append(f)
+    _emitir("SPAN_START", f"⏱️ {caminho} iniciada", {"fase": caminho, "thread": f.thread, **dados})
+    return f
+
+
+@contextmanager
+def fase(nome: str, **dados):
+    f = abrir_fase(nome, **dados)
+    try:
+        yield f
+    except BaseException as e:
+        f.falhou(type(e).__name__)
+        raise
+    finally:
+        f.encerrar()
+
+
+def medida(nome: str, ok=None):
+    """Decorador: mede cada chamada como a fase `nome`; com `ok(resultado) -> bool`, um resultado ruim marca falha."""
+    def decorador(fn):
+        @wraps(fn)
+        def medir(*args, **kwargs):
+            with fase(nome) as f:
+                resultado = fn(*args, **kwargs)
+                if ok is not None and not ok(resultado):
+                    f.falhou()
+                return resultado
+        return medir
+    return decorador
+
+
+class ExecucaoMedida:
+    """Junta as fases encerradas (em qualquer thread) enquanto estiver aberta e loga o resumo no fim."""
+
+    def __init__(self, nome: str, historico=None):
+        self.nome = nome
+        self.historico = Path(historico) if historico else None
+        self.fases: list[Fase] = []
+        self.status = None  # resultado da execução, se quem mede quiser mostrar no resumo
+        self.inicio = None
+        self.duracao = None
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        with _lock:
+            _execucoes.append(self)
+        return self
+
+    def __exit__(self, tipo, valor, tb):
+        self.duracao = time.perf_counter() - self.inicio
+        if tipo is not None:
+            self.status = tipo.__name__
+        with _lock:
+            _execucoes.remove(self)
+        try:
+            anteriores = self._carregar_historico()
+            linhas = self.resumo(anteriores)
+            totais = {c: round(t["duracao"], 3) for c, t in self.totais().items()}
+            _emitir("SPAN_SUMMARY", linhas[0], {"execucao": self.nome, "duracao_s": round(self.duracao, 3),
+                                                "status": self.status, "fases": totais})
+            for linha in linhas[1:]:
+                _emitir(None, linha, None)
+            self._salvar_historico(anteriores)
+        except Exception as e:
+            _emitir(None, f"⚠️ Não foi possível montar o resumo das fases: {e}", None)
+        return False
+
+    def totais(self) -> dict:
+        """{caminho: {"duracao", "vezes", "falhas", "inicio"}} na ordem em que cada fase começou."""
+        totais = {}
+        for f in sorted(self.fases, key=lambda f: f.inicio):
+            t = totais.setdefault(f.caminho, {"duracao": 0.0, "vezes": 0, "falhas": 0, "inicio": f.inicio})
+            t["duracao"] += f.duracao
+            t["vezes"] += 1
+            t["falhas"] += f.status != "ok"
+        return totais
+
+    def resumo(self, anteriores: dict | None = None) -> list[str]:
+        anteriores = anteriores or {}
+        totais = self.totais()
+        cabecalho = f"{self.nome}, {self.duracao:.1f}s" + (f", {self.status}" if self.status else "")
+        linhas = [f"⏱️ Resumo das fases ({cabecalho}):"]
+        for caminho, t in totais.items():
+            nivel = caminho.count("/")
+            nome = caminho.rsplit("/", 1)[-1]
+            texto = f"{'  ' * (nivel + 1)}{nome:<{max(8, 28 - 2 * nivel)}} {t['duracao']:8.1f}s {100 * t['duracao'] / max(self.duracao, 1e-9):4.0f}%"
+            if t["vezes"] > 1:
+                texto += f"  ({t['vezes']}x)"
+            if t["falhas"]:
+                texto += f"  ❌ {t['falhas']} falha(s)"
+            historico = anteriores.get(caminho)
+            if historico:
+                m = median(historico)
+                texto += f"  (mediana {m:.1f}s)"
+                if t["duracao"] > m * LIMIAR_REGRESSAO and t["duracao"] - m > MINIMO_REGRESSAO:
+                    texto += f"  ⚠️ +{100 * (t['duracao'] / max(m, 1e-9) - 1):.0f}%"
+            linhas.append(texto)
+        return linhas
+
+    def _carregar_historico(self) -> dict:
+        if not self.historico or not self.historico.exists():
+            return {}
+        try:
+            return json.loads(self.historico.read_text(encoding="utf-8")).get(self.nome, {})
+        except Exception:
+            return {}
+
+    def _salvar_historico(self, anteriores: dict):
+        if not self.historico:
+            return
+        try:
+            dados = json.loads(self.historico.read_text(encoding="utf-8")) if self.historico.exists() else {}
+        except Exception:
+            dados = {}
+        for caminho, t in self.totais().items():
+            anteriores[caminho] = (anteriores.get(caminho, []) + [round(t["duracao"], 3)])[-HISTORICO:]
+        dados[self.nome] = anteriores
+        self.historico.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.historico.with_suffix(".tmp")
+        tmp.write_text(json.dumps(dados, indent=2, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.historico)
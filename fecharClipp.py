@@ -4,8 +4,10 @@ from pywinauto.keyboard import send_keys
 from datetime import datetime
 from pathlib import Path
 from utils import log, salvar_screenshot
+from fases import fase, medida
 
 
+@medida("fechar_clipp", ok=bool)
 def fechar_clipp_e_confirmar_backup_refatorado(usuario: str, timeout_backup_confirm: int = 60, backup_watcher=None) -> bool:
     """
     Fecha o Clipp após login e confirma o diálogo 'Cópia de segurança dos dados'.
@@ -37,32 +39,38 @@ def fechar_clipp_e_confirmar_backup_refatorado(usuario: str, timeout_backup_conf
         log(f"🪟 Janela principal detectada: {main_win.window_text()} (Handle: {main_win.handle})")
 
         # 🔹 Passo 2 — Fecha com Alt+F4
-        try:
-            main_win.set_focus()
-            send_keys("%{F4}")  # Alt+F4
-            log("🧩 Comando Alt+F4 enviado para fechar o Clipp.")
-        except Exception as e_alt:
-            salvar_screenshot("erro_altf4")
-            log(f"⚠️ Falha ao enviar Alt+F4: {e_alt}")
+        with fase("alt_f4") as etapa:
+            try:
+                main_win.set_focus()
+                send_keys("%{F4}")  # Alt+F4
+                log("🧩 Comando Alt+F4 enviado para fechar o Clipp.")
+            except Exception as e_alt:
+                etapa.falhou(type(e_alt).__name__)
+                salvar_screenshot("erro_altf4")
+                log(f"⚠️ Falha ao enviar Alt+F4: {e_alt}")
 
         # 🔸 Aguarda alguns segundos para permitir que eventuais avisos apareçam
         log("⏳ Aguardando possíveis avisos de segurança antes do backup...")
-        time.sleep(5)  # tempo para SecurityWatcher atuar
+        with fase("espera_avisos"):
+            time.sleep(5)  # tempo para SecurityWatcher atuar
 
         # 🔹 Passo 3 — Aguarda a janela de backup aparecer
         log("⏳ Aguardando janela de confirmação de backup...")
         t0 = time.time()
         janela_backup = None
 
-        while time.time() - t0 < timeout_backup_confirm:
-            for w in desktop.windows():
-                titulo = (w.window_text() or "").strip().lower()
-                if any(k in titulo for k in ("cópia de segurança dos dados", "copia de seguranca dos dados")):
-                    janela_backup = w
+        with fase("aguardar_confirmacao") as etapa:
+            while time.time() - t0 < timeout_backup_confirm:
+                for w in desktop.windows():
+                    titulo = (w.window_text() or "").strip().lower()
+                    if any(k in titulo for k in ("cópia de segurança dos dados", "copia de seguranca dos dados")):
+                        janela_backup = w
+                        break
+                if janela_backup:
                     break
-            if janela_backup:
-                break
-            time.sleep(1)
+                time.sleep(1)
+            else:
+                etapa.falhou("timeout")
 
         if not janela_backup:
             log("❌ Não detectei a janela 'Cópia de segurança dos dados' dentro do tempo limite.")
@@ -83,21 +91,22 @@ def fechar_clipp_e_confirmar_backup_refatorado(usuario: str, timeout_backup_conf
 
         # 🔹 Passo 5 — Localiza o botão '&Sim' e clica
         try:
-            for ctrl in janela_backup.children():
-                texto = (ctrl.window_text() or "").strip().lower()
-                classe = ctrl.element_info.class_name
-                if classe == "Button" and ("sim" in texto or "&sim" in texto):
-                    log(f"🎯 Botão 'Sim' encontrado (Handle: {ctrl.handle}). Clicando...")
-                    ctrl.click_input()
-                    log("✅ Backup confirmado com sucesso (clicou em 'Sim').")
-                    return True
-
-            # fallback: se não achou o botão, tenta ENTER global
-            log("⚠️ Botão 'Sim' não encontrado — enviando ENTER como fallback.")
-            janela_backup.set_focus()
-            send_keys("{ENTER}")
-            time.sleep(0.5)
-            return True
+            with fase("confirmar"):
+                for ctrl in janela_backup.children():
+                    texto = (ctrl.window_text() or "").strip().lower()
+                    classe = ctrl.element_info.class_name
+                    if classe == "Button" and ("sim" in texto or "&sim" in texto):
+                        log(f"🎯 Botão 'Sim' encontrado (Handle: {ctrl.handle}). Clicando...")
+                        ctrl.click_input()
+                        log("✅ Backup confirmado com sucesso (clicou em 'Sim').")
+                        return True
+
+                # fallback: se não achou o botão, tenta ENTER global
+                log("⚠️ Botão 'Sim' não encontrado — enviando ENTER como fallback.")
+                janela_backup.set_focus()
+                send_keys("{ENTER}")
+                time.sleep(0.5)
+                return True
 
         except Exception as e_click:
             salvar_screenshot("erro_clicar_sim")
@@ -0,0 +1,224 @@
+# fila_upload.py
+"""
+Fila persistente de uploads (<backupDir>/.fila_upload.sqlite3).
+
+O gerenciar_backup enfileira os zips de cada dia assim que eles são movidos, e
+um agendador em background os envia. Um envio que falha (ex.: sem internet às
+18:30) volta para a fila com backoff exponencial e jitter. A fila sobrevive a
+reinícios do bot e é esvaziada do mais antigo para o mais novo. Profundidade e
+idade do item mais antigo vão para o log a cada passada.
+"""
+
+import sqlite3, threading, time, random
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+from chunk_store import receita_de
+
+FILA_NOME = ".fila_upload.sqlite3"
+BACKOFF_BASE = 60        # 1ª nova tentativa em ~1 min
+BACKOFF_MAXIMO = 3600    # no máximo 1 h entre tentativas
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fila (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    caminho TEXT NOT NULL UNIQUE,
+    data TEXT NOT NULL,
+    criado_em REAL NOT NULL,
+    estado TEXT NOT NULL DEFAULT 'pendente',
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    proxima_tentativa REAL NOT NULL DEFAULT 0,
+    ultimo_erro TEXT,
+    concluido_em REAL
+);
+CREATE INDEX IF NOT EXISTS idx_fila_pendentes ON fila(estado, data, criado_em);
+"""
+
+_lock = threading.Lock()
+
+
+def atraso_backoff(tentativas: int, base: float = BACKOFF_BASE, maximo: float = BACKOFF_MAXIMO) -> float:
+    """Espera antes da próxima tentativa: exponencial limitado, com jitter de ±50%."""
+    return min(maximo, base * 2 ** max(0, tentativas - 1)) * random.uniform(0.5, 1.5)
+
+
+def _formatar_idade(segundos: float) -> str:
+    if segundos < 3600:
+        return f"{segundos / 60:.0f} min"
+    if segundos < 86400:
+        return f"{segundos / 3600:.1f} h"
+    return f"{segundos / 86400:.1f} dia(s)"
+
+
+class UploadQueue:
+    def __init__(self, base_dir, caminho_db=None):
+        self.base_dir = Path(base_dir)
+        self.caminho_db = Path(caminho_db) if caminho_db else self.base_dir / FILA_NOME
+        with self._conectar() as con:
+            con.executescript(_SCHEMA)
+
+    @contextmanager
+    def _conectar(self):
+        with _lock:
+            con = sqlite3.connect(self.caminho_db, timeout=10)
+            try:
+                yield con
+                con.commit()
+            finally:
+                con.close()
+
+    def enfileirar(self, caminhos, data: date) -> int:
+        """Adiciona os `caminhos` do dia `data` (os já enfileirados voltam a pendente). Retorna quantos."""
+        agora = time.time()
+        linhas = [(str(Path(c)), data.isoformat(), agora) for c in caminhos]
+        with self._conectar() as con:
+            con.executemany(
+                "INSERT INTO fila(caminho, data, criado_em) VALUES (?, ?, ?) "
+                "ON CONFLICT(caminho) DO UPDATE SET estado = 'pendente', tentativas = 0, proxima_tentativa = 0",
+                linhas,
+            )
+        return len(linhas)
+
+    def prontos(self, limite: int = 50) -> list[dict]:
+        """Itens pendentes cuja próxima tentativa já venceu, do dia mais antigo para o mais novo."""
+        with self._conectar() as con:
+            con.row_factory = sqlite3.Row
+            linhas = con.execute(
+                "SELECT id, caminho, data, tentativas FROM fila "
+                "WHERE estado = 'pendente' AND proxima_tentativa <= ? ORDER BY data, criado_em LIMIT ?",
+                (time.time(), limite),
+            ).fetchall()
+        return [dict(l) for l in linhas]
+
+    def concluir(self, item_id: int, estado: str = "enviado"):
+        with self._conectar() as con:
+            con.execute("UPDATE fila SET estado = ?, concluido_em = ?, ultimo_erro = NULL WHERE id = ?",
+                        (estado, time.time(), item_id))
+
+    def falhar(self, item_id: int, erro: str) -> float:
+        """Registra a falha e agenda a próxima tentativa. Retorna a espera (s)."""
+        with self._conectar() as con:
+            (tentativas,) = con.execute("SELECT tentativas FROM fila WHERE id = ?", (item_id,)).fetchone()
+            espera = atraso_backoff(tentativas + 1)
+            con.execute(
+                "UPDATE fila SET tentativas = tentativas + 1, proxima_tentativa = ?, ultimo_erro = ? WHERE id = ?",
+                (time.time() + espera, erro[:500], item_id),
+            )
+        return espera
+
+    def descartar(self, item_id: int, motivo: str):
+        """Tira da fila um item que não pode mais ser enviado (ex.: apagado pela retenção)."""
+        with self._conectar() as con:
+            con.execute("UPDATE fila SET estado = 'descartado', ultimo_erro = ?, concluido_em = ? WHERE id = ?",
+                        (motivo[:500], time.time(), item_id))
+
+    def pastas_pendentes(self) -> set[Path]:
+        """Pastas de dia com arquivos ainda não enviados (não devem ser recomprimidas/compactadas)."""
+        with self._conectar() as con:
+            linhas = con.execute("SELECT caminho FROM fila WHERE estado = 'pendente'").fetchall()
+        return {Path(c).parent for (c,) in linhas}
+
+    def estatisticas(self) -> dict:
+        """{"pendentes", "idade_mais_antiga_s", "proxima_tentativa"} da fila."""
+        with self._conectar() as con:
+            pendentes, criado_min, proxima = con.execute(
+                "SELECT COUNT(*), MIN(criado_em), MIN(proxima_tentativa) FROM fila WHERE estado = 'pendente'"
+            ).fetchone()
+        return {
+            "pendentes": pendentes,
+            "idade_mais_antiga_s": time.time() - criado_min if criado_min else 0.0,
+            "proxima_tentativa": proxima,
+        }
+
+    def relatorio(self) -> str:
+        e = self.estatisticas()
+        if not e["pendentes"]:
+            return "📤 Fila de upload vazia."
+        return (f"📤 Fila de upload: {e['pendentes']} arquivo(s) pendente(s), "
+                f"mais antigo há {_formatar_idade(e['idade_mais_antiga_s'])}.")
+
+
+class UploadScheduler:
+    """
+    Worker em background que esvazia a fila. `enviar(pasta, caminhos) -> {caminho: erro | None}`
+    envia um grupo de arquivos do mesmo dia e devolve o resultado de cada um (um zip que só
+    existe como receita de blocos continua na fila; `enviar` o reconstrói).
+    `preparar()`, se dado, roda uma vez na thread do worker antes da primeira passada
+    (ex.: autenticar no destino sem travar quem chamou `start`).
+    """
+
+    def __init__(self, fila: UploadQueue, enviar, intervalo: float = 30.0, log=print, preparar=None):
+        self.fila = fila
+        self.enviar = enviar
+        self.preparar = preparar
+        self.intervalo = intervalo
+        self.log = log
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.running_event = threading.Event()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="FilaUpload")
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self.running_event.clear()
+
+    def is_running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def processar(self) -> int:
+        """Uma passada: envia os itens vencidos, agrupados por pasta. Retorna quantos foram concluídos."""
+        itens = self.fila.prontos()
+        if not itens:
+            return 0
+        self.log(self.fila.relatorio())
+        grupos = {}
+        for item in itens:
+            caminho = Path(item["caminho"])
+            if not caminho.exists() and not receita_de(caminho).exists():
+                self.fila.descartar(item["id"], "arquivo não existe mais")
+                self.log(f"📤 {caminho.name} saiu da fila: arquivo não existe mais.")
+                continue
+            grupos.setdefault(caminho.parent, []).append((item, caminho))
+
+        concluidos = 0
+        for pasta, grupo in grupos.items():
+            try:
+                resultados = self.enviar(pasta, [c for _, c in grupo])
+            except Exception as e:
+                resultados = {c: str(e) for _, c in grupo}
+            for item, caminho in grupo:
+                erro = resultados.get(caminho, "sem resultado do envio")
+                if erro is None:
+                    self.fila.concluir(item["id"])
+                    concluidos += 1
+                else:
+                    espera = self.fila.falhar(item["id"], erro)
+                    self.log(f"📤 Upload de {caminho.name} falhou (tentativa {item['tentativas'] + 1}); "
+                             f"nova tentativa em {_formatar_idade(espera)}: {erro}")
+        self.log(self.fila.relatorio())
+        return concluidos
+
+    def _run(self):
+        self.running_event.set()
+        try:
+            if self.preparar is not None:
+                try:
+                    self.preparar()
+                except Exception as e:
+                    self.log(f"⚠️ Falha ao preparar o agendador de uploads: {e}")
+            while not self._stop_event.is_set():
+                try:
+                    self.processar()
+                except Exception as e:
+                    self.log(f"⚠️ Erro no agendador de uploads: {e}")
+                self._stop_event.wait(self.intervalo)
+        finally:
+            self.running_event.clear()
@@ -0,0 +1,259 @@
+# indice_log.py
+"""
+Índice do log estruturado (backup_log.jsonl) para consultas sem varrer o arquivo.
+
+Um SQLite ao lado do log (backup_log.idx.sqlite3) guarda, para cada linha,
+(segmento, offset, tamanho) e os campos consultáveis: ts, session_id, run_id e
+event. A thread de gravação do log acrescenta as linhas de cada lote assim que
+as grava e avisa quando o arquivo atual vira um segmento (log_rotacao); na
+partida, `sincronizar` indexa o que tiver ficado de fora (log anterior ao índice,
+queda do bot entre a gravação e o índice) e esquece segmentos já apagados.
+
+As consultas (por execução, por tipo de evento, por intervalo de tempo) vão ao
+índice e depois leem só as linhas encontradas, direto no offset, inclusive nos
+segmentos comprimidos (um bloco de BLOCO_GZ por leitura).
+
+Uso em linha de comando: python indice_log.py falhas [N] | execucao <run_id> | intervalo <início> <fim>
+"""
+
+import json, sqlite3, sys, threading
+from contextlib import contextmanager, ExitStack
+from datetime import datetime
+from pathlib import Path
+from log_rotacao import BLOCO_GZ, segmentos, chave_segmento, abrir_em
+
+ATUAL = ""  # segmento do arquivo de log atual (ainda não rotacionado)
+
+
+class IndiceInconsistente(RuntimeError):
+    """O índice aponta para linhas que não conferem com o log mesmo depois de reindexar."""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS linhas (
+    segmento TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    tamanho INTEGER NOT NULL,
+    ts TEXT NOT NULL,
+    session_id TEXT,
+    run_id TEXT,
+    event TEXT,
+    PRIMARY KEY (segmento, offset)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_linhas_ts ON linhas(ts);
+CREATE INDEX IF NOT EXISTS idx_linhas_run ON linhas(run_id, ts) WHERE run_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_linhas_evento ON linhas(event, ts) WHERE event IS NOT NULL;
+"""
+
+_INSERIR = ("INSERT OR IGNORE INTO linhas(segmento, offset, tamanho, ts, session_id, run_id, event) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)")
+
+
+def _ts(valor) -> str:
+    if isinstance(valor, datetime):
+        return valor.isoformat(sep=" ", timespec="seconds")
+    return str(valor)
+
+
+def _campos(segmento: str, offset: int, bruto: bytes) -> tuple | None:
+    try:
+        r = json.loads(bruto)
+    except ValueError:
+        return None  # linha truncada (queda no meio da gravação)
+    return (segmento, offset, len(bruto), r.get("ts") or "", r.get("session_id"), r.get("run_id"), r.get("event"))
+
+
+class LogIndex:
+    def __init__(self, caminho_db, caminho_log):
+        self.caminho_db = Path(caminho_db)
+        self.caminho_log = Path(caminho_log)
+        self._lock = threading.Lock()
+        with self._conectar() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.executescript(_SCHEMA)
+
+    @contextmanager
+    def _conectar(self):
+        con = sqlite3.connect(self.caminho_db, timeout=10)
+        con.execute("PRAGMA synchronous=NORMAL")  # o índice se refaz a partir do log se perder o fim
+        try:
+            yield con
+            con.commit()
+        finally:
+            con.close()
+
+    # --- Escrita (thread de gravação do log) ---
+    def registrar(self, linhas):
+        """Linhas recém-gravadas no arquivo atual: [(offset, tamanho, ts, session_id, run_id, event)]."""
+        with self._lock, self._conectar() as con:
+            con.executemany(_INSERIR, [(ATUAL, *linha) for linha in linhas])
+
+    def rotacionado(self, chave: str):
+        """O arquivo atual virou o segmento `chave`."""
+        with self._lock, self._conectar() as con:
+            con.execute("UPDATE linhas SET segmento = ? WHERE segmento = ?", (chave, ATUAL))
+
+    def _indexar(self, con, segmento: str, caminho: Path, inicio: int = 0) -> int:
+        lote, offset = [], inicio
+        with abrir_em(caminho, inicio) as f:
+            for bruto in f:
+                if not bruto.endswith(b"\n"):
+                    break  # linha ainda incompleta
+                if (campos := _campos(segmento, offset, bruto)) is not None:
+                    lote.append(campos)
+                offset += len(bruto)
+                if len(lote) >= 5000:
+                    con.executemany(_INSERIR, lote)
+                    lote = []
+        con.executemany(_INSERIR, lote)
+        return offset - inicio
+
+    def sincronizar(self):
+        """Indexa o que falta (segmentos sem nenhuma linha no índice e o fim do arquivo atual) e poda segmentos apagados."""
+        with self._lock, self._conectar() as con:
+            no_disco = {chave_segmento(s): s for s in segmentos(self.caminho_log)}
+            indexados = {s for (s,) in con.execute("SELECT DISTINCT segmento FROM linhas")}
+            for chave in indexados - set(no_disco) - {ATUAL}:
+                con.execute("DELETE FROM linhas WHERE segmento = ?", (chave,))
+            for chave in sorted(set(no_disco) - indexados):
+                self._indexar(con, chave, no_disco[chave])
+            (fim,) = con.execute("SELECT COALESCE(MAX(offset + tamanho), 0) FROM linhas WHERE segmento = ?",
+                                 (ATUAL,)).fetchone()
+            if self.caminho_log.exists():
+                if self.caminho_log.stat().st_size < fim:  # arquivo trocado por fora do bot
+                    con.execute("DELETE FROM linhas WHERE segmento = ?", (ATUAL,))
+                    fim = 0
+                self._indexar(con, ATUAL, self.caminho_log, fim)
+
+    # --- Consultas ---
+    def _caminhos(self) -> dict:
+        caminhos = {chave_segmento(s): s for s in segmentos(self.caminho_log)}
+        caminhos[ATUAL] = self.caminho_log
+        return caminhos
+
+    @staticmethod
+    def _ler_segmento(caminho: Path, itens: list[tuple]):
+        """(offset, bytes) de cada (offset, tamanho) de `itens`, em ordem de offset."""
+        texto = caminho.suffix != ".gz"
+        with ExitStack() as pilha:
+            f, pos = None, 0
+            for offset, tamanho in sorted(itens):
+                if f is not None and texto:
+                    f.seek(offset)
+                elif f is not None and pos <= offset <= pos + BLOCO_GZ:
+                    f.read(offset - pos)  # próximo: segue no mesmo fluxo descomprimido
+                else:
+                    pilha.close()
+                    f = pilha.enter_context(abrir_em(caminho, offset))
+                yield offset, f.read(tamanho)
+                pos = offset + tamanho
+
+    def _reindexar(self, segmento: str):
+        """Refaz do zero as linhas de `segmento` (offsets que não conferem com o arquivo)."""
+        with self._lock, self._conectar() as con:
+            con.execute("DELETE FROM linhas WHERE segmento = ?", (segmento,))
+            caminho = self._caminhos().get(segmento)
+            if caminho is not None and caminho.exists():
+                self._indexar(con, segmento, caminho)
+
+    def _buscar(self, where: str, params: tuple, ordem: str = "ts", limite: int | None = None) -> list[dict]:
+        sql = f"SELECT segmento, offset, tamanho, ts FROM linhas WHERE {where} ORDER BY {ordem}, segmento, offset"
+        if limite:
+            sql += f" LIMIT {int(limite)}"
+        # 1ª divergência: pode ser uma rotação no meio da consulta, consulta de novo;
+        # 2ª: reindexa os segmentos que não conferem; 3ª: erro, nunca um resultado parcial
+        for tentativa in range(3):
+            with self._conectar() as con:
+                linhas = con.execute(sql, params).fetchall()
+            caminhos = self._caminhos()
+            grupos = {}
+            for posicao, (segmento, offset, tamanho, ts) in enumerate(linhas):
+                grupos.setdefault(segmento, []).append((offset, tamanho, ts, posicao))
+            saida, divergentes = [None] * len(linhas), []
+            for segmento, itens in grupos.items():
+                caminho = caminhos.get(segmento)
+                if caminho is None:
+                    continue  # apagado pela retenção
+                por_offset = {offset: (ts, posicao) for offset, _, ts, posicao in itens}
+                try:
+                    for offset, bruto in self._ler_segmento(caminho, [(o, t) for o, t, _, _ in itens]):
+                        ts, posicao = por_offset[offset]
+                        registro = json.loads(bruto)
+                        if registro.get("ts") != ts:
+                            raise ValueError("linha não confere com o índice")
+                        saida[posicao] = registro
+                except (OSError, ValueError):
+                    divergentes.append(segmento)
+            if not divergentes:
+                return [r for r in saida if r is not None]
+            if tentativa == 1:
+                for segmento in divergentes:
+                    self._reindexar(segmento)
+        raise IndiceInconsistente(f"índice do log não confere com {', '.join(s or 'o arquivo atual' for s in divergentes)}")
+
+    def por_execucao(self, run_id: str) -> list[dict]:
+        """Todas as linhas da execução `run_id`, em ordem."""
+        return self._buscar("run_id = ?", (run_id,))
+
+    def por_evento(self, event: str, limite: int = 30, inicio=None, fim=None) -> list[dict]:
+        """As `limite` linhas mais recentes com o evento `event` (opcionalmente entre `inicio` e `fim`)."""
+        where, params = "event = ?", [event]
+        if inicio is not None:
+            where += " AND ts >= ?"
+            params.append(_ts(inicio))
+        if fim is not None:
+            where += " AND ts <= ?"
+            params.append(_ts(fim))
+        return self._buscar(where, tuple(params), ordem="ts DESC", limite=limite)
+
+    def intervalo(self, inicio, fim, event: str | None = None, limite: int | None = None) -> list[dict]:
+        """Linhas com `inicio` <= ts <= `fim` (datetime ou 'AAAA-MM-DD HH:MM:SS'), em ordem."""
+        where, params = "ts BETWEEN ? AND ?", [_ts(inicio), _ts(fim)]
+        if event is not None:
+            where += " AND event = ?"
+            params.append(event)
+        return self._buscar(where, tuple(params), limite=limite)
+
+    def execucoes(self, limite: int = 30) -> list[dict]:
+        """As últimas execuções: [{"run_id", "inicio", "fim", "linhas", "eventos"}], a mais recente primeiro."""
+        with self._conectar() as con:
+            ids = []
+            # anda do fim do log para trás só até achar `limite` execuções diferentes
+            for (run_id,) in con.execute("SELECT run_id FROM linhas WHERE run_id IS NOT NULL ORDER BY ts DESC"):
+                if run_id not in ids:
+                    ids.append(run_id)
+                    if len(ids) >= limite:
+                        break
+            execucoes = []
+            for run_id in ids:
+                inicio, fim, n, eventos = con.execute(
+                    "SELECT MIN(ts), MAX(ts), COUNT(*), GROUP_CONCAT(DISTINCT event) FROM linhas WHERE run_id = ?",
+                    (run_id,)).fetchone()
+                execucoes.append({"run_id": run_id, "inicio": inicio, "fim": fim, "linhas": n,
+                                  "eventos": eventos.split(",") if eventos else []})
+        return execucoes
+
+
+def main(argv=None):
+    argv = argv if argv is not None else sys.argv[1:]
+    from utils import consultar_log
+    indice = consultar_log()
+    comando = argv[0] if argv else "falhas"
+    if comando == "falhas":
+        registros = indice.por_evento("BACKUP_FAIL", limite=int(argv[1]) if len(argv) > 1 else 30)
+    elif comando == "execucao":
+        registros = indice.por_execucao(argv[1])
+    elif comando == "intervalo":
+        registros = indice.intervalo(argv[1], argv[2])
+    elif comando == "execucoes":
+        for e in indice.execucoes(int(argv[1]) if len(argv) > 1 else 30):
+            print(f"{e['inicio']} → {e['fim']}  {e['run_id']}  {e['linhas']} linha(s)  {' '.join(e['eventos'])}")
+        return
+    else:
+        print(__doc__)
+        return
+    for r in registros:
+        print(f"{r['ts']} [{r.get('event') or '-'}] {r['message']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -142,6 +142,9 @@ class InterfaceApp:
         self.labelTempo = ctk.CTkLabel(self.root, text="Próximo backup: --:--")
         self.labelTempo.pack(pady=(12, 6))
 
+        # aviso de tarefas em background (ex.: autorização do Google Drive); oculto se vazio
+        self.labelAviso = ctk.CTkLabel(self.root, text="", font=("Segoe UI", 11))
+
         self.btnFrame = ctk.CTkFrame(self.root)
         self.btnFrame.pack(fill="x", padx=12, pady=(0, 12))
 
@@ -173,6 +176,18 @@ class InterfaceApp:
             minutos, segundos = divmod(resto, 60)
             self.labelTempo.configure(text=f"Próximo backup: {horas:02d}:{minutos:02d}:{segundos:02d}")
 
+    def definir_aviso(self, texto: str | None):
+        """Mostra (ou esconde, com None) uma linha de aviso; pode ser chamado de qualquer thread."""
+        def aplicar():
+            if texto:
+                self.labelAviso.configure(text=texto)
+                self.labelAviso.pack(after=self.labelTempo, pady=(0, 6))
+                self.root.geometry("340x160")
+            else:
+                self.labelAviso.pack_forget()
+                self.root.geometry("340x130")
+        self.root.after(0, aplicar)
+
     def _loop_atualizar(self):
         while not self._stop_event.is_set():
             self._atualizar_label()
@@ -193,7 +208,7 @@ class InterfaceApp:
 
     def _backup_thread(self):
         from automacao_refatorado import executar_backup_completo
-        sucesso = executar_backup_completo()
+        sucesso = executar_backup_completo() == "done"
         if sucesso:
             log("🎉 Backup concluído com sucesso!")
         else:
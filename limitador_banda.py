@@ -0,0 +1,87 @@
+# limitador_banda.py
+"""
+Limite global de banda para os uploads (token bucket).
+
+Todos os workers de upload consomem do mesmo balde, então o limite vale para a
+soma das transferências e não por arquivo. O limite só é aplicado dentro do
+horário da loja (ex.: "08:00-18:00"); fora dele o link é usado por inteiro.
+"""
+
+import threading, time
+from datetime import datetime, time as dtime
+
+FATIA = 64 * 1024  # granularidade do envio limitado
+
+
+class TokenBucket:
+    """Balde de fichas em bytes: `taxa` bytes/s, rajadas de até `capacidade` bytes. taxa=None -> sem limite."""
+
+    def __init__(self, taxa: float | None, capacidade: float | None = None):
+        self._lock = threading.Lock()
+        self.taxa = taxa
+        self.capacidade = capacidade or (taxa or 0)
+        self._fichas = self.capacidade
+        self._ultimo = time.monotonic()
+
+    def consumir(self, n: int):
+        """Bloqueia até haver `n` bytes disponíveis no balde."""
+        while True:
+            with self._lock:
+                if not self.taxa:
+                    return
+                agora = time.monotonic()
+                self._fichas = min(self.capacidade, self._fichas + (agora - self._ultimo) * self.taxa)
+                self._ultimo = agora
+                # pedidos maiores que o balde passam quando ele está cheio (saldo fica negativo)
+                if self._fichas >= min(n, self.capacidade):
+                    self._fichas -= n
+                    return
+                espera = (min(n, self.capacidade) - self._fichas) / self.taxa
+            time.sleep(espera)
+
+
+def _faixa_horario(texto: str) -> tuple[dtime, dtime]:
+    inicio, fim = (dtime.fromisoformat(p.strip()) for p in texto.split("-"))
+    return inicio, fim
+
+
+class LimitadorBanda:
+    """
+    Token bucket com limite de `limite_kbps` KB/s aplicado só no `horario` ("HH:MM-HH:MM";
+    None = sempre). limite_kbps vazio/0 desliga o limite.
+    """
+
+    def __init__(self, limite_kbps: float | None = None, horario: str | None = None):
+        self.limite = float(limite_kbps) * 1024 if limite_kbps else None
+        self.horario = _faixa_horario(horario) if horario else None
+        # ~1 s de rajada: suaviza sem deixar o link ocioso entre fatias
+        self._balde = TokenBucket(self.limite, capacidade=max(self.limite or 0, FATIA))
+
+    def ativo(self, agora: datetime | None = None) -> bool:
+        if not self.limite:
+            return False
+        if self.horario is None:
+            return True
+        hora = (agora or datetime.now()).time()
+        inicio, fim = self.horario
+        if inicio <= fim:
+            return inicio <= hora < fim
+        return hora >= inicio or hora < fim  # faixa que atravessa a meia-noite
+
+    def consumir(self, n: int):
+        if self.ativo():
+            self._balde.consumir(n)
+
+    def fatiar(self, dados: bytes):
+        """Gera `dados` em fatias de FATIA bytes, esperando o balde antes de cada uma."""
+        visao = memoryview(dados)
+        for i in range(0, len(visao), FATIA):
+            fatia = visao[i:i + FATIA]
+            self.consumir(len(fatia))
+            yield fatia
+
+    @classmethod
+    def da_config(cls, conf: dict) -> "LimitadorBanda":
+        """Lê config "upload": {"limiteKBps": N, "horarioLoja": "08:00-18:00"}."""
+        upload = conf.get("upload") or {}
+        return cls(upload.get("limiteKBps"), upload.get("horarioLoja"))
@@ -0,0 +1,218 @@
+# log_assincrono.py
+"""
+Gravação do log em segundo plano (backup_log.txt + backup_log.jsonl).
+
+`registrar` só põe a mensagem numa fila e volta em microssegundos; uma thread
+mantém os dois arquivos abertos e grava em lotes, quando o lote passa de
+`lote_bytes` ou quando a mensagem mais antiga do lote espera `intervalo`
+segundos. O eco no console sai junto com o lote. Na saída do processo (inclusive
+por exceção não tratada) o atexit grava o que estiver pendente; `descarregar`
+força a gravação para quem vai ler os arquivos em seguida.
+
+A mesma thread rotaciona os arquivos entre um lote e outro (por tamanho e/ou na
+virada do dia, ver log_rotacao), então nenhuma linha se perde na rotação, e
+mantém o índice do .jsonl (indice_log) em dia com cada lote gravado.
+"""
+
+import atexit, json, os, queue, threading, time
+from datetime import date, datetime
+from pathlib import Path
+from log_rotacao import MANTER, TAMANHO_MAXIMO, rotacionar, chave_segmento, comprimir_em_segundo_plano
+
+LOTE_BYTES = 64 * 1024
+INTERVALO = 0.5
+_PARAR = object()
+
+
+def linha_txt(ts: str, mensagem: str) -> str:
+    return f"{ts} - {mensagem}\n"
+
+
+def linha_json(ts: str, mensagem: str, sessao: str, run_id: str | None, event: str | None,
+               dados: dict | None = None) -> str:
+    payload = {
+        "ts": ts,
+        "session_id": sessao,
+        "run_id": run_id,
+        "event": event,
+        "message": mensagem,
+    }
+    if dados:
+        payload["data"] = dados
+    return json.dumps(payload, ensure_ascii=False) + "\n"
+
+
+class EscritorLog:
+    """
+    `tamanho_maximo` (bytes; 0 desliga) e `rotacao_diaria` definem quando cada arquivo
+    vira um segmento; só os `manter` segmentos mais recentes de cada arquivo ficam.
+    `indice` (indice_log.LogIndex do .jsonl), se dado, recebe cada linha gravada.
+    """
+
+    def __init__(self, caminho_txt, caminho_json, sessao: str, lote_bytes: int = LOTE_BYTES,
+                 intervalo: float = INTERVALO, eco=print, tamanho_maximo: int = TAMANHO_MAXIMO,
+                 rotacao_diaria: bool = True, manter: int = MANTER, indice=None):
+        self.caminho_txt = Path(caminho_txt)
+        self.caminho_json = Path(caminho_json)
+        self.sessao = sessao
+        self.lote_bytes = lote_bytes
+        self.intervalo = intervalo
+        self.eco = eco
+        self.tamanho_maximo = tamanho_maximo
+        self.rotacao_diaria = rotacao_diaria
+        self.manter = manter
+        self.indice = indice
+        self._fila = queue.SimpleQueue()
+        self._arquivos = {}
+        self._dias = {}  # dia da última gravação em cada arquivo
+        self._lock = threading.Lock()
+        self._thread = None
+        self.running_event = threading.Event()
+
+    # --- Lado de quem loga ---
+    def registrar(self, ts: str, mensagem: str, run_id: str | None = None, event: str | None = None,
+                  dados: dict | None = None):
+        """`dados` (opcional) vai no campo "data" da linha do .jsonl."""
+        if not self.is_running():
+            self.start()
+        self._fila.put((ts, mensagem, run_id, event, dados))
+
+    def descarregar(self, timeout: float = 5.0) -> bool:
+        """Espera tudo o que já foi registrado chegar ao disco. Retorna False se estourar o `timeout`."""
+        if not self.is_running():
+            return True
+        feito = threading.Event()
+        self._fila.put(feito)
+        return feito.wait(timeout)
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="log", daemon=True)
+            self._thread.start()
+            self.running_event.set()
+            atexit.register(self.stop)
+        # segmentos que ficaram sem comprimir (bot fechado no meio da compressão)
+        comprimir_em_segundo_plano((self.caminho_txt, self.caminho_json), self.manter, log=self._aviso)
+
+    def stop(self):
+        with self._lock:
+            if not (self._thread and self._thread.is_alive()):
+                return
+            self._fila.put(_PARAR)
+            self._thread.join(timeout=10)
+            self.running_event.clear()
+            atexit.unregister(self.stop)
+
+    def is_running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def _aviso(self, mensagem: str):
+        self.registrar(datetime.now().isoformat(sep=' ', timespec='seconds'), mensagem)
+
+    # --- Thread de gravação ---
+    def _arquivo(self, caminho: Path):
+        f = self._arquivos.get(caminho)
+        if f is None:
+            # binário: "\n" não vira "\r\n" no Windows e os offsets do índice batem com o arquivo
+            f = self._arquivos[caminho] = open(caminho, "ab")
+            try:
+                self._dias[caminho] = date.fromtimestamp(os.path.getmtime(caminho))
+            except OSError:
+                self._dias[caminho] = date.today()
+        return f
+
+    def _fechar(self, caminho: Path):
+        f = self._arquivos.pop(caminho, None)
+        if f:
+            try:
+                f.close()
+            except Exception:
+                pass
+
+    def _rotacionar_se_preciso(self, caminho: Path, novos: int) -> Path | None:
+        f = self._arquivo(caminho)
+        tamanho = f.tell()
+        if not tamanho:
+            return None
+        cheio = self.tamanho_maximo and tamanho + novos > self.tamanho_maximo
+        virou_dia = self.rotacao_diaria and self._dias[caminho] != date.today()
+        if not (cheio or virou_dia):
+            return None
+        self._fechar(caminho)
+        try:
+            return rotacionar(caminho)
+        except OSError:
+            return None  # aberto por outro programa (Windows não renomeia); tenta no próximo lote
+
+    def _indexar(self, offset: int, linhas: list[bytes], lote: list[tuple]):
+        registros = []
+        for linha, (ts, _, run_id, event, _) in zip(linhas, lote):
+            registros.append((offset, len(linha), ts, self.sessao, run_id, event))
+            offset += len(linha)
+        self.indice.registrar(registros)
+
+    def _gravar(self, lote: list[tuple]):
+        txt = "".join(linha_txt(ts, m) for ts, m, _, _, _ in lote)
+        linhas_json = [linha_json(ts, m, self.sessao, run_id, event, dados).encode("utf-8")
+                       for ts, m, run_id, event, dados in lote]
+        rotacionados = []
+        for caminho, dados in ((self.caminho_txt, txt.encode("utf-8")), (self.caminho_json, b"".join(linhas_json))):
+            try:
+                segmento = self._rotacionar_se_preciso(caminho, len(dados))
+                if segmento:
+                    rotacionados.append(caminho)
+                    if self.indice and caminho == self.caminho_json:
+                        self.indice.rotacionado(chave_segmento(segmento))
+                f = self._arquivo(caminho)
+                offset = f.tell()
+                f.write(dados)
+                f.flush()
+                self._dias[caminho] = date.today()
+            except Exception:
+                self._fechar(caminho)  # arquivo travado/apagado: reabre no próximo lote
+                continue
+            if self.indice and caminho == self.caminho_json:
+                try:
+                    self._indexar(offset, linhas_json, lote)
+                except Exception:
+                    pass  # o índice se refaz na próxima partida (LogIndex.sincronizar)
+        if rotacionados:
+            comprimir_em_segundo_plano(rotacionados, self.manter, log=self._aviso)
+        if self.eco:
+            try:
+                self.eco(txt.rstrip("\n"))
+            except Exception:
+                pass
+
+    def _run(self):
+        lote, tamanho, prazo = [], 0, None
+        if self.indice:
+            try:
+                self.indice.sincronizar()
+            except Exception:
+                pass
+        try:
+            while True:
+                try:
+                    item = self._fila.get(timeout=max(0.0, prazo - time.monotonic()) if lote else None)
+                except queue.Empty:
+                    item = None
+                if isinstance(item, tuple):
+                    if not lote:
+                        prazo = time.monotonic() + self.intervalo
+                    lote.append(item)
+                    tamanho += len(item[1]) + 32
+                    if tamanho < self.lote_bytes and time.monotonic() < prazo:
+                        continue
+                if lote:
+                    self._gravar(lote)
+                    lote, tamanho = [], 0
+                if isinstance(item, threading.Event):
+                    item.set()
+                elif item is _PARAR:
+                    break
+        finally:
+            for caminho in list(self._arquivos):
+                self._fechar(caminho)
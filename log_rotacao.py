@@ -0,0 +1,164 @@
+# log_rotacao.py
+"""
+Rotação dos arquivos de log (backup_log.txt / backup_log.jsonl) em segmentos.
+
+O arquivo atual é renomeado para `backup_log.AAAA-MM-DD_HHMMSS.jsonl` (momento da
+rotação, então a ordem dos nomes é a ordem cronológica) quando passa do tamanho
+máximo ou quando vira o dia. Quem rotaciona é a própria thread de gravação do
+log, entre dois lotes, então nenhuma linha se perde. Os segmentos são
+comprimidos em .gz em segundo plano e só os `manter` mais recentes ficam. Cada
+.gz é uma sequência de membros gzip independentes de BLOCO_GZ bytes (o gzip lê
+como um arquivo só), e o `.gz.blocos` ao lado guarda onde cada membro começa:
+`abrir_em` chega a uma linha de um segmento comprimido descomprimindo um bloco,
+não o segmento inteiro.
+
+`ler_linhas` percorre segmentos antigos (comprimidos ou não) e o arquivo atual
+como se fossem um arquivo só.
+"""
+
+import gzip, json, os, re, threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+MANTER = 30
+TAMANHO_MAXIMO = 10 * 1024 * 1024
+BLOCO_GZ = 256 * 1024
+
+_lock_compressao = threading.Lock()
+
+
+def _padrao(base: Path) -> re.Pattern:
+    return re.compile(re.escape(base.stem) + r"\.(\d{4}-\d{2}-\d{2}_\d{6})" + re.escape(base.suffix) + r"(\.gz)?$")
+
+
+def nome_segmento(base: Path, momento: datetime | None = None) -> Path:
+    momento = momento or datetime.now()
+    return base.with_name(f"{base.stem}.{momento:%Y-%m-%d_%H%M%S}{base.suffix}")
+
+
+def segmentos(base) -> list[Path]:
+    """Segmentos rotacionados de `base`, do mais antigo ao mais novo (um por rotação, .gz ou não)."""
+    base = Path(base)
+    padrao = _padrao(base)
+    por_momento = {}
+    try:
+        nomes = os.listdir(base.parent)
+    except FileNotFoundError:
+        return []
+    for nome in nomes:
+        m = padrao.match(nome)
+        if m:
+            # durante a compressão os dois existem; o .gz só aparece completo (os.replace)
+            atual = por_momento.get(m.group(1))
+            if atual is None or m.group(2):
+                por_momento[m.group(1)] = base.parent / nome
+    return [por_momento[k] for k in sorted(por_momento)]
+
+
+def abrir_segmento(caminho: Path, modo: str = "rt"):
+    if caminho.suffix == ".gz":
+        return gzip.open(caminho, modo, encoding="utf-8") if "t" in modo else gzip.open(caminho, modo)
+    return open(caminho, modo, encoding="utf-8") if "t" in modo else open(caminho, modo)
+
+
+def chave_segmento(segmento: Path) -> str:
+    """'AAAA-MM-DD_HHMMSS' do segmento (o mesmo para a versão em texto e a .gz)."""
+    return segmento.name.split(".")[1]
+
+
+def _blocos(comprimido: Path) -> list[list[int]]:
+    try:
+        return json.loads(comprimido.with_name(comprimido.name + ".blocos").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return []
+
+
+@contextmanager
+def abrir_em(caminho: Path, offset: int):
+    """Abre `caminho` (texto ou .gz) em modo binário já posicionado em `offset` (bytes descomprimidos)."""
+    with open(caminho, "rb") as bruto:
+        if caminho.suffix != ".gz":
+            bruto.seek(offset)
+            yield bruto
+            return
+        inicio_desc, inicio_comp = 0, 0
+        for desc, comp in _blocos(caminho):
+            if desc > offset:
+                break
+            inicio_desc, inicio_comp = desc, comp
+        bruto.seek(inicio_comp)
+        with gzip.GzipFile(fileobj=bruto, mode="rb") as f:
+            f.read(offset - inicio_desc)
+            yield f
+
+
+def ler_linhas(base):
+    """Linhas de todos os segmentos de `base` e do arquivo atual, em ordem."""
+    base = Path(base)
+    for segmento in segmentos(base):
+        try:
+            with abrir_segmento(segmento) as f:
+                yield from f
+        except FileNotFoundError:
+            continue  # comprimido ou apagado pela retenção no meio da leitura
+    try:
+        with open(base, encoding="utf-8") as f:
+            yield from f
+    except FileNotFoundError:
+        pass
+
+
+def rotacionar(base: Path) -> Path | None:
+    """Renomeia o arquivo atual para um segmento. O arquivo precisa estar fechado por quem grava."""
+    momento = datetime.now()
+    destino = nome_segmento(base, momento)
+    # duas rotações no mesmo segundo não podem sobrescrever o segmento anterior
+    while destino.exists() or destino.with_name(destino.name + ".gz").exists():
+        momento += timedelta(seconds=1)
+        destino = nome_segmento(base, momento)
+    try:
+        os.replace(base, destino)
+    except FileNotFoundError:
+        return None
+    return destino
+
+
+def comprimir_pendentes(base, manter: int = MANTER):
+    """Comprime os segmentos ainda em texto e apaga os que passaram da retenção."""
+    base = Path(base)
+    with _lock_compressao:
+        for sobra in base.parent.glob(f"{base.stem}.*{base.suffix}.gz.tmp"):
+            sobra.unlink(missing_ok=True)  # compressão interrompida por um fechamento do bot
+        for segmento in segmentos(base):
+            if segmento.suffix == ".gz":
+                continue
+            comprimido = segmento.with_name(segmento.name + ".gz")
+            tmp = comprimido.with_name(comprimido.name + ".tmp")
+            blocos = []
+            with open(segmento, "rb") as src, open(tmp, "wb") as dst:
+                desc = 0
+                while dados := src.read(BLOCO_GZ):
+                    blocos.append([desc, dst.tell()])
+                    dst.write(gzip.compress(dados, mtime=0))
+                    desc += len(dados)
+                dst.flush()
+                os.fsync(dst.fileno())
+            comprimido.with_name(comprimido.name + ".blocos").write_text(json.dumps(blocos), encoding="utf-8")
+            os.replace(tmp, comprimido)
+            segmento.unlink()
+        antigos = segmentos(base)
+        for segmento in antigos[:max(0, len(antigos) - manter)]:
+            segmento.unlink(missing_ok=True)
+            segmento.with_name(segmento.name + ".blocos").unlink(missing_ok=True)
+
+
+def comprimir_em_segundo_plano(bases, manter: int = MANTER, log=None):
+    def rodar():
+        for base in bases:
+            try:
+                comprimir_pendentes(base, manter)
+            except Exception as e:
+                if log:
+                    log(f"⚠️ Falha ao comprimir os logs antigos de {Path(base).name}: {e}")
+    threading.Thread(target=rodar, name="log-gzip", daemon=True).start()
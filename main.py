@@ -1,18 +1,20 @@
 # main.py
 import threading
+import multiprocessing
 import os
 import sys
 from pathlib import Path
 from interface import InterfaceApp
 from tray import TrayController
 from agendador import loopAgendador
-from utils import log
+from utils import log, carregar_config, descarregar_log
 
 _stop_event = threading.Event()
 tray = None
 
 def abrir_relatorios():
     from os import startfile
+    descarregar_log()
     appdata = Path(os.getenv("APPDATA", Path.home() / "AppData/Roaming")) / "BackupBot" / "relatorios"
     appdata.mkdir(parents=True, exist_ok=True)
     startfile(str(appdata))
@@ -34,8 +36,18 @@ def main():
     th_ag = threading.Thread(target=loopAgendador, args=(_stop_event,), daemon=True)
     th_ag.start()
 
-    # 4️Inicia a interface
+    # 4️Fila de upload em background (config "uploadAutomatico")
+    conf = carregar_config()
+    if conf.get("uploadAutomatico", False):
+        try:
+            from upload_nuvem import iniciar_fila_upload
+            iniciar_fila_upload(conf.get("backupDir", "D:\\BACKUP"), aviso=app.definir_aviso)
+        except Exception as e:
+            log(f"⚠️ Fila de upload não iniciada: {e}")
+
+    # 5️Inicia a interface
     app.start()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # pool de verificação dos zips no executável PyInstaller
     main()
@@ -0,0 +1,139 @@
+# manifest.py
+"""
+manifest.json de cada pasta de backup (BACKUP yyyy/MÊS/dd_mm_yyyy).
+
+Registra nome, tamanho, mtime, SHA-256 e MD5 de cada zip movido, para que as
+etapas seguintes (upload, auditoria, dedup) consultem o hash em vez de reler
+arquivos de vários GB. O MD5 existe porque é o checksum que o Google Drive
+informa. Os hashes são calculados juntos, numa só leitura em blocos grandes
+(via mmap quando possível).
+"""
+
+import os, json, hashlib, mmap
+from datetime import datetime
+from pathlib import Path
+
+MANIFEST_NOME = "manifest.json"
+CHUNK_HASH = 8 * 1024 * 1024
+
+
+def calcular_hashes(caminho, algoritmos=("sha256", "md5"), chunk: int = CHUNK_HASH) -> dict:
+    """Hashes do arquivo ({algoritmo: hex}) numa única leitura em blocos de `chunk` bytes (mmap quando o SO permitir)."""
+    hs = {alg: hashlib.new(alg) for alg in algoritmos}
+    with open(caminho, "rb") as f:
+        tamanho = os.fstat(f.fileno()).st_size
+        if tamanho == 0:
+            return {alg: h.hexdigest() for alg, h in hs.items()}
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            mm = None  # ex: arquivo em rede ou espaço de endereçamento insuficiente
+        if mm is not None:
+            with mm:
+                view = memoryview(mm)
+                try:
+                    for inicio in range(0, tamanho, chunk):
+                        for h in hs.values():
+                            h.update(view[inicio:inicio + chunk])
+                finally:
+                    view.release()
+        else:
+            while bloco := f.read(chunk):
+                for h in hs.values():
+                    h.update(bloco)
+    return {alg: h.hexdigest() for alg, h in hs.items()}
+
+
+def calcular_hash(caminho, algoritmo: str = "sha256", chunk: int = CHUNK_HASH) -> str:
+    """Hash do arquivo lido em blocos de `chunk` bytes (mmap quando o SO permitir)."""
+    return calcular_hashes(caminho, (algoritmo,), chunk)[algoritmo]
+
+
+def _entrada(caminho: Path, hashes: str | dict | None = None) -> dict:
+    st = caminho.stat()
+    # hashes já calculados na cópia; só o SHA-256 (ex.: dedup) deixa o MD5 para obter_md5
+    if isinstance(hashes, str):
+        hashes = {"sha256": hashes}
+    if hashes:
+        hashes = {alg: hashes[alg] for alg in ("sha256", "md5") if hashes.get(alg)}
+    else:
+        hashes = calcular_hashes(caminho)
+    return {
+        "nome": caminho.name,
+        "tamanho": st.st_size,
+        "mtime": st.st_mtime,
+        **hashes,
+        "registrado_em": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def carregar_manifest(pasta) -> dict:
+    caminho = Path(pasta) / MANIFEST_NOME
+    try:
+        data = json.loads(caminho.read_text(encoding="utf-8"))
+        if isinstance(data.get("arquivos"), dict):
+            return data
+    except Exception:
+        pass
+    return {"versao": 1, "pasta": str(pasta), "arquivos": {}}
+
+
+def salvar_manifest(pasta, manifest: dict):
+    """Grava o manifest de forma atômica (arquivo temporário + os.replace)."""
+    pasta = Path(pasta)
+    manifest["atualizado_em"] = datetime.now().isoformat(timespec="seconds")
+    tmp = pasta / (MANIFEST_NOME + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, pasta / MANIFEST_NOME)
+
+
+def registrar_arquivos(pasta, caminhos, hashes: dict | None = None) -> dict:
+    """
+    Adiciona/atualiza as entradas dos `caminhos` no manifest da `pasta`.
+    `hashes` (nome -> sha256 ou {"sha256", "md5"}) evita recalcular o que já foi hasheado na cópia.
+    """
+    hashes = hashes or {}
+    manifest = carregar_manifest(pasta)
+    for caminho in caminhos:
+        caminho = Path(caminho)
+        manifest["arquivos"][caminho.name] = _entrada(caminho, hashes.get(caminho.name))
+    salvar_manifest(pasta, manifest)
+    return manifest
+
+
+def obter_entrada(caminho) -> dict | None:
+    """Entrada do manifest para `caminho`, se ainda corresponder ao arquivo (tamanho e mtime)."""
+    caminho = Path(caminho)
+    entrada = carregar_manifest(caminho.parent)["arquivos"].get(caminho.name)
+    if not entrada:
+        return None
+    try:
+        st = caminho.stat()
+    except OSError:
+        return None
+    if entrada.get("tamanho") != st.st_size or abs(entrada.get("mtime", 0) - st.st_mtime) > 1e-3:
+        return None
+    return entrada
+
+
+def obter_hash(caminho) -> str:
+    """SHA-256 de `caminho` vindo do manifest; só relê o arquivo se o manifest estiver desatualizado."""
+    entrada = obter_entrada(caminho)
+    if entrada:
+        return entrada["sha256"]
+    return registrar_arquivos(Path(caminho).parent, [caminho])["arquivos"][Path(caminho).name]["sha256"]
+
+
+def obter_md5(caminho) -> str:
+    """MD5 de `caminho` (checksum do Drive) vindo do manifest; calculado e gravado na primeira vez."""
+    caminho = Path(caminho)
+    entrada = obter_entrada(caminho)
+    if entrada and entrada.get("md5"):
+        return entrada["md5"]
+    if not entrada:
+        return registrar_arquivos(caminho.parent, [caminho])["arquivos"][caminho.name]["md5"]
+    md5 = calcular_hash(caminho, "md5")
+    manifest = carregar_manifest(caminho.parent)
+    manifest["arquivos"][caminho.name]["md5"] = md5
+    salvar_manifest(caminho.parent, manifest)
+    return md5
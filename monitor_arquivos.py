@@ -0,0 +1,290 @@
+# monitor_arquivos.py
+"""
+Monitor de chegada de arquivos num diretório (ex: pasta de backup do Clipp).
+
+Em vez de listar o diretório a cada N segundos, assina as notificações de
+alteração do sistema operacional e entrega eventos (created/modified/closed/
+deleted) aos consumidores:
+- Linux: inotify (via ctypes)
+- Windows: FindFirstChangeNotification (pywin32) + varredura do diretório
+- Fallback portátil: varredura periódica com os.scandir
+
+Os consumidores chamam `aguardar(timeout)`, que bloqueia sem gastar CPU até
+chegar algum evento (ou o timeout estourar).
+"""
+
+import os, sys, time, threading, struct, select
+import ctypes, ctypes.util
+from collections import namedtuple
+from pathlib import Path
+
+EventoArquivo = namedtuple("EventoArquivo", "tipo nome caminho")
+
+CRIADO = "created"
+MODIFICADO = "modified"
+FECHADO = "closed"
+REMOVIDO = "deleted"
+
+# constantes do inotify (linux/inotify.h)
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_MASK = (_IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO |
+            _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF | _IN_MOVE_SELF)
+_IN_EVENT = struct.Struct("iIII")
+
+
+class FileArrivalMonitor:
+    """
+    Observa `diretorio` em uma thread daemon e acumula eventos dos arquivos
+    aceitos por `filtro(nome) -> bool` (None = todos). Apenas os tipos em
+    `eventos` acordam `aguardar()`; por padrão todos.
+
+    - arquivos(): nomes atualmente presentes (conforme o último estado conhecido)
+    - aguardar(timeout): bloqueia até haver eventos e devolve a lista (coalescida por nome)
+    """
+
+    def __init__(self, diretorio, filtro=None, poll_interval: float = 1.0,
+                 backend: str = "auto", rescan_interval: float = 30.0,
+                 eventos=(CRIADO, MODIFICADO, FECHADO, REMOVIDO)):
+        self.diretorio = Path(diretorio)
+        self.filtro = filtro
+        self.eventos = frozenset(eventos)
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+        self.backend = self._escolher_backend(backend)
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.running_event = threading.Event()
+        self._cond = threading.Condition()
+        self._pendentes = {}   # nome -> EventoArquivo (último evento ainda não consumido)
+        self._estado = {}      # nome -> (tamanho, mtime_ns) ou None (inotify não faz stat)
+
+    @staticmethod
+    def _escolher_backend(backend: str) -> str:
+        if backend != "auto":
+            return backend
+        if sys.platform.startswith("linux"):
+            return "inotify"
+        if sys.platform == "win32":
+            try:
+                import win32file  # noqa: F401
+                return "win32"
+            except ImportError:
+                pass
+        return "polling"
+
+    # --- Controle de thread ---
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        # estado inicial: arquivos já existentes chegam como 'created'
+        self._varrer()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="FileArrivalMonitor")
+        self._thread.start()
+        start = time.time()
+        while time.time() - start < 3 and not self.running_event.is_set():
+            time.sleep(0.01)
+
+    def stop(self, timeout=3):
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # --- API para os consumidores ---
+    def arquivos(self) -> list[str]:
+        with self._cond:
+            return sorted(self._estado)
+
+    def aguardar(self, timeout: float | None = None) -> list[EventoArquivo]:
+        """Bloqueia até existir pelo menos um evento pendente (ou timeout) e os devolve."""
+        with self._cond:
+            if not self._pendentes and not self._stop_event.is_set():
+                self._cond.wait(timeout)
+            eventos = list(self._pendentes.values())
+            self._pendentes.clear()
+        return eventos
+
+    # --- Internos ---
+    def _aceita(self, nome: str) -> bool:
+        return self.filtro is None or self.filtro(nome)
+
+    def _emitir(self, tipo: str, nome: str):
+        evento = EventoArquivo(tipo, nome, self.diretorio / nome)
+        with self._cond:
+            if tipo == REMOVIDO:
+                self._estado.pop(nome, None)
+            else:
+                self._estado.setdefault(nome, None)
+            if tipo not in self.eventos:
+                return
+            anterior = self._pendentes.get(nome)
+            # 'created' ainda não consumido não deve ser rebaixado para 'modified'
+            if not (anterior and anterior.tipo == CRIADO and tipo == MODIFICADO):
+                self._pendentes[nome] = evento
+            self._cond.notify_all()
+
+    def _varrer(self):
+        """Lista o diretório uma vez e emite eventos pela diferença com o estado anterior."""
+        atual = {}
+        try:
+            with os.scandir(self.diretorio) as it:
+                for entry in it:
+                    if not self._aceita(entry.name):
+                        continue
+                    try:
+                        st = entry.stat()
+                        atual[entry.name] = (st.st_size, st.st_mtime_ns)
+                    except OSError:
+                        continue
+        except OSError:
+            pass  # diretório ainda não existe / inacessível
+
+        with self._cond:
+            anterior = dict(self._estado)
+        for nome, assinatura in atual.items():
+            if nome not in anterior:
+                self._emitir(CRIADO, nome)
+            elif anterior[nome] != assinatura:
+                self._emitir(MODIFICADO, nome)
+        for nome in anterior:
+            if nome not in atual:
+                self._emitir(REMOVIDO, nome)
+        with self._cond:
+            for nome, assinatura in atual.items():
+                self._estado[nome] = assinatura
+
+    def _run(self):
+        # running_event só é ligado quando o backend já está observando (start() espera por
+        # ele): um arquivo gravado logo depois do start() não perde o evento de fechamento
+        try:
+            if self.backend == "inotify":
+                if self._run_inotify():
+                    return
+            elif self.backend == "win32":
+                if self._run_win32():
+                    return
+            self.backend = "polling"
+            self._run_polling()
+        finally:
+            self.running_event.clear()
+
+    def _run_polling(self):
+        self.running_event.set()
+        while not self._stop_event.wait(self.poll_interval):
+            self._varrer()
+
+    def _run_inotify(self) -> bool:
+        """Retorna False se o inotify não puder ser usado (cai no polling)."""
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return False
+        if fd < 0:
+            return False
+        try:
+            wd = libc.inotify_add_watch(fd, os.fsencode(str(self.diretorio)), _IN_MASK)
+            if wd < 0:
+                return False
+            # o diretório pode ter mudado entre a varredura inicial e o add_watch
+            self._varrer()
+            self.running_event.set()
+            ultimo_rescan = time.monotonic()
+            while not self._stop_event.is_set():
+                prontos, _, _ = select.select([fd], [], [], self.poll_interval)
+                if time.monotonic() - ultimo_rescan > self.rescan_interval:
+                    self._varrer()
+                    ultimo_rescan = time.monotonic()
+                if not prontos:
+                    continue
+                try:
+                    dados = os.read(fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+                if self._processar_inotify(dados):
+                    # diretório removido/movido ou fila estourou: volta ao polling
+                    return False
+            return True
+        finally:
+            os.close(fd)
+
+    def _processar_inotify(self, dados: bytes) -> bool:
+        pos = 0
+        perdeu_watch = False
+        while pos + _IN_EVENT.size <= len(dados):
+            _wd, mask, _cookie, tamanho = _IN_EVENT.unpack_from(dados, pos)
+            pos += _IN_EVENT.size
+            nome = os.fsdecode(dados[pos:pos + tamanho].rstrip(b"\0"))
+            pos += tamanho
+
+            if mask & _IN_Q_OVERFLOW:
+                self._varrer()
+                continue
+            if mask & (_IN_DELETE_SELF | _IN_MOVE_SELF | _IN_IGNORED):
+                perdeu_watch = True
+                continue
+            if not nome or not self._aceita(nome):
+                continue
+            if mask & (_IN_DELETE | _IN_MOVED_FROM):
+                self._emitir(REMOVIDO, nome)
+            elif mask & _IN_CLOSE_WRITE:
+                self._emitir(FECHADO, nome)
+            elif mask & (_IN_CREATE | _IN_MOVED_TO):
+                self._emitir(CRIADO, nome)
+            elif mask & _IN_MODIFY:
+                self._emitir(MODIFICADO, nome)
+        return perdeu_watch
+
+    def _run_win32(self) -> bool:
+        """Retorna False se a notificação do Windows não puder ser usada (cai no polling)."""
+        try:
+            import win32file, win32event, win32con
+            handle = win32file.FindFirstChangeNotification(
+                str(self.diretorio), False,
+                win32con.FILE_NOTIFY_CHANGE_FILE_NAME
+                | win32con.FILE_NOTIFY_CHANGE_SIZE
+                | win32con.FILE_NOTIFY_CHANGE_LAST_WRITE,
+            )
+        except Exception:
+            return False
+        try:
+            self._varrer()
+            self.running_event.set()
+            ultimo_rescan = time.monotonic()
+            espera_ms = int(self.poll_interval * 1000)
+            while not self._stop_event.is_set():
+                r = win32event.WaitForSingleObject(handle, espera_ms)
+                if r == win32con.WAIT_OBJECT_0:
+                    self._varrer()
+                    ultimo_rescan = time.monotonic()
+                    win32file.FindNextChangeNotification(handle)
+                elif time.monotonic() - ultimo_rescan > self.rescan_interval:
+                    self._varrer()
+                    ultimo_rescan = time.monotonic()
+            return True
+        finally:
+            try:
+                win32file.FindCloseChangeNotification(handle)
+            except Exception:
+                pass
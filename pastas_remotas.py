@@ -0,0 +1,90 @@
+# pastas_remotas.py
+"""
+Árvore remota espelhando a local: <pasta raiz>/BACKUP yyyy/MÊS/dd_mm_yyyy.
+
+Os ids das pastas remotas ficam num cache em disco (caminho relativo → id), então
+achar ou criar a pasta de um dia só custa chamadas à API na primeira vez. Ao
+procurar uma pasta que não está no cache, todas as subpastas do nível são
+listadas de uma vez e guardadas (um ano inteiro de dias sai em uma chamada por
+mês). Uma pasta apagada no destino é detectada no envio (PastaInexistente):
+`invalidar` tira ela e tudo abaixo dela do cache, e a próxima resolução a recria.
+"""
+
+import json, os, threading
+from datetime import date
+from pathlib import Path
+from arvore_backup import partes_da_pasta
+
+
+class RemoteFolderCache:
+    def __init__(self, caminho, backend, raiz: str = ""):
+        self.caminho = Path(caminho)
+        self.backend = backend
+        self.raiz = raiz
+        self._lock = threading.RLock()
+        self._pastas = self._carregar()
+        self._listados = set()  # níveis já listados nesta execução
+
+    def _carregar(self) -> dict:
+        try:
+            dados = json.loads(self.caminho.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        # outra raiz (ou outro destino) no config: ids antigos não valem mais
+        if dados.get("raiz") != self.raiz or dados.get("destino") != self.backend.nome:
+            return {}
+        return dados.get("pastas", {})
+
+    def _salvar(self):
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.caminho.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"raiz": self.raiz, "destino": self.backend.nome, "pastas": self._pastas},
+                                  ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(tmp, self.caminho)
+
+    def resolver(self, partes, criar: bool = True) -> str | None:
+        """Id da pasta `raiz/partes[0]/partes[1]/...`, criando as que faltam (ou None se `criar` for False)."""
+        with self._lock:
+            pai, caminho, mudou = self.raiz, "", False
+            try:
+                for parte in partes:
+                    caminho = f"{caminho}/{parte}" if caminho else parte
+                    prefixo = caminho[:-len(parte)]
+                    if caminho not in self._pastas and prefixo not in self._listados:
+                        # uma listagem traz todas as irmãs; as próximas buscas no nível saem do cache
+                        for nome, id_pasta in self.backend.subpastas(pai).items():
+                            self._pastas.setdefault(prefixo + nome, id_pasta)
+                        self._listados.add(prefixo)
+                        mudou = True
+                    if caminho not in self._pastas:
+                        if not criar:
+                            return None
+                        self._pastas[caminho] = self.backend.criar_pasta(parte, pai)
+                        mudou = True
+                    pai = self._pastas[caminho]
+                return pai
+            finally:
+                if mudou:
+                    self._salvar()
+
+    def pasta_do_dia(self, data: date, criar: bool = True) -> str | None:
+        return self.resolver(partes_da_pasta(data), criar=criar)
+
+    def invalidar(self, id_pasta: str):
+        """
+        Esquece a pasta `id_pasta` (apagada no destino), tudo abaixo dela e as pastas acima
+        (que podem ter sido apagadas junto): a próxima resolução confere o caminho de novo.
+        """
+        with self._lock:
+            caminhos = [c for c, i in self._pastas.items() if i == id_pasta]
+            if not caminhos:
+                return
+            acima = set()
+            for c in caminhos:
+                partes = c.split("/")
+                acima.update("/".join(partes[:n]) for n in range(1, len(partes)))
+            for c in list(self._pastas):
+                if c in acima or any(c == p or c.startswith(p + "/") for p in caminhos):
+                    del self._pastas[c]
+            self._listados.clear()
+            self._salvar()
@@ -0,0 +1,145 @@
+# pipeline_tee.py
+"""
+Leitura única com distribuição ("tee") dos blocos para vários consumidores.
+
+Cada zip estável é lido uma vez só; cada bloco lido vai para a fila de cada
+consumidor (gravação no destino, hash, upload), e cada consumidor roda na sua
+própria thread. As filas são limitadas, então o consumidor mais lento segura
+a leitura (memória máxima ≈ bloco × fila_max × consumidores) em vez de
+acumular o arquivo na RAM. Nas máquinas da loja, com HD lento, isso troca três
+leituras do mesmo arquivo (cópia, hash, upload) por uma.
+
+Um consumidor que falha não derruba os outros: sua fila continua sendo
+esvaziada e o erro é devolvido no resultado.
+"""
+
+import io, queue, threading, hashlib, contextvars
+
+BLOCO = 8 * 1024 * 1024
+FILA_MAXIMA = 4
+_FIM = object()
+
+
+class ErroConsumidor(Exception):
+    pass
+
+
+def _rodar(fn, fila: queue.Queue, saida: dict, nome: str):
+    fim = []
+
+    def blocos():
+        while (bloco := fila.get()) is not _FIM:
+            yield bloco
+        fim.append(True)
+
+    try:
+        saida[nome] = fn(blocos())
+    except Exception as e:
+        saida[nome] = ErroConsumidor(f"{nome}: {e}")
+        saida[nome].__cause__ = e
+    finally:
+        # esvazia o que sobrou para a leitura nunca ficar presa numa fila cheia
+        if not fim:
+            while fila.get() is not _FIM:
+                pass
+
+
+def distribuir(origem, consumidores: dict, offset: int = 0, bloco: int = BLOCO,
+               fila_max: int = FILA_MAXIMA) -> dict:
+    """
+    Lê `origem` (a partir de `offset`) uma única vez e entrega cada bloco a todos os
+    `consumidores` ({nome: fn(blocos) -> resultado}). Retorna {nome: resultado}; o
+    resultado de um consumidor que falhou é uma ErroConsumidor. Erros de leitura sobem.
+    """
+    filas = {nome: queue.Queue(maxsize=fila_max) for nome in consumidores}
+    saida = {}
+    threads = [
+        threading.Thread(target=contextvars.copy_context().run, args=(_rodar, fn, filas[nome], saida, nome),
+                         name=f"tee-{nome}", daemon=True)
+        for nome, fn in consumidores.items()
+    ]
+    for t in threads:
+        t.start()
+    try:
+        with open(origem, "rb") as f:
+            f.seek(offset)
+            while dados := f.read(bloco):
+                for fila in filas.values():
+                    fila.put(dados)
+    finally:
+        for fila in filas.values():
+            fila.put(_FIM)
+        for t in threads:
+            t.join()
+    return saida
+
+
+def verificar_resultados(resultados: dict, obrigatorios=()) -> dict:
+    """Relança o erro do primeiro consumidor `obrigatorio` que falhou; devolve os resultados."""
+    for nome in obrigatorios:
+        if isinstance(resultados.get(nome), ErroConsumidor):
+            raise resultados[nome]
+    return resultados
+
+
+# --- Consumidores prontos ---
+def consumidor_hash(algoritmos=("sha256", "md5"), hashes=None):
+    """Consumidor que calcula os `algoritmos` ({alg: hex}). `hashes` permite continuar objetos já alimentados."""
+    def consumir(blocos) -> dict:
+        hs = hashes or {alg: hashlib.new(alg) for alg in algoritmos}
+        for dados in blocos:
+            for h in hs.values():
+                h.update(dados)
+        return {alg: h.hexdigest() for alg, h in hs.items()}
+    return consumir
+
+
+class LeitorFluxo(io.RawIOBase):
+    """
+    Arquivo somente leitura sobre um iterável de blocos, para entregar o fluxo a quem
+    espera `seek`/`read` (ex.: upload resumível). `seek` para trás só vale até o último
+    ponto confirmado: tudo antes do último `seek` é descartado da memória.
+    """
+
+    def __init__(self, blocos):
+        super().__init__()
+        self._it = iter(blocos)
+        self._buf = bytearray()
+        self._base = 0   # offset do primeiro byte em _buf
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence != io.SEEK_SET or offset < self._base:
+            raise io.UnsupportedOperation(f"fluxo já descartou os bytes anteriores a {self._base}")
+        self._pos = offset
+        corte = min(offset - self._base, len(self._buf))
+        del self._buf[:corte]
+        self._base += corte
+        return offset
+
+    def tell(self) -> int:
+        return self._pos
+
+    def read(self, n: int = -1) -> bytes:
+        while n < 0 or self._base + len(self._buf) < self._pos + n:
+            try:
+                self._buf += next(self._it)
+            except StopIteration:
+                break
+        inicio = self._pos - self._base
+        if inicio >= len(self._buf):
+            return b""
+        dados = bytes(self._buf[inicio:] if n < 0 else self._buf[inicio:inicio + n])
+        self._pos += len(dados)
+        return dados
+
+    def readinto(self, b) -> int:
+        dados = self.read(len(b))
+        b[:len(dados)] = dados
+        return len(dados)
@@ -0,0 +1,115 @@
+# planejador_upload.py
+"""
+Planejamento do envio retroativo: todos os dias que ainda não estão na nuvem,
+e não só a pasta mais recente.
+
+O planejamento não varre a árvore nem relê zips: os arquivos ainda não
+marcados como enviados saem de uma consulta ao catálogo SQLite (com tamanho e
+MD5 do manifest; só pastas catalogadas sem nenhum arquivo, de antes do manifest,
+são lidas do disco, e o MD5 delas é calculado quando há um remoto de mesmo nome e
+tamanho para comparar) e são comparados com a listagem remota em cache
+(RemoteManifestCache), uma por pasta remota. O que já está lá é só marcado
+como enviado no catálogo; o resto vira o plano, agrupado por dia e ordenado
+pela política ("antigos" primeiro ou "recentes" primeiro). Um zip guardado só
+como receita de blocos entra no plano; quem envia o reconstrói antes. Um zip
+recomprimido sobe como o arquivo recomprimido (`.zip.xz`/`.zip.zst`). Um arquivo
+que não existe mais nem localmente nem na nuvem é logado, um a um, como perdido.
+"""
+
+import time
+from chunk_store import receita_de
+from manifest import obter_md5
+from recompressao import EXTENSOES
+
+POLITICAS = ("antigos", "recentes")
+
+
+def _mesmo_arquivo(remoto: dict | None, tamanho: int, md5: str | None) -> bool:
+    """Mesmo tamanho e mesmo MD5; sem o MD5 dos dois lados não dá para dizer que é o mesmo arquivo."""
+    return bool(remoto) and remoto.get("tamanho") == tamanho and bool(md5) and remoto.get("md5") == md5
+
+
+def _recomprimido(caminho):
+    """O arquivo recomprimido que substituiu o zip `caminho`, se houver."""
+    for extensao in EXTENSOES.values():
+        artefato = caminho.with_name(caminho.name + extensao)
+        if artefato.is_file():
+            return artefato
+    return None
+
+
+def planejar(catalogo, cache, pasta_remota_de, politica: str = "antigos", log=print,
+             pasta_legada: str | None = None) -> list[dict]:
+    """
+    Retorna [{"data", "pasta", "pasta_remota", "arquivos": [Path, ...], "substituir": {nome, ...},
+    "nomes": {Path: nome}}] dos dias com arquivos a enviar; `substituir` são os nomes que já existem na
+    pasta remota com outro conteúdo e `nomes` dá o nome no catálogo de um arquivo recomprimido.
+    `pasta_remota_de(data) -> str | None` diz em que pasta remota cada dia fica (None: ainda não
+    existe, nada do dia está na nuvem). Arquivos enviados antes do espelhamento da árvore, todos
+    soltos em `pasta_legada`, também contam como já enviados.
+    """
+    if politica not in POLITICAS:
+        raise ValueError(f"política de envio desconhecida: {politica} (use {' ou '.join(POLITICAS)})")
+    inicio = time.monotonic()
+    if catalogo.vazio():
+        catalogo.sincronizar()
+    elif catalogo.completar():
+        log("📋 Catálogo: zips de pastas sem manifest registrados para o envio.")
+
+    ja_remotos, indisponiveis, dias = [], 0, {}
+    listagens = {}
+    for item in catalogo.arquivos_pendentes():
+        caminho = item["pasta"] / item["nome"]
+        destino = pasta_remota_de(item["data"])
+        md5 = item["md5"]
+        ja_la = False
+        for pasta in dict.fromkeys((destino, pasta_legada)):
+            if pasta is None:
+                continue
+            if pasta not in listagens:
+                listagens[pasta] = cache.arquivos(pasta)
+            remoto = listagens[pasta].get(item["nome"])
+            if (not md5 and remoto and remoto.get("md5") and remoto.get("tamanho") == item["tamanho"]
+                    and caminho.is_file()):
+                try:
+                    md5 = obter_md5(caminho)  # mesmo nome e tamanho não bastam: confere pelo conteúdo
+                except OSError as e:
+                    log(f"⚠️ Não foi possível calcular o MD5 de {caminho.name}; será enviado: {e}")
+            if _mesmo_arquivo(remoto, item["tamanho"], md5):
+                ja_la = True
+                break
+        if ja_la:
+            ja_remotos.append((item["data"], item["nome"]))
+            continue
+        envio = caminho
+        if not caminho.is_file() and not receita_de(caminho).is_file():
+            envio = _recomprimido(caminho)
+            if envio is None:
+                indisponiveis += 1
+                log(f"❌ {caminho} não existe mais localmente e não está na nuvem: "
+                    f"este backup não tem cópia fora da loja.")
+                continue
+        dia = dias.setdefault(item["data"], {"data": item["data"], "pasta": item["pasta"], "pasta_remota": destino,
+                                             "arquivos": [], "substituir": set(), "nomes": {}})
+        dia["arquivos"].append(envio)
+        if envio != caminho:
+            dia["nomes"][envio] = item["nome"]
+        if destino is not None and envio.name in listagens.get(destino, {}):
+            dia["substituir"].add(envio.name)
+
+    if ja_remotos:
+        catalogo.marcar_uploads(ja_remotos, "enviado")
+    plano = sorted(dias.values(), key=lambda d: d["data"], reverse=politica == "recentes")
+    n_arquivos = sum(len(d["arquivos"]) for d in plano)
+    log(f"📋 Plano de envio ({politica} primeiro): {n_arquivos} arquivo(s) em {len(plano)} dia(s); "
+        f"{len(ja_remotos)} já estavam na nuvem, {indisponiveis} sem cópia local nem remota "
+        f"({time.monotonic() - inicio:.2f}s).")
+    return plano
+
+
+def resumo(plano: list[dict]) -> str:
+    if not plano:
+        return "Nada a enviar."
+    datas = [d["data"] for d in plano]
+    return (f"{sum(len(d['arquivos']) for d in plano)} arquivo(s), {len(plano)} dia(s) "
+            f"de {min(datas):%d/%m/%Y} a {max(datas):%d/%m/%Y}")
@@ -0,0 +1,172 @@
+# recompressao.py
+"""
+Recompressão (opcional) dos zips arquivados para um formato mais denso.
+
+O deflate do Clipp comprime pouco, e comprimir o zip já deflateado quase não
+rende. Então cada zip é primeiro reescrito sem compressão (ZIP_STORED, mesmas
+entradas e CRCs) e esse zip "cru" é comprimido em blocos independentes de
+64 MB, em paralelo num pool de processos com `nucleos` workers (padrão: metade
+dos núcleos, para não travar o PDV enquanto roda em background):
+
+- xz   -> `<nome>.zip.xz`  (streams xz concatenados; lzma/7-Zip leem direto)
+- zstd -> `<nome>.zip.zst` (frames zstd concatenados; requer o pacote zstandard)
+
+Antes de apagar o original, as entradas do zip cru (nome, CRC-32 e tamanho) são
+comparadas com as do original, e o arquivo é descomprimido em streaming e o SHA-256
+comparado com o do zip cru. Descomprimir devolve um zip válido com o mesmo conteúdo.
+"""
+
+import os, lzma, shutil, time, zipfile, hashlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from manifest import calcular_hash, carregar_manifest, salvar_manifest
+
+try:
+    import zstandard
+except ImportError:  # zstd é opcional
+    zstandard = None
+
+BLOCO = 64 * 1024 * 1024
+EXTENSOES = {"xz": ".xz", "zstd": ".zst"}
+
+
+def _comprimir_bloco(caminho: str, offset: int, tamanho: int, formato: str, nivel: int) -> bytes:
+    """Executado no processo filho: lê e comprime um bloco do zip cru."""
+    with open(caminho, "rb") as f:
+        f.seek(offset)
+        dados = f.read(tamanho)
+    if formato == "zstd":
+        return zstandard.ZstdCompressor(level=nivel).compress(dados)
+    return lzma.compress(dados, format=lzma.FORMAT_XZ, preset=nivel)
+
+
+def _abrir_descompressao(caminho, formato: str):
+    if formato == "zstd":
+        f = open(caminho, "rb")
+        return zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True, closefd=True)
+    return lzma.open(caminho, "rb")
+
+
+def _zip_sem_compressao(origem: Path, destino: Path):
+    """Reescreve `origem` com as mesmas entradas em ZIP_STORED (streaming, 1 MB por vez)."""
+    with zipfile.ZipFile(origem) as zin, zipfile.ZipFile(destino, "w", zipfile.ZIP_STORED, allowZip64=True) as zout:
+        zout.comment = zin.comment
+        for info in zin.infolist():
+            novo = zipfile.ZipInfo(info.filename, info.date_time)
+            novo.compress_type = zipfile.ZIP_STORED
+            novo.external_attr = info.external_attr
+            novo.comment = info.comment
+            if info.is_dir():
+                zout.writestr(novo, b"")
+                continue
+            novo.file_size = info.file_size
+            with zin.open(info) as src, zout.open(novo, "w", force_zip64=info.file_size > 0x7FFFFFFF) as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+
+
+def _entradas(caminho) -> list[tuple]:
+    with zipfile.ZipFile(caminho) as z:
+        return [(info.filename, info.CRC, info.file_size) for info in z.infolist()]
+
+
+def _conferir_entradas(original: Path, cru: Path):
+    """
+    O zip cru tem que ter as mesmas entradas do original, com os mesmos CRC-32 e tamanhos.
+    Os CRCs do cru são calculados pelo zipfile sobre os bytes gravados, então conferir com
+    os do original (que o Clipp gravou) confere o conteúdo, não só a cópia.
+    """
+    esperadas, obtidas = sorted(_entradas(original)), sorted(_entradas(cru))
+    if esperadas != obtidas:
+        diferentes = sorted({nome for nome, _crc, _tamanho in set(esperadas) ^ set(obtidas)})
+        raise IOError(f"entradas de {original.name} não conferem após a cópia sem compressão: "
+                      f"{', '.join(diferentes[:5]) or 'entradas repetidas'}")
+
+
+def resolver_formato(formato: str, log=print) -> str:
+    if formato == "zstd" and zstandard is None:
+        log("⚠️ Pacote 'zstandard' não instalado — usando xz na recompressão.")
+        return "xz"
+    return formato if formato in EXTENSOES else "xz"
+
+
+def recomprimir_zip(caminho, formato: str = "xz", nivel: int = 6, nucleos: int | None = None, log=print) -> dict:
+    """
+    Recomprime `caminho` e só então apaga o original.
+    Retorna estatísticas: arquivo, formato, tamanhos, razão, MB/s e SHA-256 do zip cru.
+    """
+    caminho = Path(caminho)
+    formato = resolver_formato(formato, log)
+    nucleos = nucleos or max(1, (os.cpu_count() or 1) // 2)
+    destino = caminho.with_name(caminho.name + EXTENSOES[formato])
+    cru = caminho.with_name(caminho.name + ".stored.tmp")
+    tmp = destino.with_name(destino.name + ".tmp")
+    inicio = time.monotonic()
+    try:
+        _zip_sem_compressao(caminho, cru)
+        _conferir_entradas(caminho, cru)
+        sha_cru = calcular_hash(cru)
+        tamanho_cru = cru.stat().st_size
+
+        offsets = range(0, tamanho_cru, BLOCO)
+        with ProcessPoolExecutor(max_workers=nucleos) as pool, open(tmp, "wb") as out:
+            # pool.map devolve na ordem de submissão, então os frames saem na ordem do arquivo
+            for frame in pool.map(_comprimir_bloco, [str(cru)] * len(offsets), offsets,
+                                  [BLOCO] * len(offsets), [formato] * len(offsets), [nivel] * len(offsets)):
+                out.write(frame)
+            out.flush()
+            os.fsync(out.fileno())
+
+        # ida e volta: o conteúdo descomprimido tem que ser idêntico ao zip cru
+        h = hashlib.sha256()
+        with _abrir_descompressao(tmp, formato) as f:
+            while bloco := f.read(8 * 1024 * 1024):
+                h.update(bloco)
+        if h.hexdigest() != sha_cru:
+            raise IOError(f"ida e volta da recompressão de {caminho.name} não confere")
+
+        os.replace(tmp, destino)
+        tamanho_original = caminho.stat().st_size
+        caminho.unlink()
+    finally:
+        for t in (cru, tmp):
+            if t.exists():
+                t.unlink()
+
+    duracao = max(time.monotonic() - inicio, 1e-6)
+    tamanho_final = destino.stat().st_size
+    return {
+        "arquivo": destino.name,
+        "formato": formato,
+        "nivel": nivel,
+        "tamanho_original": tamanho_original,
+        "tamanho_final": tamanho_final,
+        "razao": round(tamanho_original / max(tamanho_final, 1), 3),
+        "duracao_s": round(duracao, 2),
+        "mb_s": round(tamanho_original / 1024**2 / duracao, 1),
+        "sha256_zip_cru": sha_cru,
+    }
+
+
+def recomprimir_pasta(pasta, formato: str = "xz", nivel: int = 6, nucleos: int | None = None, log=print) -> list[dict]:
+    """Recomprime os zips da `pasta`, registra no manifest e loga razão e throughput da execução."""
+    pasta = Path(pasta)
+    stats = []
+    manifest = carregar_manifest(pasta)
+    for zip_path in sorted(pasta.glob("*.zip")):
+        try:
+            s = recomprimir_zip(zip_path, formato=formato, nivel=nivel, nucleos=nucleos, log=log)
+        except Exception as e:
+            log(f"⚠️ Recompressão de {zip_path.name} falhou (original mantido): {e}")
+            continue
+        log(f"🗜️ {zip_path.name} → {s['arquivo']}: razão {s['razao']:.2f}x, {s['mb_s']:.1f} MB/s")
+        if zip_path.name in manifest["arquivos"]:
+            manifest["arquivos"][zip_path.name]["recompressao"] = s
+        stats.append(s)
+    if stats:
+        salvar_manifest(pasta, manifest)
+        original = sum(s["tamanho_original"] for s in stats)
+        final = sum(s["tamanho_final"] for s in stats)
+        duracao = max(sum(s["duracao_s"] for s in stats), 1e-6)
+        log(f"🗜️ Recompressão de {pasta.name}: {original / 1024**2:.1f} → {final / 1024**2:.1f} MB "
+            f"(razão {original / max(final, 1):.2f}x, {original / 1024**2 / duracao:.1f} MB/s).")
+    return stats
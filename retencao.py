@@ -0,0 +1,163 @@
+# retencao.py
+"""
+Retenção avô-pai-filho (GFS) da árvore BACKUP yyyy/MÊS/dd_mm_yyyy.
+
+Mantém as `diarios` pastas mais recentes, a pasta mais recente de cada uma das
+últimas `semanais` semanas e de cada um dos últimos `mensais` meses; o resto é
+apagado em background após um backup bem-sucedido. `dry_run=True` só gera o relatório.
+Pastas `protegidas` (ainda na fila de upload ou não enviadas) nunca são apagadas.
+"""
+
+import os, shutil, threading, contextvars
+from datetime import date
+from pathlib import Path
+from arvore_backup import listar_pastas_dia
+from dedup import ContentStore, CAS_DIR
+from catalogo import BackupCatalog, CATALOGO_NOME
+from chunk_store import ChunkStore, CHUNKS_DIR, receitas_da_arvore
+
+
+def calcular_poda(pastas: list[tuple[date, Path]], diarios: int = 0, semanais: int = 0,
+                  mensais: int = 0, hoje: date | None = None, protegidas=None) -> tuple[list, list]:
+    """
+    Separa `pastas` (lista de (data, caminho)) em (manter, podar).
+    A pasta de hoje, a mais recente e as `protegidas` nunca são podadas.
+    """
+    hoje = hoje or date.today()
+    recentes = sorted(pastas, key=lambda item: item[0], reverse=True)
+    manter = {Path(p) for p in protegidas or ()}
+    if recentes:
+        manter.add(recentes[0][1])
+
+    semanas, meses = [], []
+    for i, (data, caminho) in enumerate(recentes):
+        if i < diarios or data >= hoje:
+            manter.add(caminho)
+        semana = data.isocalendar()[:2]
+        if semana not in semanas and len(semanas) < semanais:
+            semanas.append(semana)
+            manter.add(caminho)
+        mes = (data.year, data.month)
+        if mes not in meses and len(meses) < mensais:
+            meses.append(mes)
+            manter.add(caminho)
+
+    manter_lista = [item for item in pastas if item[1] in manter]
+    podar_lista = [item for item in pastas if item[1] not in manter]
+    return manter_lista, podar_lista
+
+
+def _tamanho_pasta(caminho) -> int:
+    total = 0
+    try:
+        with os.scandir(caminho) as it:
+            for e in it:
+                if e.is_file(follow_symlinks=False):
+                    st = e.stat(follow_symlinks=False)
+                    # hardlinks do armazenamento deduplicado não liberam espaço sozinhos
+                    if st.st_nlink <= 1:
+                        total += st.st_size
+    except OSError:
+        pass
+    return total
+
+
+def _relatorio(pastas: list, manter: list, podar: list) -> dict:
+    return {
+        "total": len(pastas),
+        "manter": [str(p) for _, p in manter],
+        "podar": [str(p) for _, p in podar],
+        "bytes_liberados": sum(_tamanho_pasta(p) for _, p in podar),
+    }
+
+
+def relatorio_retencao(base_dir, diarios: int = 0, semanais: int = 0, mensais: int = 0,
+                       protegidas=None) -> dict:
+    """Simulação (dry-run): o que seria mantido/apagado e quantos bytes seriam liberados."""
+    pastas = listar_pastas_dia(base_dir)
+    manter, podar = calcular_poda(pastas, diarios, semanais, mensais, protegidas=protegidas)
+    return _relatorio(pastas, manter, podar)
+
+
+def _remover_vazias(caminho: Path, base: Path):
+    """Sobe a partir de `caminho` removendo pastas de mês/ano que ficaram vazias."""
+    atual = caminho
+    while atual != base and base in atual.parents:
+        try:
+            atual.rmdir()
+        except OSError:
+            break
+        atual = atual.parent
+
+
+def _podar(base_dir: Path, podar: list, log):
+    catalogo = None
+    if (base_dir / CATALOGO_NOME).exists():
+        try:
+            catalogo = BackupCatalog(base_dir)
+        except Exception as e:
+            log(f"⚠️ Retenção: catálogo indisponível: {e}")
+
+    removidas = 0
+    for data, caminho in podar:
+        try:
+            shutil.rmtree(caminho)
+            removidas += 1
+            _remover_vazias(caminho.parent, base_dir)
+            if catalogo is not None:
+                catalogo.remover_pasta(data)
+        except Exception as e:
+            log(f"⚠️ Retenção: falha ao apagar {caminho}: {e}")
+    if (base_dir / CAS_DIR).is_dir():
+        try:
+            orfaos = ContentStore(base_dir / CAS_DIR, log=log).remover_orfaos()
+            if orfaos:
+                log(f"Retenção: {orfaos} blob(s) sem referência removido(s) do armazenamento deduplicado.")
+        except Exception as e:
+            log(f"⚠️ Retenção: falha ao limpar armazenamento deduplicado: {e}")
+    if (base_dir / CHUNKS_DIR).is_dir():
+        try:
+            receitas = receitas_da_arvore(p for _, p in listar_pastas_dia(base_dir))
+            apagados = ChunkStore(base_dir / CHUNKS_DIR).coletar_lixo(receitas)
+            if apagados:
+                log(f"Retenção: {apagados} bloco(s) sem referência removido(s).")
+        except Exception as e:
+            log(f"⚠️ Retenção: falha ao limpar armazenamento em blocos: {e}")
+    log(f"🧹 Retenção concluída: {removidas} pasta(s) apagada(s).")
+
+
+def aplicar_retencao(base_dir, diarios: int = 0, semanais: int = 0, mensais: int = 0,
+                     log=print, dry_run: bool = False, em_segundo_plano: bool = True, protegidas=None):
+    """
+    Calcula o conjunto de poda e apaga as pastas (em thread daemon por padrão).
+    `protegidas`: pastas que ficam de qualquer jeito (ex.: ainda não enviadas à nuvem).
+    Retorna o relatório da simulação; com `dry_run` nada é apagado.
+    """
+    if not (diarios or semanais or mensais):
+        log("Retenção desativada (nenhuma política configurada).")
+        return None
+
+    base_dir = Path(base_dir)
+    pastas = listar_pastas_dia(base_dir)
+    protegidas = {Path(p) for p in protegidas or ()}
+    manter, podar = calcular_poda(pastas, diarios, semanais, mensais, protegidas=protegidas)
+    retidas = sum(1 for _, caminho in pastas if caminho in protegidas)
+    if retidas:
+        log(f"Retenção: {retidas} pasta(s) protegida(s) por ainda não estarem na nuvem.")
+    log(f"Retenção (diários={diarios}, semanais={semanais}, mensais={mensais}): "
+        f"{len(pastas)} pasta(s), manter {len(manter)}, apagar {len(podar)}.")
+
+    if dry_run:
+        relatorio = _relatorio(pastas, manter, podar)
+        for caminho in relatorio["podar"]:
+            log(f"[dry-run] apagaria: {caminho}")
+        log(f"[dry-run] espaço liberado: {relatorio['bytes_liberados'] / 1024**2:.1f} MB")
+        return relatorio
+
+    if podar:
+        if em_segundo_plano:
+            threading.Thread(target=contextvars.copy_context().run, args=(_podar, base_dir, podar, log),
+                             daemon=True, name="Retencao").start()
+        else:
+            _podar(base_dir, podar, log)
+    return {"total": len(pastas), "manter": [str(p) for _, p in manter], "podar": [str(p) for _, p in podar]}
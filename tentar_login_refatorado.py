@@ -2,6 +2,7 @@ import time
 import pyautogui
 from pywinauto import Desktop, Application
 from utils import log
+from fases import fase, medida
 from pywinauto.findwindows import ElementNotFoundError
 
 def localizar_janela_login() -> object | None:
@@ -27,6 +28,7 @@ def localizar_janela_aviso() -> object | None:
             return w
     return None
 
+@medida("login", ok=lambda r: r is True)
 def tentar_login_refatorado(usuario: str, senha: str, timeout: int = 30) -> bool:
     """Realiza login no ClippPro e trata erro de login automático."""
     log("🔎 Aguardando janela de login do ClippPro...")
@@ -35,11 +37,14 @@ def tentar_login_refatorado(usuario: str, senha: str, timeout: int = 30) -> bool
     tempo_inicial = time.time()
 
     # 1️⃣ Aguarda a janela de login
-    while time.time() - tempo_inicial < timeout:
-        janela_login = localizar_janela_login()
-        if janela_login:
-            break
-        time.sleep(1)
+    with fase("aguardar_janela") as etapa:
+        while time.time() - tempo_inicial < timeout:
+            janela_login = localizar_janela_login()
+            if janela_login:
+                break
+            time.sleep(1)
+        else:
+            etapa.falhou("timeout")
 
     if not janela_login:
         log("⚠️ Janela de login não encontrada dentro do timeout.")
@@ -71,21 +76,24 @@ def tentar_login_refatorado(usuario: str, senha: str, timeout: int = 30) -> bool
             pyautogui.press("enter")
 
                 # ✅ Primeira tentativa
-        preencher_campos(usuario, senha)
+        with fase("preencher"):
+            preencher_campos(usuario, senha)
         log("✅ Login enviado. Aguardando resposta...")
 
         desktop = Desktop(backend="win32")
         t0 = time.time()
 
         # 1️⃣ Espera alguns segundos pra ver se entrou de primeira
-        while time.time() - t0 < 6:
-            for win in desktop.windows():
-                titulo = (win.window_text() or "").lower()
-                if f"usuário: {usuario}".lower() in titulo:
-                    log("🎉 Login bem-sucedido (janela principal detectada).")
-                    return True
-
-            time.sleep(0.5)
+        with fase("aguardar_resposta") as etapa:
+            while time.time() - t0 < 6:
+                for win in desktop.windows():
+                    titulo = (win.window_text() or "").lower()
+                    if f"usuário: {usuario}".lower() in titulo:
+                        log("🎉 Login bem-sucedido (janela principal detectada).")
+                        return True
+
+                time.sleep(0.5)
+            etapa.status = "sem_resposta"
 
         # 2️⃣ Caso não detecte sucesso, checa se apareceu aviso
         aviso = localizar_janela_aviso()
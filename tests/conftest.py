@@ -0,0 +1,7 @@
+# tests/conftest.py
+"""Os módulos do bot ficam na raiz do repositório, sem pacote: ela entra no sys.path dos testes."""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,72 @@
+# tests/test_catalogo.py
+"""Estado de upload por pasta de dia no catálogo, usado pela retenção e pela manutenção."""
+
+import hashlib
+from datetime import date
+from arvore_backup import partes_da_pasta, listar_pastas_dia
+from catalogo import BackupCatalog
+from manifest import registrar_arquivos
+from planejador_upload import planejar
+from retencao import aplicar_retencao
+
+
+def _pasta(base, data: date, zips: dict | None = None, manifest: bool = True):
+    pasta = base.joinpath(*partes_da_pasta(data))
+    pasta.mkdir(parents=True)
+    caminhos = []
+    for nome, dados in (zips or {}).items():
+        (pasta / nome).write_bytes(dados)
+        caminhos.append(pasta / nome)
+    if manifest and caminhos:
+        registrar_arquivos(pasta, caminhos)
+    return pasta
+
+
+class CacheFalso:
+    def __init__(self, listagem):
+        self.listagem = listagem
+
+    def arquivos(self, _pasta):
+        return self.listagem
+
+
+def test_pasta_sem_zips_conta_como_enviada(tmp_path):
+    vazia = _pasta(tmp_path, date(2024, 1, 2))
+    com_zip = _pasta(tmp_path, date(2024, 1, 3), {"CLIPP03012024.zip": b"x"})
+    catalogo = BackupCatalog(tmp_path)
+    catalogo.sincronizar()
+    assert catalogo.pastas_enviadas() == {vazia}
+    catalogo.marcar_upload(date(2024, 1, 3), "CLIPP03012024.zip")
+    assert catalogo.pastas_enviadas() == {vazia, com_zip}
+
+
+def test_pasta_antiga_fica_pendente_ate_o_destino_confirmar(tmp_path):
+    dados = b"a" * 64
+    antiga = _pasta(tmp_path, date(2024, 1, 2), {"CLIPP02012024.zip": dados}, manifest=False)
+    catalogo = BackupCatalog(tmp_path)
+    catalogo.registrar_pasta(date(2024, 1, 2), antiga, {"arquivos": {}})
+    with catalogo._conectar() as con:
+        con.execute("DELETE FROM arquivos")  # catálogo de antes de ler os zips sem manifest
+
+    catalogo.completar()
+    assert antiga not in catalogo.pastas_enviadas()
+
+    remoto = {"CLIPP02012024.zip": {"tamanho": len(dados), "md5": hashlib.md5(dados).hexdigest()}}
+    assert planejar(catalogo, CacheFalso(remoto), lambda _d: "raiz", log=lambda _m: None) == []
+    assert antiga in catalogo.pastas_enviadas()
+
+
+def test_retencao_poda_pastas_antigas_confirmadas_e_protege_as_outras(tmp_path):
+    datas = [date(2024, 1, d) for d in range(1, 6)]
+    for d in datas:
+        _pasta(tmp_path, d, {f"CLIPP{d:%d%m%Y}.zip": d.isoformat().encode()}, manifest=False)
+    catalogo = BackupCatalog(tmp_path)
+    catalogo.sincronizar()
+    for d in datas[:2]:
+        catalogo.marcar_upload(d, f"CLIPP{d:%d%m%Y}.zip")
+    enviadas = catalogo.pastas_enviadas()
+    protegidas = {p for _d, p in listar_pastas_dia(tmp_path) if p not in enviadas}
+
+    aplicar_retencao(tmp_path, diarios=1, log=lambda _m: None, em_segundo_plano=False, protegidas=protegidas)
+
+    assert [d for d, _p in listar_pastas_dia(tmp_path)] == datas[2:]
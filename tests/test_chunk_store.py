@@ -0,0 +1,67 @@
+# tests/test_chunk_store.py
+"""
+ChunkStore com zips deflate: os blocos saem das entradas descomprimidas, o zip volta
+byte a byte, e uma alteração no banco só grava os blocos vizinhos. Blocos pequenos
+para os zips do teste caberem em poucos KB.
+"""
+
+import json, random, zipfile
+from chunk_store import ChunkStore, restaurar_pasta, receita_de
+
+TAMANHOS = dict(minimo=4 * 1024, medio=16 * 1024, maximo=64 * 1024)
+
+
+def _banco(rnd: random.Random, n: int = 20000) -> bytearray:
+    return bytearray("".join(f"{i:06d};ZONA {rnd.randrange(500)};{rnd.uniform(1, 99):.2f}\n"
+                             for i in range(n)).encode())
+
+
+def _zip(caminho, banco: bytes, compressao=zipfile.ZIP_DEFLATED, **kwargs):
+    with zipfile.ZipFile(caminho, "w", compression=compressao, **kwargs) as zf:
+        zf.writestr("CLIPP.FDB", bytes(banco))
+        zf.writestr("XML/000001-nfe.xml", b"<NFe/>")
+    return caminho
+
+
+def test_zip_deflate_volta_byte_a_byte_e_deduplica_o_dia_seguinte(tmp_path):
+    rnd = random.Random(1)
+    banco = _banco(rnd)
+    ontem = _zip(tmp_path / "CLIPP01012026.zip", banco)
+    banco[len(banco) // 2:len(banco) // 2 + 6] = b"999999"
+    banco += b"000001;PRODUTO NOVO;1.00\n"
+    hoje = _zip(tmp_path / "CLIPP02012026.zip", banco)
+
+    store = ChunkStore(tmp_path / "store", **TAMANHOS)
+    primeira = store.ingerir(ontem)
+    receita = store.ingerir(hoje)
+
+    assert any(nivel is not None for nivel, _n in receita["partes"])
+    assert receita["bytes_novos"] < primeira["bytes_novos"] / 2
+    assert store.ingerir(hoje, entradas=False)["bytes_novos"] > receita["bytes_novos"]
+    assert store.verificar(receita)
+    assert store.reconstruir(receita, tmp_path / "restaurado.zip").read_bytes() == hoje.read_bytes()
+
+
+def test_nivel_que_nao_reproduz_o_fluxo_fica_em_blocos_crus(tmp_path, monkeypatch):
+    import chunk_store
+    caminho = _zip(tmp_path / "CLIPP01012026.zip", _banco(random.Random(2)), compresslevel=6)
+    monkeypatch.setattr(chunk_store, "NIVEIS_DEFLATE", (1, 9))  # nenhum gera o fluxo do nível 6
+    store = ChunkStore(tmp_path / "store", **TAMANHOS)
+    receita = store.ingerir(caminho)
+    assert [nivel for nivel, _n in receita["partes"]] == [None]
+    assert store.reconstruir(receita, tmp_path / "restaurado.zip").read_bytes() == caminho.read_bytes()
+
+
+def test_receita_sem_partes_sao_blocos_crus(tmp_path):
+    pasta = tmp_path / "dia"
+    pasta.mkdir()
+    caminho = _zip(pasta / "CLIPP01012026.zip", _banco(random.Random(3)))
+    original = caminho.read_bytes()
+    store = ChunkStore(tmp_path / "store", **TAMANHOS)
+    receita = store.ingerir(caminho, entradas=False)
+    del receita["partes"]  # receita gravada antes dos blocos por entrada
+    receita_de(caminho).write_text(json.dumps(receita), encoding="utf-8")
+    caminho.unlink()
+
+    assert restaurar_pasta(store, pasta, log=lambda _m: None) == [caminho]
+    assert caminho.read_bytes() == original
@@ -0,0 +1,136 @@
+# tests/test_monitor_arquivos.py
+"""
+FileArrivalMonitor com os backends inotify e polling, num diretório temporário:
+criação, modificação e fechamento de um CLIPPddmmyyyy*.zip, o filtro de nomes e
+a latência com que `aguardar` acorda quando o arquivo aparece.
+"""
+
+import sys, time, threading
+import pytest
+from monitor_arquivos import FileArrivalMonitor, CRIADO, MODIFICADO, FECHADO, REMOVIDO
+
+POLL = 0.05
+NOME = "CLIPP17102026.zip"
+
+BACKENDS = [
+    pytest.param("inotify", marks=pytest.mark.skipif(not sys.platform.startswith("linux"),
+                                                     reason="inotify só existe no Linux")),
+    "polling",
+]
+
+
+def _filtro(nome: str) -> bool:
+    return nome.startswith("CLIPP") and ".zip" in nome
+
+
+def _esperar(monitor, tipo: str, nome: str = NOME, prazo: float = 3.0) -> list:
+    """Consome eventos até chegar `tipo` para `nome`; falha se não chegar no prazo."""
+    vistos = []
+    limite = time.monotonic() + prazo
+    while time.monotonic() < limite:
+        for evento in monitor.aguardar(timeout=limite - time.monotonic()):
+            vistos.append((evento.tipo, evento.nome))
+            if evento.tipo == tipo and evento.nome == nome:
+                return vistos
+    pytest.fail(f"evento {tipo} de {nome} não chegou em {prazo}s (vistos: {vistos})")
+
+
+@pytest.fixture(params=BACKENDS)
+def monitor(request, tmp_path):
+    m = FileArrivalMonitor(tmp_path, filtro=_filtro, poll_interval=POLL, backend=request.param)
+    m.start()
+    yield m
+    m.stop()
+    assert not m.is_running()
+
+
+def test_usa_o_backend_pedido(monitor, request):
+    time.sleep(2 * POLL)  # um inotify indisponível já teria caído no polling
+    assert monitor.is_running()
+    assert monitor.running_event.is_set()
+    assert monitor.backend == request.node.callspec.params["monitor"]
+
+
+def test_criar_modificar_fechar(monitor, tmp_path):
+    caminho = tmp_path / NOME
+    f = open(caminho, "wb")
+    try:
+        _esperar(monitor, CRIADO)
+        assert monitor.arquivos() == [NOME]
+
+        f.write(b"PK" + b"\0" * 4096)
+        f.flush()
+        _esperar(monitor, MODIFICADO)
+    finally:
+        f.close()
+
+    if monitor.backend == "inotify":
+        _esperar(monitor, FECHADO)
+    # o polling não enxerga o fechamento: o tamanho já não muda, então não há evento novo
+    assert monitor.arquivos() == [NOME]
+
+    caminho.unlink()
+    _esperar(monitor, REMOVIDO)
+    assert monitor.arquivos() == []
+
+
+def test_zip_escrito_de_uma_vez_chega_como_fechado_ou_criado(monitor, tmp_path):
+    (tmp_path / NOME).write_bytes(b"PK" + b"\0" * 1024)
+    esperado = FECHADO if monitor.backend == "inotify" else CRIADO
+    _esperar(monitor, esperado)
+
+
+def test_ignora_arquivos_fora_do_padrao(monitor, tmp_path):
+    (tmp_path / "outro.txt").write_text("x")
+    (tmp_path / "CLIPP17102026.log").write_text("x")
+    assert monitor.aguardar(timeout=5 * POLL) == []
+    assert monitor.arquivos() == []
+
+
+def test_arquivos_existentes_chegam_como_criados(tmp_path):
+    (tmp_path / NOME).write_bytes(b"PK")
+    with FileArrivalMonitor(tmp_path, filtro=_filtro, poll_interval=POLL, backend="polling") as m:
+        eventos = m.aguardar(timeout=1)
+    assert [(e.tipo, e.nome) for e in eventos] == [(CRIADO, NOME)]
+
+
+def test_latencia_de_aguardar(monitor, tmp_path):
+    """`aguardar` acorda logo depois do arquivo aparecer, sem esperar o timeout."""
+    acordou = {}
+
+    def consumidor():
+        eventos = monitor.aguardar(timeout=5)
+        acordou["em"] = time.monotonic()
+        acordou["eventos"] = eventos
+
+    t = threading.Thread(target=consumidor)
+    t.start()
+    time.sleep(0.1)  # o consumidor já está bloqueado em aguardar
+    criado_em = time.monotonic()
+    (tmp_path / NOME).write_bytes(b"PK")
+    t.join(timeout=6)
+
+    assert acordou["eventos"], "aguardar estourou o timeout sem eventos"
+    latencia = acordou["em"] - criado_em
+    # inotify: só o select acordar; polling: no máximo uma volta do intervalo
+    limite = 0.5 if monitor.backend == "inotify" else POLL + 0.5
+    assert latencia < limite, f"{monitor.backend}: aguardar acordou em {latencia * 1000:.0f} ms"
+
+
+def test_aguardar_respeita_o_timeout(monitor):
+    inicio = time.monotonic()
+    assert monitor.aguardar(timeout=0.2) == []
+    assert 0.15 <= time.monotonic() - inicio < 1.0
+
+
+def test_stop_acorda_quem_esta_aguardando(monitor):
+    resultado = {}
+    t = threading.Thread(target=lambda: resultado.setdefault("eventos", monitor.aguardar(timeout=10)))
+    t.start()
+    time.sleep(0.1)
+    inicio = time.monotonic()
+    monitor.stop()
+    t.join(timeout=2)
+    assert not t.is_alive()
+    assert resultado["eventos"] == []
+    assert time.monotonic() - inicio < 2
@@ -0,0 +1,98 @@
+# tests/test_planejador_upload.py
+"""
+Planejamento do envio retroativo a partir do catálogo, incluindo pastas de dia
+de antes do manifest.json (só os zips no disco, sem hashes).
+"""
+
+import hashlib
+from datetime import date
+from arvore_backup import partes_da_pasta
+from catalogo import BackupCatalog
+from manifest import registrar_arquivos
+from planejador_upload import planejar
+
+
+class CacheFalso:
+    """Listagem remota fixa por pasta: {pasta: {nome: {"tamanho", "md5"}}}."""
+
+    def __init__(self, listagens=None):
+        self.listagens = listagens or {}
+
+    def arquivos(self, pasta):
+        return self.listagens.get(pasta, {})
+
+
+def _dia(base, data: date, conteudos: dict, manifest: bool):
+    pasta = base.joinpath(*partes_da_pasta(data))
+    pasta.mkdir(parents=True)
+    caminhos = []
+    for nome, dados in conteudos.items():
+        (pasta / nome).write_bytes(dados)
+        caminhos.append(pasta / nome)
+    if manifest:
+        registrar_arquivos(pasta, caminhos)
+    return pasta
+
+
+def _remoto(dados: bytes) -> dict:
+    return {"tamanho": len(dados), "md5": hashlib.md5(dados).hexdigest()}
+
+
+def _planejar(catalogo, cache, **kwargs):
+    return planejar(catalogo, cache, lambda data: f"{data:%d_%m_%Y}", log=lambda _m: None, **kwargs)
+
+
+def test_pasta_sem_manifest_entra_no_plano(tmp_path):
+    antiga = _dia(tmp_path, date(2024, 3, 5), {"CLIPP05032024.zip": b"a" * 100}, manifest=False)
+    _dia(tmp_path, date(2026, 10, 16), {"CLIPP16102026.zip": b"b" * 100}, manifest=True)
+    catalogo = BackupCatalog(tmp_path)
+
+    plano = _planejar(catalogo, CacheFalso())
+
+    assert [d["data"] for d in plano] == [date(2024, 3, 5), date(2026, 10, 16)]
+    assert plano[0]["arquivos"] == [antiga / "CLIPP05032024.zip"]
+    linha = catalogo.arquivos(date(2024, 3, 5))[0]
+    assert linha["tamanho"] == 100 and linha["sha256"] is None
+
+
+def test_pasta_sem_manifest_ja_na_nuvem_confere_pelo_md5(tmp_path):
+    dados = b"c" * 100
+    _dia(tmp_path, date(2024, 3, 5), {"CLIPP05032024.zip": dados, "CLIPP05032024_1.zip": b"d" * 100},
+         manifest=False)
+    catalogo = BackupCatalog(tmp_path)
+    # mesmo nome e tamanho nos dois; só o primeiro tem o mesmo conteúdo
+    cache = CacheFalso({"05_03_2024": {"CLIPP05032024.zip": _remoto(dados),
+                                       "CLIPP05032024_1.zip": _remoto(b"e" * 100)}})
+
+    plano = _planejar(catalogo, cache)
+
+    assert [a.name for d in plano for a in d["arquivos"]] == ["CLIPP05032024_1.zip"]
+    assert plano[0]["substituir"] == {"CLIPP05032024_1.zip"}
+    assert catalogo.pendentes_upload() == [(date(2024, 3, 5), "CLIPP05032024_1.zip")]
+
+
+def test_catalogo_antigo_sem_arquivos_e_completado(tmp_path):
+    pasta = _dia(tmp_path, date(2024, 3, 5), {"CLIPP05032024.zip": b"a" * 10}, manifest=False)
+    catalogo = BackupCatalog(tmp_path)
+    # pasta catalogada sem linhas de arquivo, como fazia o catálogo antes de ler os zips do disco
+    catalogo.registrar_pasta(date(2024, 3, 5), pasta, {"arquivos": {}})
+    with catalogo._conectar() as con:
+        con.execute("DELETE FROM arquivos")
+    assert catalogo.arquivos(date(2024, 3, 5)) == []
+
+    plano = _planejar(catalogo, CacheFalso())
+
+    assert [a.name for d in plano for a in d["arquivos"]] == ["CLIPP05032024.zip"]
+
+
+def test_manifest_criado_depois_nao_reabre_o_envio(tmp_path):
+    pasta = _dia(tmp_path, date(2024, 3, 5), {"CLIPP05032024.zip": b"a" * 10}, manifest=False)
+    catalogo = BackupCatalog(tmp_path)
+    catalogo.sincronizar()
+    catalogo.marcar_upload(date(2024, 3, 5), "CLIPP05032024.zip")
+
+    registrar_arquivos(pasta, [pasta / "CLIPP05032024.zip"])  # ex.: obter_md5 no planejamento
+    catalogo.sincronizar()
+
+    assert catalogo.pendentes_upload() == []
+    assert catalogo.arquivos(date(2024, 3, 5))[0]["sha256"]
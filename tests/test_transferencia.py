@@ -0,0 +1,74 @@
+# tests/test_transferencia.py
+"""
+copiar_resumivel interrompida (o consumidor de gravação cai depois de um checkpoint) e
+copias_interrompidas, que acha o par .part/.part.json que sobrou na pasta do dia.
+"""
+
+import os
+import pytest
+import transferencia
+from transferencia import copiar_resumivel, copias_interrompidas, descartar_parcial
+
+KB = 1024
+
+
+def _interromper_depois_de(monkeypatch, blocos: int):
+    original = transferencia._consumidor_gravacao
+
+    def consumidor(*args):
+        gravar = original(*args)
+
+        def gravar_ate_cair(iterador):
+            def limitado():
+                for i, bloco in enumerate(iterador):
+                    if i == blocos:
+                        raise IOError("volume desconectado")
+                    yield bloco
+            return gravar(limitado())
+        return gravar_ate_cair
+    monkeypatch.setattr(transferencia, "_consumidor_gravacao", consumidor)
+
+
+@pytest.fixture
+def origem(tmp_path):
+    caminho = tmp_path / "CLIPP01012026.zip"
+    caminho.write_bytes(os.urandom(64 * KB))
+    return caminho
+
+
+def _copiar(origem, destino):
+    return copiar_resumivel(origem, destino, log=lambda _m: None, buffer=8 * KB, checkpoint_bytes=16 * KB)
+
+
+def test_copia_interrompida_e_retomada_em_outro_dia(tmp_path, origem, monkeypatch):
+    ontem = tmp_path / "01_01_2026"
+    ontem.mkdir()
+    destino = ontem / origem.name
+    _interromper_depois_de(monkeypatch, 5)
+    with pytest.raises(Exception):
+        _copiar(origem, destino)
+    monkeypatch.undo()
+
+    assert copias_interrompidas(ontem) == [(destino, origem)]
+    _copiar(origem, destino)
+    assert destino.read_bytes() == origem.read_bytes()
+    assert copias_interrompidas(ontem) == []
+
+
+def test_origem_alterada_nao_e_retomada(tmp_path, origem, monkeypatch):
+    ontem = tmp_path / "01_01_2026"
+    ontem.mkdir()
+    destino = ontem / origem.name
+    _interromper_depois_de(monkeypatch, 5)
+    with pytest.raises(Exception):
+        _copiar(origem, destino)
+    origem.write_bytes(os.urandom(32 * KB))
+
+    assert copias_interrompidas(ontem) == [(destino, None)]
+    descartar_parcial(destino)
+    assert list(ontem.iterdir()) == []
+
+
+def test_part_sem_checkpoint_nao_e_retomado(tmp_path):
+    (tmp_path / "CLIPP01012026.zip.part").write_bytes(b"PK")
+    assert copias_interrompidas(tmp_path) == [(tmp_path / "CLIPP01012026.zip", None)]
@@ -0,0 +1,222 @@
+# tests/test_upload_resumivel.py
+"""
+enviar_resumivel contra um servidor http.server local que imita o upload resumível
+do Drive e derruba a conexão no meio de um bloco. O servidor só guarda o que
+chegou em múltiplos de 256 KB (como o Drive), então o byte confirmado não cai na
+fronteira do bloco: o envio tem que continuar dele, na mesma execução e depois de
+um "reinício" que só tem a sessão gravada pelo SessoesPendentes.
+"""
+
+import os, re, json, socket, hashlib, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+import pytest
+import upload_resumivel
+from upload_resumivel import (PoolConexoes, SessoesPendentes, HashContinuo, ErroUpload, enviar_resumivel,
+                              _chave_sessao)
+
+KB = 1024
+BLOCO = 512 * KB
+GRANULARIDADE = 256 * KB
+
+
+class ServidorResumivel(ThreadingHTTPServer):
+    """Sessões em memória; `quedas` = quantos PUTs com dados (a partir de `offset_queda`) caem no meio."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.lock = threading.Lock()
+        self.sessoes = {}       # id -> bytearray recebido (confirmado)
+        self.aberturas = 0
+        self.puts = []          # (sessão, primeiro byte, tamanho) de cada PUT com dados
+        self.quedas = 0
+        self.offset_queda = BLOCO
+        self.expiradas = set()
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}/upload?uploadType=resumable"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, status: int, corpo: bytes = b"", headers=None):
+        self.send_response(status)
+        for chave, valor in (headers or {}).items():
+            self.send_header(chave, valor)
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def do_POST(self):
+        srv = self.server
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with srv.lock:
+            srv.aberturas += 1
+            sessao = str(srv.aberturas)
+            srv.sessoes[sessao] = bytearray()
+        self._responder(200, headers={"Location": f"http://127.0.0.1:{srv.server_port}/sessao/{sessao}"})
+
+    def do_PUT(self):
+        srv = self.server
+        sessao = self.path.rsplit("/", 1)[1]
+        tamanho = int(self.headers.get("Content-Length", 0))
+        faixa = self.headers["Content-Range"]
+        total = int(faixa.rsplit("/", 1)[1])
+        if sessao in srv.expiradas or sessao not in srv.sessoes:
+            self.rfile.read(tamanho)
+            return self._responder(404)
+        recebido = srv.sessoes[sessao]
+
+        m = re.match(r"bytes (\d+)-(\d+)/\d+", faixa)
+        if m:
+            inicio = int(m.group(1))
+            with srv.lock:
+                srv.puts.append((sessao, inicio, tamanho))
+                cair = srv.quedas > 0 and inicio >= srv.offset_queda
+                if cair:
+                    srv.quedas -= 1
+            if cair:
+                # lê só parte do bloco e derruba a conexão sem responder
+                parcial = self.rfile.read(tamanho * 3 // 5)
+                with srv.lock:
+                    del recebido[inicio:]
+                    recebido += parcial
+                    del recebido[len(recebido) // GRANULARIDADE * GRANULARIDADE:]
+                self.close_connection = True
+                self.connection.shutdown(socket.SHUT_RDWR)
+                return
+            dados = self.rfile.read(tamanho)
+            with srv.lock:
+                if inicio <= len(recebido):
+                    del recebido[inicio:]
+                    recebido += dados
+
+        if len(recebido) == total:
+            corpo = json.dumps({"id": f"arquivo-{sessao}", "size": str(total),
+                                "md5Checksum": hashlib.md5(recebido).hexdigest()}).encode()
+            return self._responder(200, corpo, {"Content-Type": "application/json"})
+        headers = {"Range": f"bytes=0-{len(recebido) - 1}"} if recebido else {}
+        self._responder(308, headers=headers)
+
+
+# substitui o módulo time do upload_resumivel: o backoff entre tentativas não espera
+_TEMPO_SEM_ESPERA = SimpleNamespace(time=time.time, monotonic=time.monotonic, sleep=lambda _segundos: None)
+
+
+@pytest.fixture
+def servidor():
+    srv = ServidorResumivel()
+    t = threading.Thread(target=srv.serve_forever, daemon=True)
+    t.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture(autouse=True)
+def sem_backoff(monkeypatch):
+    monkeypatch.setattr(upload_resumivel, "time", _TEMPO_SEM_ESPERA)
+
+
+@pytest.fixture
+def arquivo(tmp_path):
+    caminho = tmp_path / "CLIPP17102026.zip"
+    caminho.write_bytes(os.urandom(4 * BLOCO + 1000))
+    return caminho
+
+
+def _token(forcar=False):
+    return "token-de-teste"
+
+
+def _enviar(caminho, servidor, sessoes=None, **kwargs):
+    pool = PoolConexoes(timeout=5)
+    try:
+        return enviar_resumivel(caminho, {"name": caminho.name, "parents": ["pasta"]}, _token, pool,
+                                sessoes=sessoes, endpoint=servidor.endpoint, bloco=BLOCO, log=lambda _m: None,
+                                **kwargs)
+    finally:
+        pool.fechar()
+
+
+def _md5(caminho) -> str:
+    return hashlib.md5(caminho.read_bytes()).hexdigest()
+
+
+def test_envio_sem_quedas(servidor, arquivo):
+    resposta = _enviar(arquivo, servidor)
+    assert resposta["md5Checksum"] == _md5(arquivo)
+    assert [inicio for _s, inicio, _t in servidor.puts] == [0, BLOCO, 2 * BLOCO, 3 * BLOCO, 4 * BLOCO]
+
+
+def test_queda_no_meio_do_bloco_retoma_do_offset_confirmado(servidor, arquivo):
+    servidor.quedas = 1
+    hash_envio = HashContinuo()
+    resposta = _enviar(arquivo, servidor, hash_envio=hash_envio)
+
+    total = arquivo.stat().st_size
+    assert resposta["md5Checksum"] == _md5(arquivo)
+    assert int(resposta["size"]) == total
+    assert servidor.aberturas == 1  # a mesma sessão do começo ao fim
+
+    inicios = [inicio for _s, inicio, _t in servidor.puts]
+    # 60% do bloco em BLOCO chegou; o servidor confirmou até o múltiplo de 256 KB
+    confirmado = (BLOCO + BLOCO * 3 // 5) // GRANULARIDADE * GRANULARIDADE
+    assert confirmado % BLOCO != 0
+    assert inicios[:3] == [0, BLOCO, confirmado]
+    # o hash do envio ignora o reenvio e bate com o arquivo
+    assert hash_envio.hexdigest(total) == _md5(arquivo)
+
+
+def test_varias_quedas_seguidas(servidor, arquivo):
+    servidor.quedas = 3
+    resposta = _enviar(arquivo, servidor)
+    assert resposta["md5Checksum"] == _md5(arquivo)
+    assert servidor.aberturas == 1
+
+
+def test_reinicio_retoma_a_sessao_gravada(servidor, arquivo, tmp_path):
+    caminho_sessoes = tmp_path / "uploads_pendentes.json"
+    metadados = {"name": arquivo.name, "parents": ["pasta"]}
+    chave = _chave_sessao(arquivo, metadados)
+
+    # 1ª execução: cai no meio do 2º bloco e desiste na hora (o bot "morreu")
+    servidor.quedas = 1
+    with pytest.raises(ErroUpload):
+        _enviar(arquivo, servidor, SessoesPendentes(caminho_sessoes), tentativas=0)
+    uri = SessoesPendentes(caminho_sessoes).obter(chave)
+    assert uri and uri.endswith("/sessao/1")
+    confirmado = len(servidor.sessoes["1"])
+    assert 0 < confirmado < arquivo.stat().st_size
+    antes = len(servidor.puts)
+
+    # 2ª execução, com pool e SessoesPendentes novos: consulta a sessão e continua dela
+    hash_envio = HashContinuo()
+    resposta = _enviar(arquivo, servidor, SessoesPendentes(caminho_sessoes), hash_envio=hash_envio)
+    assert resposta["md5Checksum"] == _md5(arquivo)
+    assert servidor.aberturas == 1  # nenhuma sessão nova
+    assert servidor.puts[antes][1] == confirmado
+    assert SessoesPendentes(caminho_sessoes).obter(chave) is None
+    # o começo subiu na execução anterior: o MD5 do envio fica para o destino
+    assert hash_envio.hexdigest(arquivo.stat().st_size) is None
+
+
+def test_reinicio_com_sessao_expirada_recomeca_do_zero(servidor, arquivo, tmp_path):
+    caminho_sessoes = tmp_path / "uploads_pendentes.json"
+    servidor.quedas = 1
+    with pytest.raises(ErroUpload):
+        _enviar(arquivo, servidor, SessoesPendentes(caminho_sessoes), tentativas=0)
+    servidor.expiradas.add("1")
+    antes = len(servidor.puts)
+
+    resposta = _enviar(arquivo, servidor, SessoesPendentes(caminho_sessoes))
+    assert resposta["md5Checksum"] == _md5(arquivo)
+    assert servidor.aberturas == 2
+    assert servidor.puts[antes][:2] == ("2", 0)
@@ -0,0 +1,184 @@
+# transferencia.py
+"""
+Movimentação dos zips de backup para a pasta do dia.
+
+- Mesmo volume: os.rename (atômico, sem copiar bytes).
+- Volumes diferentes: cópia em blocos grandes para `<destino>.part`, com checkpoint
+  periódico em `<destino>.part.json`. Se o bot cair no meio, a próxima execução
+  retoma do último checkpoint; ao final o .part é renomeado atomicamente. Os .part
+  que ficam em pastas de dias anteriores são achados por `copias_interrompidas`.
+
+A cópia passa pelo pipeline_tee: a origem é lida uma vez e os blocos vão ao
+mesmo tempo para a gravação no destino, para o cálculo de SHA-256 e MD5 (que
+o manifest usa sem reler o arquivo) e, opcionalmente, para outros consumidores
+(ex.: o upload para a nuvem).
+"""
+
+import os, json, time, errno, shutil, hashlib
+from pathlib import Path
+from pipeline_tee import distribuir, verificar_resultados, consumidor_hash
+
+BUFFER_COPIA = 16 * 1024 * 1024
+CHECKPOINT_BYTES = 256 * 1024 * 1024
+
+
+def mesmo_dispositivo(origem, destino_dir) -> bool:
+    try:
+        return os.stat(origem).st_dev == os.stat(destino_dir).st_dev
+    except OSError:
+        return False
+
+
+def _caminhos_parciais(destino: Path) -> tuple[Path, Path]:
+    return destino.with_name(destino.name + ".part"), destino.with_name(destino.name + ".part.json")
+
+
+def _salvar_checkpoint(ckpt: Path, dados: dict):
+    tmp = ckpt.with_name(ckpt.name + ".tmp")
+    tmp.write_text(json.dumps(dados), encoding="utf-8")
+    os.replace(tmp, ckpt)
+
+
+def _offset_retomada(origem: Path, part: Path, ckpt: Path, chave: dict) -> int:
+    """Bytes já copiados e confirmados por checkpoint para esta mesma origem (0 se nada aproveitável)."""
+    if not part.exists() or not ckpt.exists():
+        return 0
+    try:
+        dados = json.loads(ckpt.read_text(encoding="utf-8"))
+    except Exception:
+        return 0
+    if any(dados.get(k) != v for k, v in chave.items()):
+        return 0
+    return max(0, min(int(dados.get("offset", 0)), part.stat().st_size))
+
+
+def copias_interrompidas(pasta) -> list[tuple[Path, Path | None]]:
+    """
+    (destino, origem) de cada `.part`/`.part.json` deixado na `pasta` por uma cópia que não
+    terminou. `origem` só vem quando o checkpoint aponta para um arquivo que continua igual
+    (tamanho e mtime) e o destino ainda não existe, ou seja, quando dá para retomar; senão None.
+    """
+    pasta = Path(pasta)
+    destinos = {p.with_name(p.name[:-len(".part")]) for p in pasta.glob("*.part")}
+    destinos |= {p.with_name(p.name[:-len(".part.json")]) for p in pasta.glob("*.part.json")}
+    resultado = []
+    for destino in sorted(destinos):
+        part, ckpt = _caminhos_parciais(destino)
+        origem = None
+        try:
+            dados = json.loads(ckpt.read_text(encoding="utf-8"))
+            candidata = Path(dados["origem"])
+            st = candidata.stat()
+            if (part.exists() and not destino.exists()
+                    and (st.st_size, st.st_mtime_ns) == (dados["tamanho"], dados["mtime_ns"])):
+                origem = candidata
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        resultado.append((destino, origem))
+    return resultado
+
+
+def descartar_parcial(destino):
+    """Apaga o `.part` e o `.part.json` de `destino`, se existirem."""
+    for caminho in _caminhos_parciais(Path(destino)):
+        try:
+            caminho.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _consumidor_gravacao(part: Path, offset: int, chave: dict, ckpt: Path, checkpoint_bytes: int):
+    """Grava os blocos em `part` a partir de `offset`, com checkpoint a cada `checkpoint_bytes`."""
+    def gravar(blocos) -> int:
+        posicao = offset
+        with open(part, "r+b" if offset else "wb") as dst:
+            dst.seek(offset)
+            dst.truncate(offset)
+            ultimo_ckpt = offset
+            for bloco in blocos:
+                dst.write(bloco)
+                posicao += len(bloco)
+                if posicao - ultimo_ckpt >= checkpoint_bytes:
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                    _salvar_checkpoint(ckpt, {**chave, "offset": posicao})
+                    ultimo_ckpt = posicao
+            dst.flush()
+            os.fsync(dst.fileno())
+        return posicao
+    return gravar
+
+
+def copiar_resumivel(origem, destino, log=print, buffer: int = BUFFER_COPIA,
+                     checkpoint_bytes: int = CHECKPOINT_BYTES, consumidores: dict | None = None) -> dict:
+    """
+    Copia `origem` para `destino` via `.part` com checkpoints e retomada.
+    `consumidores` ({nome: fn(blocos)}) recebem os mesmos blocos lidos para a cópia
+    (só numa cópia desde o início; numa retomada eles não veriam o arquivo inteiro).
+    Retorna {"sha256", "md5", **resultados dos consumidores}.
+    """
+    origem, destino = Path(origem), Path(destino)
+    part, ckpt = _caminhos_parciais(destino)
+    st = origem.stat()
+    chave = {"origem": str(origem), "tamanho": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+    hashes = {"sha256": hashlib.sha256(), "md5": hashlib.md5()}
+    offset = _offset_retomada(origem, part, ckpt, chave)
+    if offset:
+        log(f"Retomando cópia de {origem.name} a partir de {offset / 1024**2:.1f} MB.")
+        # o hash precisa cobrir o prefixo já copiado
+        with open(part, "rb") as f:
+            restante = offset
+            while restante and (bloco := f.read(min(buffer, restante))):
+                for h in hashes.values():
+                    h.update(bloco)
+                restante -= len(bloco)
+        consumidores = None
+
+    resultados = verificar_resultados(distribuir(origem, {
+        "gravacao": _consumidor_gravacao(part, offset, chave, ckpt, checkpoint_bytes),
+        "hash": consumidor_hash(hashes=hashes),
+        **(consumidores or {}),
+    }, offset=offset, bloco=buffer), obrigatorios=("gravacao", "hash"))
+
+    if resultados["gravacao"] != st.st_size:
+        raise IOError(f"cópia incompleta de {origem.name}: {resultados['gravacao']} de {st.st_size} bytes")
+    shutil.copystat(origem, part)
+    os.replace(part, destino)
+    try:
+        ckpt.unlink()
+    except FileNotFoundError:
+        pass
+    extras = {nome: r for nome, r in resultados.items() if nome not in ("gravacao", "hash")}
+    return {**resultados["hash"], **extras}
+
+
+def mover_arquivo(origem, destino, log=print, consumidores: dict | None = None) -> dict | None:
+    """
+    Move `origem` para `destino` (que não deve existir) e registra tempo e MB/s no log.
+    Quando há cópia, retorna {"sha256", "md5", ...resultados dos `consumidores`};
+    None para rename, que não lê o arquivo (e portanto não alimenta consumidores).
+    """
+    origem, destino = Path(origem), Path(destino)
+    tamanho = origem.stat().st_size
+    inicio = time.monotonic()
+    resultado = None
+    metodo = "rename"
+
+    renomeado = False
+    if mesmo_dispositivo(origem, destino.parent):
+        try:
+            os.rename(origem, destino)
+            renomeado = True
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+    if not renomeado:
+        metodo = "cópia"
+        resultado = copiar_resumivel(origem, destino, log=log, consumidores=consumidores)
+        os.remove(origem)
+
+    duracao = max(time.monotonic() - inicio, 1e-6)
+    mb = tamanho / 1024**2
+    log(f"Arquivo movido: {origem.name} → {destino.name} ({metodo}, {mb:.1f} MB em {duracao:.1f}s, {mb / duracao:.1f} MB/s)")
+    return resultado
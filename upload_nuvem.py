@@ -1,72 +1,443 @@
 # upload_nuvem.py
-import os
+import time
 import subprocess
+from contextlib import contextmanager, ExitStack
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
-from pydrive2.auth import GoogleAuth
-from pydrive2.drive import GoogleDrive
-from utils import log
+from utils import log, APPDATA, carregar_config
+from arvore_backup import listar_pastas_dia, data_da_pasta
+from catalogo import BackupCatalog
+from upload_resumivel import PoolConexoes, SessoesPendentes
+from limitador_banda import LimitadorBanda
+from cache_remoto import RemoteManifestCache
+from manifest import obter_md5, obter_entrada
+from autenticacao_nuvem import GerenciadorAutenticacao, AutorizacaoNecessaria
+from fila_upload import UploadQueue, UploadScheduler
+from planejador_upload import planejar, resumo
+from armazenamento import (StorageBackend, GoogleDriveBackend, PastaInexistente, criar_backend, verificar_envio,
+                           aceita_fluxo)
+from pastas_remotas import RemoteFolderCache
+from chunk_store import ChunkStore, CHUNKS_DIR, receita_de, restaurar_pasta
+from recompressao import EXTENSOES
 
 # Ajuste conforme seu ambiente
 BASE_DIR = r"C:\BackupBot\backups"
 PASTA_NUVEM_ID = "1mTFQP0RMzk8rogI5TU1XdNt4v6DFv0xs" 
+SESSOES_UPLOAD = APPDATA / "BackupBot" / "uploads_pendentes.json"
+CACHE_REMOTO = APPDATA / "BackupBot" / "cache_remoto.json"
+PASTAS_REMOTAS = APPDATA / "BackupBot" / "pastas_remotas.json"
+UPLOADS_SIMULTANEOS = 3
+ENVIOS_POR_ARQUIVO = 3  # envio original + reenvios quando a cópia remota não confere
+EMOJI_VERIFICACAO = {"ok": "🔎", "so_tamanho": "🔎", "divergente": "❌"}
+
+# conexões HTTP e credenciais reaproveitadas por todos os uploads do processo
+_pool = PoolConexoes()
+_auth = GerenciadorAutenticacao(APPDATA / "BackupBot", log=log)
 
 def autenticar():
-    """Autentica no Google Drive usando pydrive2 e settings.yaml + client_secrets.json."""
-    gauth = GoogleAuth()
-    # O pydrive2 vai ler settings.yaml por padrão se existir.
-    # Se for a primeira vez, abrirá o navegador para autenticar.
+    """
+    Cliente do Google Drive do processo. Credenciais ficam em %APPDATA%/BackupBot/credentials.json
+    e são renovadas sem interação; o navegador só abre na primeira autorização, e só na
+    thread principal (nas demais, AutorizacaoNecessaria).
+    """
+    return _auth.drive()
+
+def obter_ultima_pasta(base_dir: str) -> Path:
+    """Pasta de dia mais recente, pelo catálogo (sem varrer o disco) ou pela árvore se ele estiver vazio."""
     try:
-        gauth.LocalWebserverAuth()  # abre navegador e salva credentials.json
+        catalogo = BackupCatalog(base_dir)
+        if catalogo.vazio():
+            catalogo.sincronizar()
+        pasta = catalogo.ultima()
+        if pasta and pasta.is_dir():
+            return pasta
+        catalogo.sincronizar()  # catálogo desatualizado (pasta apagada/movida)
+        pasta = catalogo.ultima()
+        if pasta:
+            return pasta
     except Exception as e:
-        log(f"⚠️ LocalWebserverAuth falhou: {e} — tentando CommandLineAuth (útil em servidores).")
-        gauth.CommandLineAuth()
-    # SaveCredentialsFile só para garantir
+        log(f"⚠️ Catálogo de backups indisponível ({e}); procurando no disco.")
+        pastas = listar_pastas_dia(base_dir)
+        if pastas:
+            return pastas[-1][1]
+    raise FileNotFoundError("Nenhum backup encontrado.")
+
+def _caminho_cache(backend: StorageBackend, base: Path = CACHE_REMOTO) -> Path:
+    if backend.nome == "drive":
+        return base
+    return base.with_name(f"{base.stem}_{backend.nome}.json")
+
+def obter_pastas_remotas(backend: StorageBackend, raiz: str, conf: dict | None = None) -> RemoteFolderCache | None:
+    """
+    Árvore BACKUP yyyy/MÊS/dd_mm_yyyy dentro de `raiz` no destino (config "upload": {"espelharPastas"},
+    ligado por padrão). None: tudo vai solto em `raiz`, como antes.
+    """
+    conf = conf if conf is not None else carregar_config()
+    if not (conf.get("upload") or {}).get("espelharPastas", True):
+        return None
+    return RemoteFolderCache(_caminho_cache(backend, PASTAS_REMOTAS), backend, raiz)
+
+def _enviar_na_pasta(backend: StorageBackend, arquivo: Path, pasta_remota: str, limitador,
+                     cache: RemoteManifestCache, pastas: RemoteFolderCache | None, data) -> tuple[dict, str]:
+    """Envia para a pasta do dia (com `pastas` e `data`) ou para `pasta_remota`. Retorna (item, pasta usada)."""
+    if pastas and data:
+        pasta_remota = pastas.pasta_do_dia(data)
     try:
-        gauth.SaveCredentialsFile("credentials.json")
-    except Exception:
-        pass
-    return GoogleDrive(gauth)
+        return backend.enviar(arquivo, arquivo.name, pasta_remota, limitador=limitador, log=log), pasta_remota
+    except PastaInexistente:
+        if not (pastas and data):
+            raise
+        log(f"📁 A pasta remota de {data:%d/%m/%Y} foi apagada no destino; recriando.")
+        pastas.invalidar(pasta_remota)
+        cache.invalidar(pasta_remota)
+        pasta_remota = pastas.pasta_do_dia(data)
+        return backend.enviar(arquivo, arquivo.name, pasta_remota, limitador=limitador, log=log), pasta_remota
 
-def obter_ultima_pasta(base_dir: str) -> Path:
-    base = Path(base_dir)
-    anos = sorted(base.glob("BACKUP *"))
-    if not anos:
-        raise FileNotFoundError("Nenhum backup encontrado.")
-    ultimo_ano = anos[-1]
-    meses = sorted(
-        ((ultimo_ano / m) for m in os.listdir(ultimo_ano) if (ultimo_ano / m).is_dir()),
-        key=lambda p: p.name
-    )
-    if not meses:
-        raise FileNotFoundError(f"Nenhum mês encontrado dentro de {ultimo_ano}.")
-    ultima_pasta_mes = meses[-1]
-    pastas_dia = sorted((p for p in ultima_pasta_mes.iterdir() if p.is_dir()), key=os.path.getmtime)
-    if not pastas_dia:
-        raise FileNotFoundError(f"Nenhum dia encontrado em {ultima_pasta_mes}.")
-    return pastas_dia[-1]
-
-def enviar_para_drive(drive, pasta_local: Path, id_pasta_drive: str):
-    arquivos = sorted(pasta_local.glob("*.zip"))
+def _remover_versoes_antigas(backend: StorageBackend, nome: str, pasta_remota: str, id_novo: str | None):
+    """
+    Apaga da pasta remota os itens com o nome `nome` que não são o recém-enviado `id_novo`:
+    no Drive um envio com o mesmo nome cria outro arquivo em vez de substituir.
+    """
+    try:
+        for item in backend.listar(pasta_remota):
+            if item["nome"] == nome and item.get("id") and item["id"] != id_novo:
+                backend.remover(nome, pasta_remota, id_item=item["id"])
+                log(f"🗑️ Versão anterior de {nome} removida do destino.")
+    except Exception as e:
+        log(f"⚠️ Não foi possível remover a versão anterior de {nome} no destino: {e}")
+
+def _descartar_copia_remota(backend: StorageBackend, nome: str, pasta_remota: str, cache: RemoteManifestCache):
+    cache.invalidar(pasta_remota)
+    try:
+        backend.remover(nome, pasta_remota)
+    except Exception as e:
+        log(f"⚠️ Não foi possível remover a cópia remota divergente de {nome}: {e}")
+
+@contextmanager
+def _zip_disponivel(backup_dir, arquivo: Path):
+    """
+    Garante `arquivo` no disco durante o envio: um zip guardado só como receita de blocos
+    (config "armazenamentoChunks") é reconstruído e apagado no fim; a receita continua valendo.
+    """
+    if arquivo.is_file() or not receita_de(arquivo).is_file():
+        yield arquivo
+        return
+    restaurar_pasta(ChunkStore(Path(backup_dir) / CHUNKS_DIR), arquivo.parent, log=log, nomes={arquivo.name})
+    try:
+        yield arquivo
+    finally:
+        arquivo.unlink(missing_ok=True)
+
+def _enviar_do_backup(backup_dir, backend: StorageBackend, arquivo: Path, *args) -> tuple[int, float]:
+    """`_enviar_arquivo` de um arquivo da árvore de `backup_dir`, reconstruindo-o se estiver em blocos."""
+    with _zip_disponivel(backup_dir, arquivo):
+        return _enviar_arquivo(backend, arquivo, *args)
+
+def _enviar_arquivo(backend: StorageBackend, arquivo: Path, pasta_remota: str, limitador,
+                    cache: RemoteManifestCache, pastas: RemoteFolderCache | None = None,
+                    data=None, substituir: bool = False) -> tuple[int, float]:
+    """
+    Envia e confere a cópia remota (tamanho e checksum do destino contra o MD5 lido no
+    próprio envio); se não conferir, apaga a cópia e reenvia, até ENVIOS_POR_ARQUIVO vezes.
+    Com `pastas` e `data`, o arquivo vai para a pasta do dia (criada se preciso) em vez de `pasta_remota`.
+    `substituir`: o destino já tinha outro arquivo com este nome, apagado depois que o novo confere.
+    """
+    log(f"☁️ Enviando: {arquivo.name} ...")
+    inicio = time.monotonic()
+    tamanho = arquivo.stat().st_size
+    md5_manifest = (obter_entrada(arquivo) or {}).get("md5")  # sem calcular: só o que já se sabe
+    for envio in range(1, ENVIOS_POR_ARQUIVO + 1):
+        remoto, pasta = _enviar_na_pasta(backend, arquivo, pasta_remota, limitador, cache, pastas, data)
+        estado, detalhe = verificar_envio(remoto, tamanho, md5_manifest)
+        log(f"{EMOJI_VERIFICACAO[estado]} Verificação remota de {arquivo.name}: {estado} ({detalhe}).")
+        if estado != "divergente":
+            break
+        _descartar_copia_remota(backend, arquivo.name, pasta, cache)
+        if envio == ENVIOS_POR_ARQUIVO:
+            raise IOError(f"cópia remota de {arquivo.name} não confere após {envio} envio(s): {detalhe}")
+        log(f"🔁 Reenviando {arquivo.name} (envio {envio + 1} de {ENVIOS_POR_ARQUIVO}).")
+    duracao = max(time.monotonic() - inicio, 1e-6)
+    if substituir:
+        _remover_versoes_antigas(backend, arquivo.name, pasta, remoto.get("id"))
+    if remoto.get("id"):
+        cache.registrar(pasta, remoto)
+    log(f"✅ Upload concluído: {arquivo.name} ({tamanho / 1024**2:.1f} MB, {tamanho / 1024**2 / duracao:.2f} MB/s)")
+    return tamanho, duracao
+
+def enviar_pasta(backend: StorageBackend, pasta_local: Path, pasta_remota: str, simultaneos: int | None = None,
+                 limitador: LimitadorBanda | None = None, cache: RemoteManifestCache | None = None,
+                 arquivos: list[Path] | None = None, pastas: RemoteFolderCache | None = None) -> dict:
+    """
+    Envia os zips da pasta (ou só `arquivos`) para `backend` com até `simultaneos` uploads em
+    paralelo (config "upload": {"simultaneos"}), todos sob o mesmo limite de banda
+    (config "upload": {"limiteKBps", "horarioLoja"}).
+    Zips cujo MD5 já está na pasta remota (segundo o cache da listagem) são pulados.
+    Com `pastas`, uma pasta de dia vai para a subpasta correspondente de `pasta_remota`.
+    Retorna {arquivo: None (enviado ou já presente) | mensagem de erro}.
+    """
+    arquivos = sorted(arquivos) if arquivos is not None else sorted(pasta_local.glob("*.zip"))
     if not arquivos:
         log("Nenhum arquivo ZIP encontrado para upload.")
-        return
+        return {}
+    if simultaneos is None or limitador is None:
+        conf = carregar_config()
+        simultaneos = simultaneos or int((conf.get("upload") or {}).get("simultaneos", UPLOADS_SIMULTANEOS))
+        limitador = limitador or LimitadorBanda.da_config(conf)
+    if limitador.ativo():
+        log(f"☁️ Banda de upload limitada a {limitador.limite / 1024:.0f} KB/s"
+            + (" (horário da loja)." if limitador.horario else "."))
+    cache = cache or RemoteManifestCache(_caminho_cache(backend), backend.listar)
+    data = data_da_pasta(pasta_local.name) if pastas else None
+    pasta_dia = pastas.pasta_do_dia(data, criar=False) if data else pasta_remota
+    resultados = {}
+    pendentes = []
+    substituir = set()  # nomes que já existem no destino com outro conteúdo
     for arquivo in arquivos:
         try:
-            log(f"☁️ Enviando: {arquivo.name} ...")
-            f = drive.CreateFile({'title': arquivo.name, 'parents': [{'id': id_pasta_drive}]})
-            f.SetContentFile(str(arquivo))
-            f.Upload(param={'supportsAllDrives': True})
-            log(f"✅ Upload concluído: {arquivo.name}")
+            md5 = obter_md5(arquivo)
+            if pasta_dia is not None:
+                if cache.ja_enviado(pasta_dia, arquivo.name, arquivo.stat().st_size, md5):
+                    log(f"☁️ {arquivo.name} já está na nuvem (mesmo MD5); upload pulado.")
+                    resultados[arquivo] = None
+                    continue
+                if arquivo.name in cache.arquivos(pasta_dia):
+                    substituir.add(arquivo.name)
         except Exception as e:
-            log(f"❌ Erro ao enviar {arquivo.name}: {e}")
+            log(f"⚠️ Não foi possível consultar a listagem remota para {arquivo.name}: {e}")
+        pendentes.append(arquivo)
+    if not pendentes:
+        log("☁️ Todos os arquivos desta pasta já estão na nuvem.")
+        return resultados
+
+    inicio = time.monotonic()
+    total = 0
+    with ThreadPoolExecutor(max_workers=max(1, simultaneos), thread_name_prefix="upload") as pool:
+        futuros = {pool.submit(_enviar_arquivo, backend, arquivo, pasta_remota, limitador, cache, pastas, data,
+                               arquivo.name in substituir): arquivo
+                   for arquivo in pendentes}
+        for futuro in as_completed(futuros):
+            arquivo = futuros[futuro]
+            try:
+                total += futuro.result()[0]
+                resultados[arquivo] = None
+            except Exception as e:
+                log(f"❌ Erro ao enviar {arquivo.name}: {e}")
+                resultados[arquivo] = str(e) or type(e).__name__
+    duracao = max(time.monotonic() - inicio, 1e-6)
+    log(f"☁️ {total / 1024**2:.1f} MB enviados em {duracao:.1f}s ({total / 1024**2 / duracao:.2f} MB/s no total).")
+    return resultados
+
+def enviar_para_drive(drive, pasta_local: Path, id_pasta_drive: str, **kwargs):
+    """Envia a pasta para o Google Drive (upload resumível) — ver `enviar_pasta`."""
+    backend = GoogleDriveBackend(_auth, _pool, SessoesPendentes(SESSOES_UPLOAD))
+    return enviar_pasta(backend, pasta_local, id_pasta_drive, **kwargs)
+
+def obter_backend() -> tuple[StorageBackend, str]:
+    """Destino configurado (config "armazenamentoRemoto"; padrão: Google Drive em PASTA_NUVEM_ID)."""
+    backend, pasta = criar_backend(carregar_config(), _auth, _pool, SessoesPendentes(SESSOES_UPLOAD))
+    if backend.nome == "drive" and not pasta:
+        pasta = PASTA_NUVEM_ID
+    return backend, pasta
+
+def _planejar_envio(catalogo: BackupCatalog, cache: RemoteManifestCache, pastas: RemoteFolderCache | None,
+                    pasta_remota: str, politica: str = "antigos") -> list[dict]:
+    if pastas:
+        # o planejamento não cria pastas; dias sem pasta remota ainda não têm nada na nuvem
+        return planejar(catalogo, cache, lambda data: pastas.pasta_do_dia(data, criar=False),
+                        politica=politica, log=log, pasta_legada=pasta_remota)
+    return planejar(catalogo, cache, lambda _data: pasta_remota, politica=politica, log=log)
+
+def _nome_no_catalogo(caminho: Path) -> str:
+    """Nome do zip no catálogo; um arquivo recomprimido (`.zip.xz`/`.zip.zst`) conta como o zip original."""
+    for extensao in EXTENSOES.values():
+        if caminho.name.endswith(".zip" + extensao):
+            return caminho.name[:-len(extensao)]
+    return caminho.name
+
+def _reconciliar_fila(backup_dir, backend: StorageBackend, pasta_remota: str, pastas: RemoteFolderCache | None,
+                      fila: UploadQueue):
+    """
+    Confere o catálogo com o destino: o que já está lá é marcado como enviado (e a retenção pode
+    podar), e os dias que faltam, inclusive os de antes do manifest, entram na fila de upload.
+    """
+    catalogo = BackupCatalog(backup_dir)
+    cache = RemoteManifestCache(_caminho_cache(backend), backend.listar)
+    politica = (carregar_config().get("upload") or {}).get("ordemEnvio", "antigos")
+    plano = _planejar_envio(catalogo, cache, pastas, pasta_remota, politica)
+    for dia in plano:
+        fila.enfileirar(dia["arquivos"], dia["data"])
+    if plano:
+        log(f"📤 Dias que faltavam na nuvem foram para a fila: {resumo(plano)}.")
+
+def enviar_retroativo(backup_dir: str = BASE_DIR, politica: str | None = None, simultaneos: int | None = None) -> dict:
+    """
+    Envia todos os dias que ainda não estão na nuvem (não só o último), em paralelo,
+    do mais antigo ou do mais recente primeiro (config "upload": {"ordemEnvio": "antigos"|"recentes"}).
+    Retorna {arquivo: None | mensagem de erro}.
+    """
+    conf = carregar_config()
+    opcoes = conf.get("upload") or {}
+    politica = politica or opcoes.get("ordemEnvio", "antigos")
+    simultaneos = simultaneos or int(opcoes.get("simultaneos", UPLOADS_SIMULTANEOS))
+    backend, pasta_remota = obter_backend()
+    limitador = LimitadorBanda.da_config(conf)
+    cache = RemoteManifestCache(_caminho_cache(backend), backend.listar)
+    pastas = obter_pastas_remotas(backend, pasta_remota, conf)
+    catalogo = BackupCatalog(backup_dir)
+
+    plano = _planejar_envio(catalogo, cache, pastas, pasta_remota, politica)
+    if not plano:
+        log("☁️ Todos os backups já estão na nuvem.")
+        return {}
+    log(f"☁️ Envio retroativo: {resumo(plano)}.")
+
+    resultados = {}
+    inicio = time.monotonic()
+    total = 0
+    # uma fila só de arquivos, na ordem do plano: vários dias sobem ao mesmo tempo
+    with ThreadPoolExecutor(max_workers=max(1, simultaneos), thread_name_prefix="upload") as pool:
+        futuros = {pool.submit(_enviar_do_backup, backup_dir, backend, arquivo, dia["pasta_remota"], limitador,
+                               cache, pastas, dia["data"], arquivo.name in dia["substituir"]): (dia, arquivo)
+                   for dia in plano for arquivo in dia["arquivos"]}
+        for futuro in as_completed(futuros):
+            dia, arquivo = futuros[futuro]
+            try:
+                total += futuro.result()[0]
+                resultados[arquivo] = None
+                estado = "enviado"
+            except Exception as e:
+                log(f"❌ Erro ao enviar {arquivo.name}: {e}")
+                resultados[arquivo] = str(e) or type(e).__name__
+                estado = "falhou"
+            try:
+                catalogo.marcar_upload(dia["data"], dia["nomes"].get(arquivo, arquivo.name), estado)
+            except Exception as e:
+                log(f"⚠️ Falha ao atualizar o catálogo de backups: {e}")
+    duracao = max(time.monotonic() - inicio, 1e-6)
+    falhas = sum(1 for erro in resultados.values() if erro)
+    log(f"☁️ Envio retroativo: {len(resultados) - falhas} enviado(s), {falhas} falha(s); "
+        f"{total / 1024**2:.1f} MB em {duracao:.1f}s ({total / 1024**2 / duracao:.2f} MB/s).")
+    return resultados
+
+def fabrica_upload_fluxo(limitador: LimitadorBanda | None = None, data=None):
+    """
+    Para o pipeline_tee: devolve `criar(nome, tamanho) -> consumidor`, em que o consumidor
+    envia ao destino configurado (na pasta remota do dia `data`) os blocos lidos durante a cópia do zip.
+    Retorna None se o destino não aceita envio em fluxo (os zips sobem pela fila).
+    """
+    conf = carregar_config()
+    backend, pasta_remota = obter_backend()
+    if not aceita_fluxo(backend):
+        log(f"ℹ️ Destino {backend.nome} não aceita envio durante a cópia; o upload fica com a fila.")
+        return None
+    limitador = limitador or LimitadorBanda.da_config(conf)
+    cache = RemoteManifestCache(_caminho_cache(backend), backend.listar)
+    pastas = obter_pastas_remotas(backend, pasta_remota, conf) if data else None
+    if pastas:
+        # resolvida uma vez, antes da cópia; uma pasta apagada no meio do caminho só é
+        # esquecida aqui, e o arquivo sobe depois pela fila
+        pasta_remota = pastas.pasta_do_dia(data)
+
+    def criar(nome: str, tamanho: int):
+        def consumir(blocos) -> dict:
+            inicio = time.monotonic()
+            try:
+                anterior = cache.arquivos(pasta_remota).get(nome)
+            except Exception:
+                anterior = None
+            try:
+                remoto = backend.enviar_fluxo(blocos, nome, tamanho, pasta_remota, limitador=limitador, log=log)
+            except PastaInexistente:
+                if pastas:
+                    pastas.invalidar(pasta_remota)
+                    cache.invalidar(pasta_remota)
+                raise
+            # o fluxo não pode ser relido: uma cópia que não confere é apagada e o zip sobe pela fila
+            estado, detalhe = verificar_envio(remoto, tamanho)
+            log(f"{EMOJI_VERIFICACAO[estado]} Verificação remota de {nome}: {estado} ({detalhe}).")
+            if estado == "divergente":
+                _descartar_copia_remota(backend, nome, pasta_remota, cache)
+                raise IOError(f"cópia remota de {nome} não confere: {detalhe}")
+            if anterior and anterior.get("id") != remoto.get("id"):
+                _remover_versoes_antigas(backend, nome, pasta_remota, remoto.get("id"))
+            if remoto.get("id"):
+                cache.registrar(pasta_remota, remoto)
+            duracao = max(time.monotonic() - inicio, 1e-6)
+            log(f"✅ Upload concluído durante a cópia: {nome} ({tamanho / 1024**2:.1f} MB, "
+                f"{tamanho / 1024**2 / duracao:.2f} MB/s)")
+            return remoto
+        return consumir
+
+    return criar
+
+def _autenticar_na_fila(aviso=None):
+    """
+    Autentica o Drive na thread da fila de upload: credenciais guardadas sem interação e, se
+    faltarem, o fluxo do navegador, com `aviso(texto | None)` mostrando na interface que se espera por ele.
+    """
+    try:
+        autenticar()
+        return
+    except AutorizacaoNecessaria:
+        pass
+    if aviso:
+        aviso("☁️ Autorize o Google Drive no navegador...")
+    try:
+        _auth.autorizar(em_segundo_plano=True)
+        log("☁️ Google Drive autorizado.")
+        if aviso:
+            aviso(None)
+    except AutorizacaoNecessaria as e:
+        log(f"⚠️ {e} Os uploads ficam na fila até o Drive ser autorizado.")
+        if aviso:
+            aviso("⚠️ Google Drive não autorizado: uploads em espera")
+
+def iniciar_fila_upload(backup_dir: str, intervalo: float = 30.0, aviso=None) -> UploadScheduler:
+    """
+    Agendador em background que esvazia a fila persistente de uploads de `backup_dir`.
+    Retorna na hora: a autenticação do Drive (e a autorização no navegador, se faltar) roda
+    na thread do agendador, com `aviso(texto | None)` para a interface mostrar o andamento.
+    Em seguida o agendador confere o catálogo com o destino e enfileira os dias que faltam.
+    """
+    backend, pasta_remota = obter_backend()
+    pastas = obter_pastas_remotas(backend, pasta_remota)
+    fila = UploadQueue(backup_dir)
+    catalogo = BackupCatalog(backup_dir)
+    log(fila.relatorio())
+
+    def enviar(pasta: Path, caminhos: list[Path]) -> dict:
+        with ExitStack() as pilha:
+            for caminho in caminhos:
+                pilha.enter_context(_zip_disponivel(backup_dir, caminho))
+            resultados = enviar_pasta(backend, pasta, pasta_remota, arquivos=caminhos, pastas=pastas)
+        data = data_da_pasta(pasta.name)
+        if data:
+            for caminho, erro in resultados.items():
+                try:
+                    catalogo.marcar_upload(data, _nome_no_catalogo(caminho), "enviado" if erro is None else "falhou")
+                except Exception as e:
+                    log(f"⚠️ Falha ao atualizar o catálogo de backups: {e}")
+        return resultados
+
+    def preparar():
+        if backend.nome == "drive":
+            _autenticar_na_fila(aviso)
+        try:
+            _reconciliar_fila(backup_dir, backend, pasta_remota, pastas, fila)
+        except Exception as e:
+            log(f"⚠️ Não foi possível conferir os backups com o destino: {e}")
+
+    agendador = UploadScheduler(fila, enviar, intervalo=intervalo, log=log, preparar=preparar)
+    agendador.start()
+    return agendador
 
 def main():
     try:
-        drive = autenticar()
         pasta = obter_ultima_pasta(BASE_DIR)
         log(f"📦 Último backup detectado: {pasta}")
-        enviar_para_drive(drive, pasta, PASTA_NUVEM_ID)
-        log("☁️ Upload para Google Drive finalizado com sucesso.")
+        # dias perdidos enquanto o bot estava sem internet também sobem
+        enviar_retroativo(BASE_DIR)
+        log("☁️ Upload para a nuvem finalizado.")
     except Exception as e:
         log(f"⚠️ Erro ao enviar para nuvem: {e}")
\ No newline at end of file
@@ -0,0 +1,286 @@
+# upload_resumivel.py
+"""
+Upload resumível em blocos (protocolo "resumable upload" do Google Drive v3).
+
+- Uma sessão de upload é aberta por arquivo e a URI da sessão é guardada em disco;
+  se a rede cair (ou o bot reiniciar), o envio continua do último byte confirmado
+  pelo servidor em vez de recomeçar do zero.
+- Os blocos têm tamanho fixo (múltiplo de 256 KB, exigência do protocolo).
+- As conexões HTTP(S) ficam num pool e são reaproveitadas (keep-alive) entre
+  blocos e arquivos.
+- O MD5 do que foi enviado sai dos próprios blocos lidos para o envio
+  (HashContinuo), para conferir com o checksum do Drive sem reler o arquivo.
+
+O endpoint é configurável, o que permite testar contra um servidor HTTP local
+que simula quedas no meio da transferência.
+"""
+
+import os, json, time, random, hashlib, threading
+import http.client
+from pathlib import Path
+from urllib.parse import urlsplit
+
+DRIVE_UPLOAD_URL = ("https://www.googleapis.com/upload/drive/v3/files"
+                    "?uploadType=resumable&supportsAllDrives=true&fields=id,name,size,md5Checksum")
+BLOCO_UPLOAD = 8 * 1024 * 1024  # múltiplo de 256 KB
+_MULTIPLO = 256 * 1024
+
+
+class ErroUpload(Exception):
+    def __init__(self, mensagem: str, status: int | None = None):
+        super().__init__(mensagem)
+        self.status = status
+
+
+class HashContinuo:
+    """
+    Hash dos bytes na ordem do arquivo, alimentado com os blocos lidos para o envio.
+    Blocos reenviados (após falha ou 308 parcial) não entram duas vezes. Se o envio
+    retomou uma sessão de outra execução, o começo não passou por aqui e `hexdigest`
+    devolve None.
+    """
+
+    def __init__(self, algoritmo: str = "md5"):
+        self._h = hashlib.new(algoritmo)
+        self.posicao = 0
+
+    def alimentar(self, offset: int, dados: bytes):
+        if offset <= self.posicao < offset + len(dados):
+            self._h.update(memoryview(dados)[self.posicao - offset:])
+            self.posicao = offset + len(dados)
+
+    def hexdigest(self, total: int) -> str | None:
+        return self._h.hexdigest() if self.posicao == total else None
+
+
+class PoolConexoes:
+    """Conexões HTTP(S) persistentes por (esquema, host, porta), reutilizadas entre requisições."""
+
+    def __init__(self, max_por_host: int = 4, timeout: float = 60):
+        self.max_por_host = max_por_host
+        self.timeout = timeout
+        self._livres = {}
+        self._lock = threading.Lock()
+
+    def _obter(self, esquema, host, porta):
+        with self._lock:
+            livres = self._livres.setdefault((esquema, host, porta), [])
+            if livres:
+                return livres.pop()
+        cls = http.client.HTTPSConnection if esquema == "https" else http.client.HTTPConnection
+        return cls(host, porta, timeout=self.timeout)
+
+    def _devolver(self, chave, con):
+        with self._lock:
+            livres = self._livres.setdefault(chave, [])
+            if len(livres) < self.max_por_host:
+                livres.append(con)
+                return
+        con.close()
+
+    def requisitar(self, metodo: str, url: str, corpo=None, headers=None):
+        """Executa a requisição e retorna (status, headers, corpo). Erros de rede viram ConnectionError."""
+        partes = urlsplit(url)
+        porta = partes.port or (443 if partes.scheme == "https" else 80)
+        chave = (partes.scheme, partes.hostname, porta)
+        caminho = partes.path + ("?" + partes.query if partes.query else "")
+        con = self._obter(*chave)
+        try:
+            con.request(metodo, caminho, body=corpo, headers=headers or {})
+            resp = con.getresponse()
+            dados = resp.read()
+            cabecalhos = {k.lower(): v for k, v in resp.getheaders()}
+        except (OSError, http.client.HTTPException) as e:
+            con.close()
+            raise ConnectionError(f"{metodo} {partes.hostname}: {e}") from e
+        if cabecalhos.get("connection", "").lower() == "close":
+            con.close()
+        else:
+            self._devolver(chave, con)
+        return resp.status, cabecalhos, dados
+
+    def fechar(self):
+        with self._lock:
+            for livres in self._livres.values():
+                for con in livres:
+                    con.close()
+            self._livres.clear()
+
+
+class SessoesPendentes:
+    """URIs de sessões de upload em andamento, persistidas em JSON para sobreviver a reinícios."""
+
+    def __init__(self, caminho):
+        self.caminho = Path(caminho)
+        self._lock = threading.Lock()
+
+    def _ler(self) -> dict:
+        try:
+            return json.loads(self.caminho.read_text(encoding="utf-8"))
+        except Exception:
+            return {}
+
+    def _gravar(self, dados: dict):
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.caminho.with_name(self.caminho.name + ".tmp")
+        tmp.write_text(json.dumps(dados, indent=2, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.caminho)
+
+    def obter(self, chave: str) -> str | None:
+        with self._lock:
+            return self._ler().get(chave, {}).get("uri")
+
+    def salvar(self, chave: str, uri: str):
+        with self._lock:
+            dados = self._ler()
+            dados[chave] = {"uri": uri, "criada_em": time.time()}
+            self._gravar(dados)
+
+    def remover(self, chave: str):
+        with self._lock:
+            dados = self._ler()
+            if dados.pop(chave, None) is not None:
+                self._gravar(dados)
+
+
+def _chave_sessao(caminho: Path, metadados: dict) -> str:
+    st = caminho.stat()
+    destino = ",".join(p if isinstance(p, str) else p.get("id", "") for p in metadados.get("parents", []))
+    return f"{caminho.resolve()}|{st.st_size}|{st.st_mtime_ns}|{destino}"
+
+
+def _offset_confirmado(cabecalhos: dict) -> int:
+    """Próximo byte a enviar segundo o header Range ('bytes=0-N') de uma resposta 308."""
+    faixa = cabecalhos.get("range")
+    if not faixa:
+        return 0
+    return int(faixa.rsplit("-", 1)[1]) + 1
+
+
+def enviar_resumivel(caminho, metadados: dict, obter_token, pool: PoolConexoes,
+                     sessoes: SessoesPendentes | None = None, endpoint: str = DRIVE_UPLOAD_URL,
+                     bloco: int = BLOCO_UPLOAD, tentativas: int = 8, limitador=None, log=print,
+                     fonte=None, total: int | None = None, hash_envio: HashContinuo | None = None) -> dict:
+    """
+    Envia `caminho` em blocos de `bloco` bytes numa sessão resumível.
+
+    `obter_token(forcar=False) -> str` fornece o access token (forcar=True após 401).
+    `limitador` (LimitadorBanda), se dado, controla o ritmo do envio de cada bloco.
+    `fonte` (com `total`) substitui a leitura de `caminho` por um fluxo (pipeline_tee.LeitorFluxo);
+    nesse caso a sessão não é persistida, já que o fluxo não pode ser relido após reiniciar.
+    `hash_envio` recebe cada bloco lido (ver HashContinuo).
+    Retorna o JSON final do servidor (id, md5Checksum, size...).
+    """
+    caminho = Path(caminho)
+    if fonte is None:
+        total = caminho.stat().st_size
+    else:
+        sessoes = None
+    bloco = max(_MULTIPLO, bloco // _MULTIPLO * _MULTIPLO)
+    chave = _chave_sessao(caminho, metadados) if sessoes else None
+    token = obter_token()
+
+    def autorizacao():
+        return {"Authorization": f"Bearer {token}"}
+
+    def nova_sessao() -> str:
+        corpo = json.dumps(metadados).encode("utf-8")
+        status, cab, dados = pool.requisitar("POST", endpoint, corpo, {
+            **autorizacao(),
+            "Content-Type": "application/json; charset=UTF-8",
+            "X-Upload-Content-Type": "application/zip",
+            "X-Upload-Content-Length": str(total),
+        })
+        if status != 200 or "location" not in cab:
+            raise ErroUpload(f"falha ao abrir sessão de upload ({status}): {dados[:200]!r}", status)
+        if sessoes:
+            sessoes.salvar(chave, cab["location"])
+        return cab["location"]
+
+    def consultar(uri: str):
+        """Pergunta ao servidor quanto já recebeu. Retorna (offset, resposta_final|None) ou None se a sessão expirou."""
+        status, cab, dados = pool.requisitar("PUT", uri, b"", {
+            **autorizacao(), "Content-Range": f"bytes */{total}", "Content-Length": "0",
+        })
+        if status in (200, 201):
+            return total, json.loads(dados or b"{}")
+        if status == 308:
+            return _offset_confirmado(cab), None
+        if status in (404, 410):
+            return None
+        raise ErroUpload(f"status inesperado ao consultar sessão ({status})")
+
+    uri = sessoes.obter(chave) if sessoes else None
+    offset = 0
+    if uri:
+        try:
+            estado = consultar(uri)
+        except (ConnectionError, ErroUpload):
+            estado = None
+        if estado is None:
+            log(f"Sessão de upload anterior de {caminho.name} expirou; recomeçando.")
+            uri = None
+        else:
+            offset, final = estado
+            if final is not None:
+                sessoes.remover(chave)
+                return final
+            log(f"☁️ Retomando upload de {caminho.name} a partir de {offset / 1024**2:.1f} MB.")
+    if uri is None:
+        uri = nova_sessao()
+
+    falhas = 0
+    with (fonte if fonte is not None else open(caminho, "rb")) as f:
+        while True:
+            f.seek(offset)
+            dados = f.read(bloco)
+            if hash_envio is not None:
+                hash_envio.alimentar(offset, dados)
+            fim = offset + len(dados) - 1
+            faixa = f"bytes {offset}-{fim}/{total}" if dados else f"bytes */{total}"
+            try:
+                corpo = limitador.fatiar(dados) if limitador and dados else dados
+                status, cab, resposta = pool.requisitar("PUT", uri, corpo, {
+                    **autorizacao(), "Content-Range": faixa, "Content-Length": str(len(dados)),
+                })
+            except ConnectionError as e:
+                status, cab, resposta = None, {}, str(e).encode()
+
+            if status in (200, 201):
+                if sessoes:
+                    sessoes.remover(chave)
+                return json.loads(resposta or b"{}")
+            if status == 308:
+                offset = _offset_confirmado(cab)
+                falhas = 0
+                continue
+
+            falhas += 1
+            if falhas > tentativas:
+                raise ErroUpload(f"upload de {caminho.name} abortado em {offset} de {total} bytes: "
+                                 f"{status} {resposta[:200]!r}")
+            if status == 401:
+                token = obter_token(forcar=True)
+            elif status in (404, 410):
+                log(f"Sessão de upload de {caminho.name} expirou no meio do envio; recomeçando.")
+                uri, offset = nova_sessao(), 0
+                continue
+            elif status is not None and status < 500 and status != 429:
+                raise ErroUpload(f"upload de {caminho.name} recusado ({status}): {resposta[:200]!r}")
+
+            espera = min(60, 2 ** falhas) + random.uniform(0, 1)
+            log(f"⚠️ Falha no upload de {caminho.name} ({status or 'rede'}); nova tentativa em {espera:.1f}s.")
+            time.sleep(espera)
+            # pergunta ao servidor o que chegou antes de reenviar
+            try:
+                estado = consultar(uri)
+            except (ConnectionError, ErroUpload):
+                continue
+            if estado is None:
+                uri, offset = nova_sessao(), 0
+                continue
+            offset, final = estado
+            if final is not None:
+                if sessoes:
+                    sessoes.remover(chave)
+                return final
@@ -1,25 +1,44 @@
 import os, json
-import re
 import uuid
+from contextvars import ContextVar
 from datetime import datetime
 from pathlib import Path
 import pyautogui, threading
 import ctypes
 import time
 from pywinauto import Application, Desktop
+from log_assincrono import EscritorLog
+from log_rotacao import ler_linhas
+from indice_log import LogIndex
+import fases
 
 APPDATA = Path(os.getenv("APPDATA", Path.home() / "AppData/Roaming"))
 LOG_DIR = APPDATA / "BackupBot" / "relatorios"
 LOG_DIR.mkdir(parents=True, exist_ok=True)
 LOG_FILE = LOG_DIR / "backup_log.txt"
 LOG_JSON = LOG_DIR / "backup_log.jsonl"
+LOG_INDICE = LOG_DIR / "backup_log.idx.sqlite3"
 
 _SESSION_ID = uuid.uuid4().hex
-_CURRENT_RUN_ID = None
+# execução de backup em andamento (begin_run/end_run); threads abertas durante a execução
+# herdam o valor se forem criadas com contextvars.copy_context().run
+_RUN_ID: ContextVar[str | None] = ContextVar("run_id", default=None)
+
+def _criar_escritor() -> EscritorLog:
+    """Gravação em segundo plano (ver log_assincrono), com a rotação do config "log"."""
+    try:
+        with open(get_config_path(), encoding="utf-8") as f:
+            opcoes = json.load(f).get("log") or {}
+    except Exception:
+        opcoes = {}
+    return EscritorLog(
+        LOG_FILE, LOG_JSON, _SESSION_ID,
+        tamanho_maximo=int(float(opcoes.get("tamanhoMaximoMB", 10)) * 1024 * 1024),
+        rotacao_diaria=opcoes.get("rotacaoDiaria", True),
+        manter=int(opcoes.get("segmentosMantidos", 30)),
+        indice=_indice_log,
+    )
 
-_START_RE = re.compile(r"Iniciando backup completo", re.IGNORECASE)
-_SUCCESS_RE = re.compile(r"backup conclu[ií]do com sucesso", re.IGNORECASE)
-_FAIL_RE = re.compile(r"falha|erro|timeout|n[aã]o detectei|n[aã]o foi poss[ií]vel", re.IGNORECASE)
     
 def get_config_path() -> Path:
     try:
@@ -41,6 +60,8 @@ def get_config_path() -> Path:
         return Path(__file__).parent / "config.json"
 
 _conf_path = get_config_path()
+_indice_log = LogIndex(LOG_INDICE, LOG_JSON)
+_escritor = _criar_escritor()
 
 BM_CLICK = 0x00F5
 
@@ -182,47 +203,44 @@ def find_and_click_information_ok(logger=None, timeout: int = 8) -> bool:
         time.sleep(0.6)
     return False
 
-def _update_run_context(mensagem: str):
-    global _CURRENT_RUN_ID
-    event = None
-
-    if _START_RE.search(mensagem):
-        _CURRENT_RUN_ID = uuid.uuid4().hex
-        event = "BACKUP_START"
-    elif _SUCCESS_RE.search(mensagem):
-        event = "BACKUP_DONE"
-        _CURRENT_RUN_ID = None
-    elif _FAIL_RE.search(mensagem):
-        event = "BACKUP_FAIL"
-        _CURRENT_RUN_ID = None
-
-    return _CURRENT_RUN_ID, event
-
-def _write_json_log(ts: str, mensagem: str, run_id: str | None, event: str | None):
-    payload = {
-        "ts": ts,
-        "session_id": _SESSION_ID,
-        "run_id": run_id,
-        "event": event,
-        "message": mensagem,
-    }
-    try:
-        with open(LOG_JSON, "a", encoding="utf-8") as f:
-            f.write(json.dumps(payload, ensure_ascii=False) + "\n")
-    except Exception:
-        pass
-
 def log(mensagem: str):
     ts = datetime.now().isoformat(sep=' ', timespec='seconds')
-    run_id, event = _update_run_context(mensagem)
-    linha = f"{ts} - {mensagem}\n"
-    try:
-        with open(LOG_FILE, "a", encoding="utf-8") as f:
-            f.write(linha)
-    except Exception:
-        pass
-    _write_json_log(ts, mensagem, run_id, event)
-    print(linha.strip())
+    _escritor.registrar(ts, mensagem, _RUN_ID.get())
+
+def event(nome: str | None, mensagem: str, dados: dict | None = None):
+    """Linha com o evento `nome` no .jsonl (e `dados` no campo "data"), na execução em andamento."""
+    ts = datetime.now().isoformat(sep=' ', timespec='seconds')
+    _escritor.registrar(ts, mensagem, _RUN_ID.get(), nome, dados)
+
+fases.definir_saida(event)
+
+def begin_run(mensagem: str = "🚀 Execução de backup iniciada", **dados) -> str:
+    """Abre uma execução: as linhas seguintes (nesta thread e nas que herdarem o contexto) levam o run_id."""
+    run_id = uuid.uuid4().hex
+    _RUN_ID.set(run_id)
+    event("BACKUP_START", mensagem, dados or None)
+    return run_id
+
+def end_run(sucesso: bool, mensagem: str | None = None, **dados):
+    """Fecha a execução em andamento com BACKUP_DONE ou BACKUP_FAIL."""
+    if mensagem is None:
+        mensagem = "🏁 Execução de backup concluída" if sucesso else "❌ Execução de backup terminou com falha"
+    event("BACKUP_DONE" if sucesso else "BACKUP_FAIL", mensagem, dados or None)
+    _RUN_ID.set(None)
+
+def descarregar_log(timeout: float = 5.0) -> bool:
+    """Garante que tudo o que já foi logado está nos arquivos (antes de lê-los ou abri-los)."""
+    return _escritor.descarregar(timeout)
+
+def linhas_do_log(caminho: Path = LOG_JSON):
+    """Todas as linhas do log (segmentos rotacionados, .gz ou não, e o arquivo atual), em ordem."""
+    descarregar_log()
+    return ler_linhas(caminho)
+
+def consultar_log() -> LogIndex:
+    """Índice do log estruturado, com tudo o que já foi logado (por_execucao, por_evento, intervalo...)."""
+    descarregar_log()
+    return _indice_log
 
 def salvar_screenshot(prefixo="erro"):
     try:
@@ -0,0 +1,96 @@
+# verificacao_zip.py
+"""
+Verificação de integridade dos zips de backup logo após a movimentação.
+
+Cada entrada de cada zip é lida em streaming (blocos de 1 MB, nunca o membro
+inteiro na memória) até o fim, o que faz o zipfile conferir o CRC-32. As
+entradas são distribuídas entre processos (balanceadas pelo tamanho
+comprimido), então um zip de vários GB usa todos os núcleos. O resultado vai
+para o log e para o manifest.json da pasta.
+"""
+
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from manifest import carregar_manifest, salvar_manifest
+
+BLOCO_LEITURA = 1024 * 1024
+
+
+def _verificar_entradas(caminho: str, nomes: list[str]) -> tuple[str, int, list]:
+    """Executado no processo filho: lê as entradas `nomes` até o fim (checa CRC)."""
+    erros = []
+    try:
+        with zipfile.ZipFile(caminho) as zf:
+            for nome in nomes:
+                try:
+                    with zf.open(nome) as f:
+                        while f.read(BLOCO_LEITURA):
+                            pass
+                except Exception as e:
+                    erros.append([nome, str(e)])
+    except Exception as e:
+        erros.append(["*", str(e)])
+    return caminho, len(nomes), erros
+
+
+def _dividir(infos: list, partes: int) -> list[list[str]]:
+    """Distribui as entradas em `partes` grupos de tamanho comprimido parecido (maior primeiro)."""
+    grupos = [[0, []] for _ in range(max(1, partes))]
+    for info in sorted(infos, key=lambda i: i.compress_size, reverse=True):
+        grupo = min(grupos, key=lambda g: g[0])
+        grupo[0] += info.compress_size
+        grupo[1].append(info.filename)
+    return [nomes for _, nomes in grupos if nomes]
+
+
+def verificar_zips(caminhos, processos: int | None = None, log=print) -> dict:
+    """
+    Verifica os `caminhos` em paralelo. Retorna {nome_do_zip: {"ok", "entradas", "erros", "verificado_em"}}.
+    """
+    processos = processos or os.cpu_count() or 1
+    resultados = {}
+    tarefas = []
+    for caminho in map(Path, caminhos):
+        resultados[caminho.name] = {"ok": True, "entradas": 0, "erros": []}
+        try:
+            with zipfile.ZipFile(caminho) as zf:
+                infos = [i for i in zf.infolist() if not i.is_dir()]
+        except Exception as e:
+            resultados[caminho.name].update(ok=False, erros=[["*", f"diretório central ilegível: {e}"]])
+            continue
+        for nomes in _dividir(infos, processos):
+            tarefas.append((str(caminho), nomes))
+
+    if tarefas:
+        with ProcessPoolExecutor(max_workers=min(processos, len(tarefas))) as pool:
+            for caminho, n, erros in pool.map(_verificar_entradas, *zip(*tarefas)):
+                r = resultados[Path(caminho).name]
+                r["entradas"] += n
+                if erros:
+                    r["ok"] = False
+                    r["erros"].extend(erros)
+
+    agora = datetime.now().isoformat(timespec="seconds")
+    for nome, r in resultados.items():
+        r["verificado_em"] = agora
+        if r["ok"]:
+            log(f"🔎 Zip íntegro: {nome} ({r['entradas']} entrada(s), CRC ok)")
+        else:
+            log(f"❌ Zip corrompido: {nome} — {len(r['erros'])} erro(s): {r['erros'][:3]}")
+    return resultados
+
+
+def verificar_pasta(pasta, caminhos=None, processos: int | None = None, log=print) -> dict:
+    """Verifica os zips da `pasta` (ou só `caminhos`) e grava o resultado no manifest."""
+    pasta = Path(pasta)
+    caminhos = list(caminhos) if caminhos is not None else sorted(pasta.glob("*.zip"))
+    resultados = verificar_zips(caminhos, processos=processos, log=log)
+    manifest = carregar_manifest(pasta)
+    for nome, r in resultados.items():
+        if nome in manifest["arquivos"]:
+            manifest["arquivos"][nome]["verificacao"] = r
+    salvar_manifest(pasta, manifest)
+    return resultados